@@ -0,0 +1,21 @@
+"""
+Benchmarks of rasterx, run with `asv`_ from the root of the repository::
+
+    $ pip install asv
+    $ asv run --python=same --quick   # a quick check of everything
+    $ asv run                         # full timing of the checked out code
+    $ asv continuous master HEAD      # compare against master
+
+All data is synthetic (see :mod:`benchmarks.tiles`), generated on the
+first run in ``$RASTERX_BENCHMARK_DIR`` (a temporary directory by
+default) and reused, so that the benchmarks run offline. rasterx caches
+go to a subdirectory of it instead of the user cache directory.
+
+.. _asv: https://asv.readthedocs.io
+"""
+import os
+
+from benchmarks.tiles import DATA_DIR
+
+# before rasterx is imported, see rasterx.cache
+os.environ.setdefault('RASTERX_CACHE_DIR', os.path.join(DATA_DIR, 'cache'))
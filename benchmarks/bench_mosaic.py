@@ -0,0 +1,56 @@
+"""
+Benchmarks of merging tiles and of trimming, on data in memory.
+"""
+from rasterx import mosaic
+from rasterx.core import _merge_tiles
+
+from benchmarks.tiles import X0, Y0, tile
+
+
+class Merge:
+    """
+    Merge 4, 16 or 64 tiles (2x2, 4x4 or 8x8) as :func:`rasterx.read`
+    does, snapping them to a shared grid first.
+    """
+    params = ((4, 16, 64), (121, 601), ('first', 'mean'))
+    param_names = ('tiles', 'size', 'overlap')
+    timeout = 300
+
+    def setup(self, tiles, size, overlap):
+        n = int(tiles**0.5)
+        self.tiles = [tile(x, y, size)
+                      for y in range(Y0, Y0 + n) for x in range(X0, X0 + n)]
+
+    def time_merge(self, tiles, size, overlap):
+        _merge_tiles(self.tiles, overlap)
+
+    def time_mosaic(self, tiles, size, overlap):
+        mosaic(self.tiles, overlap)
+
+    def peakmem_merge(self, tiles, size, overlap):
+        _merge_tiles(self.tiles, overlap)
+
+
+class Trim:
+    """
+    :meth:`~rasterx.geo_accessor.GeoAccessor.trim` a 1 arc-second tile
+    to an extent within it or overlapping its SW corner, with and
+    without ``pad``, in memory or chunked with dask (and then loaded).
+    """
+    params = (('inside', 'overlapping'), (False, True), (None, 512))
+    param_names = ('extent', 'pad', 'chunks')
+
+    def setup(self, extent, pad, chunks):
+        self.ds = tile(X0, Y0, 3601)
+        if chunks is not None:
+            self.ds = self.ds.chunk(chunks)
+        if extent == 'inside':
+            self.extent = (X0 + 0.25, X0 + 0.75, Y0 + 0.25, Y0 + 0.75)
+        else:
+            self.extent = (X0 - 0.25, X0 + 0.25, Y0 - 0.25, Y0 + 0.25)
+
+    def time_trim(self, extent, pad, chunks):
+        self.ds.geo.trim(*self.extent, pad=pad).load()
+
+    def peakmem_trim(self, extent, pad, chunks):
+        self.ds.geo.trim(*self.extent, pad=pad).load()
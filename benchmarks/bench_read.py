@@ -0,0 +1,88 @@
+"""
+Benchmarks of :func:`rasterx.read` with directory, list and archive
+inputs.
+"""
+from rasterx import read, profile
+
+from benchmarks.tiles import (STYLES, FORMATS, SIZES, X0, Y0, make_tiles,
+                              tile_files, read_kwargs)
+
+
+def _peak(func, *args, **kwargs):
+    # largest peak memory of any stage of reading, in MB
+    with profile() as report:
+        func(*args, **kwargs)
+    return max(stage.peak or 0 for stage in report.stages) / 2**20
+
+
+class ReadDirectory:
+    """
+    Read the 2x2 tiles covered by an extent from a directory, trimming
+    every tile.
+    """
+    params = (STYLES, FORMATS, SIZES)
+    param_names = ('style', 'format', 'size')
+    timeout = 300
+
+    def setup(self, style, format, size):
+        self.path = make_tiles(style, format, size, n=2)
+        self.kwargs = read_kwargs(style, format)
+        self.extent = (X0 + 0.25, X0 + 1.75, Y0 + 0.25, Y0 + 1.75)
+
+    def time_read(self, style, format, size):
+        read(self.path, extent=self.extent, **self.kwargs)
+
+    def peakmem_read(self, style, format, size):
+        read(self.path, extent=self.extent, **self.kwargs)
+
+    def track_stage_peak(self, style, format, size):
+        return _peak(read, self.path, extent=self.extent, **self.kwargs)
+    track_stage_peak.unit = 'MB'
+
+
+class ReadList:
+    """
+    Read and merge a list of 2x2 tiles with their full extent.
+    """
+    params = (FORMATS, SIZES)
+    param_names = ('format', 'size')
+    timeout = 300
+
+    def setup(self, format, size):
+        self.files = tile_files(make_tiles('AsterGDEM', format, size, n=2),
+                                format)
+        self.substring = read_kwargs('AsterGDEM', format).get('substring')
+
+    def time_read(self, format, size):
+        read(self.files, self.substring)
+
+    def peakmem_read(self, format, size):
+        read(self.files, self.substring)
+
+    def track_stage_peak(self, format, size):
+        return _peak(read, self.files, self.substring)
+    track_stage_peak.unit = 'MB'
+
+
+class ReadArchive:
+    """
+    Read a single archive, picking the elevations by ``substring``. The
+    file is opened lazily, so the data is loaded explicitly.
+    """
+    params = (('zip', 'tar.gz'), SIZES)
+    param_names = ('format', 'size')
+    timeout = 300
+
+    def setup(self, format, size):
+        path = make_tiles('AsterGDEM', format, size, n=2)
+        self.filename = tile_files(path, format)[0]
+
+    def time_read(self, format, size):
+        read(self.filename, 'dem').load()
+
+    def time_read_extent(self, format, size):
+        read(self.filename, 'dem',
+             extent=(X0, X0 + 0.5, Y0, Y0 + 0.5)).load()
+
+    def peakmem_read(self, format, size):
+        read(self.filename, 'dem').load()
@@ -0,0 +1,35 @@
+"""
+Benchmarks of :func:`rasterx.stats`, against reducing the mosaic read
+by :func:`rasterx.read`.
+"""
+from rasterx import read, stats
+
+from benchmarks.tiles import X0, Y0, make_tiles, read_kwargs
+
+
+class Stats:
+    """
+    Statistics of an extent covering 4x4 tiles of a directory, by
+    streaming the tiles (with 1 or 4 threads) or from the mosaic.
+    """
+    params = (('nc', 'tif'), (1, 4))
+    param_names = ('format', 'workers')
+    timeout = 300
+
+    def setup(self, format, workers):
+        self.path = make_tiles('AsterGDEM', format, 601, n=4)
+        self.kwargs = read_kwargs('AsterGDEM', format)
+        self.extent = (X0 + 0.25, X0 + 3.75, Y0 + 0.25, Y0 + 3.75)
+
+    def time_stats(self, format, workers):
+        stats(self.path, self.extent, ['mean', 'std', 'histogram'],
+              bins=100, bin_range=(0, 9000), workers=workers, **self.kwargs)
+
+    def peakmem_stats(self, format, workers):
+        stats(self.path, self.extent, ['mean', 'std', 'histogram'],
+              bins=100, bin_range=(0, 9000), workers=workers, **self.kwargs)
+
+    def peakmem_mosaic(self, format, workers):
+        ds = read(self.path, extent=self.extent, **self.kwargs)
+        ds.mean()
+        ds.std()
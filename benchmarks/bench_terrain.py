@@ -0,0 +1,30 @@
+"""
+Benchmarks of the terrain derivatives of the ``.geo`` accessor.
+"""
+import rasterx  # noqa: F401, registers the .geo accessor
+
+from benchmarks.tiles import X0, Y0, tile
+
+
+class Terrain:
+    """
+    Slope, aspect and hillshade of a 1 arc-second tile, in blocks (with
+    1 or 4 threads) or chunked with dask.
+    """
+    params = (('slope', 'aspect', 'hillshade'), ('blocks', 'threads', 'dask'))
+    param_names = ('derivative', 'mode')
+    timeout = 300
+
+    def setup(self, derivative, mode):
+        self.ds = tile(X0, Y0, 3601, mask_and_scale=False)
+        self.kwargs = {}
+        if mode == 'threads':
+            self.kwargs = dict(workers=4)
+        elif mode == 'dask':
+            self.ds = self.ds.chunk(1024)
+
+    def time_derivative(self, derivative, mode):
+        getattr(self.ds.geo, derivative)(**self.kwargs).load()
+
+    def peakmem_derivative(self, derivative, mode):
+        getattr(self.ds.geo, derivative)(**self.kwargs).load()
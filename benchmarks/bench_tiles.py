@@ -0,0 +1,69 @@
+"""
+Benchmarks of finding tiles and of reading their metadata.
+"""
+from warnings import catch_warnings, simplefilter
+
+from rasterx import get_info
+from rasterx.core import _get_tiles
+from rasterx.cache import metadata_cache
+from rasterx.tile_index import _INDEXES
+
+from benchmarks.tiles import (STYLES, FORMATS, X0, Y0, make_tiles,
+                              tile_files)
+
+
+class GetTiles:
+    """
+    Find the tiles of an extent in a directory of 8x8 tiles, from the
+    tile index or by globbing for every tile.
+    """
+    params = (STYLES, (2, 8), (True, False))
+    param_names = ('style', 'n', 'index')
+
+    def setup(self, style, n, index):
+        self.path = make_tiles(style, 'nc', 121, n=8)
+        self.extent = (X0 + 0.5, X0 + n - 0.5, Y0 + 0.5, Y0 + n - 0.5)
+        self.index = index
+        self.template = style
+        _get_tiles(self.path, *self.extent, template=style, index=index)
+
+    def time_get_tiles(self, style, n, index):
+        _get_tiles(self.path, *self.extent, template=self.template,
+                   index=self.index)
+
+    def time_get_tiles_outside(self, style, n, index):
+        # none of the tiles exist
+        with catch_warnings():
+            simplefilter('ignore')
+            _get_tiles(self.path, X0 - n, X0, Y0 - n, Y0,
+                       template=self.template, index=self.index)
+
+    def time_get_tiles_new_index(self, style, n, index):
+        # the index is loaded from disk, as in a new session
+        _INDEXES.clear()
+        _get_tiles(self.path, *self.extent, template=self.template,
+                   index=self.index)
+
+
+class GetInfo:
+    """
+    :func:`rasterx.get_info` of a tile, from the metadata cache or not.
+    """
+    params = (FORMATS, (True, False))
+    param_names = ('format', 'cached')
+
+    def setup(self, format, cached):
+        path = make_tiles('AsterGDEM', format, 601, n=2)
+        self.filename = tile_files(path, format)[0]
+        self.cached = cached
+        get_info(self.filename)
+
+    def time_get_info(self, format, cached):
+        if not self.cached:
+            metadata_cache.clear()
+        get_info(self.filename)
+
+    def time_get_info_json(self, format, cached):
+        if not self.cached:
+            metadata_cache.clear()
+        get_info(self.filename, format='json')
@@ -0,0 +1,228 @@
+"""
+Synthetic AsterGDEM and SRTM style tiles for the benchmarks.
+
+Tiles are 1x1 degree grids of ``size x size`` int16 elevations whose
+edge rows and columns are shared with their neighbours, like the real
+products (``size=3601`` for 1 arc-second tiles). Elevations are a smooth
+function of the coordinates, so that shared edges agree, with a few
+nodata pixels.
+"""
+import os
+import shutil
+import tarfile
+import tempfile
+from zipfile import ZipFile, ZIP_DEFLATED
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+from xarray import Dataset, Variable
+
+
+# Generated tiles are kept here and reused by later runs
+DATA_DIR = os.environ.get(
+    'RASTERX_BENCHMARK_DIR',
+    os.path.join(tempfile.gettempdir(), 'rasterx-benchmarks')
+)
+
+NODATA = -9999
+STYLES = ('AsterGDEM', 'SRTM')
+FORMATS = ('nc', 'tif', 'zip', 'tar.gz')
+SIZES = (121, 601, 1201)
+
+# SW corner of the first tile
+X0, Y0 = 86, 27
+
+VARIABLES = {
+    'AsterGDEM': 'ASTER_GDEM_DEM',
+    'SRTM': 'SRTMGL1_DEM',
+}
+
+# filenames of the tiles and of the rasters in archives
+NAMES = {
+    'AsterGDEM': {
+        'nc': 'ASTGTMV003_{corner}_dem.nc',
+        'tif': 'ASTGTMV003_{corner}_dem.tif',
+        'zip': 'ASTGTMV003_{corner}.zip',
+        'tar.gz': 'ASTGTMV003_{corner}.tar.gz',
+        'members': ('ASTGTMV003_{corner}_dem.tif',
+                    'ASTGTMV003_{corner}_num.tif'),
+    },
+    'SRTM': {
+        'nc': '{corner}.SRTMGL1_NC.nc',
+        'tif': '{corner}.SRTMGL1.tif',
+        'zip': '{corner}.SRTMGL1.hgt.zip',
+        'tar.gz': '{corner}.SRTMGL1.tar.gz',
+        'members': ('{corner}.tif',),
+    },
+}
+
+
+def _corner(x, y):
+    # the [N,S]??[E,W]??? string of the SW corner of a tile
+    return (f'{"S" if y < 0 else "N"}{abs(y):02d}'
+            f'{"W" if x < 0 else "E"}{abs(x):03d}')
+
+
+def elevation(x, y):
+    """
+    Synthetic int16 elevations on the grid of the 1D coordinates ``x``
+    and ``y``, with nodata in a narrow band of the surface.
+    """
+    x, y = np.radians(x)[None, :], np.radians(y)[:, None]
+    z = 2000 + 1500 * np.sin(60 * x) * np.cos(45 * y) + 300 * np.cos(7 * x)
+    z = np.round(z)
+    z[np.abs(z - 2000) < 2] = NODATA
+    return z.astype('int16')
+
+
+def tile(x, y, size=121, style='AsterGDEM', mask_and_scale=False):
+    """
+    The tile with SW corner ``(x, y)`` as a :class:`~xarray.Dataset`,
+    as :func:`rasterx.read` would return it: int16 with a ``_FillValue``
+    attribute or, if ``mask_and_scale`` is ``True``, float32 with
+    ``NaN`` for nodata.
+    """
+    lon = x + np.arange(size) / (size - 1)
+    lat = y + np.arange(size) / (size - 1)
+    z = elevation(lon, lat)
+
+    attrs = dict(long_name=VARIABLES[style], units='meters')
+    if mask_and_scale:
+        z = np.where(z == NODATA, np.nan, z).astype('float32')
+    else:
+        attrs['_FillValue'] = np.int16(NODATA)
+
+    return Dataset(
+        {VARIABLES[style]: Variable(('lat', 'lon'), z, attrs)},
+        coords=dict(
+            lon=Variable('lon', lon, dict(units='degrees_east')),
+            lat=Variable('lat', lat, dict(units='degrees_north')),
+        )
+    )
+
+
+def _write_netcdf(filename, ds):
+    ds = ds.copy()
+    encoding = {}
+    for name, var in ds.data_vars.items():
+        encoding[name] = dict(_FillValue=var.attrs.pop('_FillValue'),
+                              zlib=True)
+    ds.to_netcdf(filename, encoding=encoding)
+
+
+def _write_gtiff(filename, data, x, y, nodata=NODATA):
+    # north up, tiled and LZW compressed like the AsterGDEM GeoTIFFs
+    size = len(x)
+    d = x[1] - x[0]
+    profile = dict(
+        driver='GTiff', width=size, height=size, count=1,
+        dtype=data.dtype.name, crs='EPSG:4326', nodata=nodata,
+        transform=from_origin(x[0] - d / 2, y[-1] + d / 2, d, d),
+        tiled=True, blockxsize=256, blockysize=256, compress='lzw'
+    )
+    with rasterio.open(filename, 'w', **profile) as f:
+        f.write(data[::-1], 1)
+
+
+def _write_tile(directory, x, y, size, style, format):
+    names = NAMES[style]
+    corner = _corner(x, y)
+    ds = tile(x, y, size, style, mask_and_scale=False)
+
+    filename = os.path.join(directory, names[format].format(corner=corner))
+    if format == 'nc':
+        return _write_netcdf(filename, ds)
+
+    z = ds[VARIABLES[style]].values
+    lon, lat = ds.lon.values, ds.lat.values
+    if format == 'tif':
+        return _write_gtiff(filename, z, lon, lat)
+
+    # archives of the elevations and, for AsterGDEM, of the number of
+    # scenes (uint8) that went into every pixel
+    members = []
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        for name, data, nodata in zip(
+                names['members'],
+                (z, (np.abs(z) % 7 + 1).astype('uint8')),
+                (NODATA, 0)):
+            member = os.path.join(tmp, name.format(corner=corner))
+            _write_gtiff(member, data, lon, lat, nodata)
+            members.append(member)
+
+        if format == 'zip':
+            with ZipFile(filename, 'w', ZIP_DEFLATED) as f:
+                for member in members:
+                    f.write(member, os.path.basename(member))
+        else:
+            with tarfile.open(filename, 'w:gz') as f:
+                for member in members:
+                    f.add(member, os.path.basename(member))
+
+
+def make_tiles(style='AsterGDEM', format='nc', size=121, n=2):
+    """
+    A directory of ``n x n`` tiles, from ``(X0, Y0)`` to
+    ``(X0 + n, Y0 + n)``. Tiles are generated once and reused.
+
+    Parameters
+    ----------
+    style : {'AsterGDEM', 'SRTM'}
+        Naming of the files and of the data variable.
+
+    format : {'nc', 'tif', 'zip', 'tar.gz'}
+        Format of the tiles. Archives contain GeoTIFFs.
+
+    size : int
+        Number of pixels along each side of a tile.
+
+    n : int
+        Number of tiles along each side of the mosaic.
+
+    Returns
+    -------
+    str
+        The directory.
+    """
+    directory = os.path.join(DATA_DIR, f'{style}-{format}-{size}-{n}x{n}')
+    if os.path.isdir(directory):
+        return directory
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=DATA_DIR)
+    try:
+        for y in range(Y0, Y0 + n):
+            for x in range(X0, X0 + n):
+                _write_tile(tmp, x, y, size, style, format)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    try:
+        os.replace(tmp, directory)
+    except OSError:  # made by another process in the meantime
+        shutil.rmtree(tmp, ignore_errors=True)
+    return directory
+
+
+def tile_files(directory, format='nc'):
+    """
+    The tiles in ``directory``, sorted, skipping any side files (e.g.
+    ``.properties``) that readers may leave next to them.
+    """
+    return sorted(os.path.join(directory, name)
+                  for name in os.listdir(directory)
+                  if name.endswith(f'.{format}'))
+
+
+def read_kwargs(style='AsterGDEM', format='nc'):
+    """
+    Keyword arguments of :func:`rasterx.read` for tiles made by
+    :func:`make_tiles`.
+    """
+    kwargs = dict(template=style, ext=f'.{format}')
+    if style == 'AsterGDEM' and format in ('zip', 'tar.gz'):
+        kwargs['substring'] = 'dem'
+    return kwargs
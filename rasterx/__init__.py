@@ -17,6 +17,13 @@ rasterx: A python package for easy handling of raster datasets with xarray
 from __future__ import absolute_import, print_function, division
 
 from rasterx import geo_accessor
-from rasterx.core import read, get_info
+from rasterx.core import (read, read_many, get_info, build_vrt,
+                          register_reader)
+from rasterx.mosaicking import mosaic, snap_to_grid
+from rasterx.overviews import build_overviews
+from rasterx.points import sample
+from rasterx.writers import mosaic_to
+from rasterx.statistics import stats
+from rasterx.profiling import profile
 
 __version__ = '0.1.0'
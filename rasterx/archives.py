@@ -0,0 +1,168 @@
+import os
+import bz2
+import gzip
+import lzma
+import shutil
+import tarfile
+from functools import partial
+from zipfile import ZipFile, BadZipFile
+
+from rasterx.cache import (MetadataCache, metadata_cache, cache_path, _key,
+                           _file_key)
+from rasterx.remote import _is_url, _vsicurl, _archive_type, _list
+from rasterx.profiling import stage
+
+
+# Set to ``True`` to convert .tar.gz archives to plain, seekable .tar
+# files once (see unpack) instead of letting GDAL decompress them on
+# every read. Archives compressed otherwise (.tar.bz2, .tar.xz) can not
+# be read by GDAL and are always converted.
+UNPACK_GZIP = False
+
+OPENERS = {
+    'tar.gz': gzip.open,
+    'tar.bz2': bz2.open,
+    'tar.xz': lzma.open,
+}
+
+# Member lists of tar archives, kept on disk, as listing a compressed
+# tar archive takes a full decompression pass. Zip archives are listed
+# from their central directory and are only cached in memory.
+# Configure by setting its attributes.
+index_cache = MetadataCache(persist=True)
+
+
+def _container_type(filename):
+    """
+    ``'zip'``, ``'tar'``, ``'tar.gz'``, ``'tar.bz2'``, ``'tar.xz'`` or
+    ``None``, from the magic bytes of ``filename``.
+    """
+    try:
+        with open(filename, 'rb') as f:
+            head = f.read(262)
+    except OSError:  # e.g. a directory or a /vsi* path
+        return None
+
+    if head.startswith((b'PK\x03\x04', b'PK\x05\x06')):
+        return 'zip'
+    if head[257:262] == b'ustar':
+        return 'tar'
+    if head.startswith(b'\x1f\x8b'):
+        return 'tar.gz'
+    if head.startswith(b'BZh'):
+        return 'tar.bz2'
+    if head.startswith(b'\xfd7zXZ\x00'):
+        return 'tar.xz'
+    return None
+
+
+def _zip_index(filename):
+    # the central directory is read, nothing is decompressed
+    try:
+        with ZipFile(filename) as f:
+            return f.namelist()
+    except BadZipFile:
+        return None
+
+
+def _tar_index(filename, kind):
+    """
+    The names of the files in a tar archive of type ``kind``, listed in
+    a single pass through the (uncompressed) stream.
+    """
+    source = filename
+    if kind != 'tar' and (UNPACK_GZIP or kind != 'tar.gz'):
+        source = unpack(filename)
+
+    names = []
+    try:  # a single pass through the stream, without seeking back
+        with tarfile.open(source, 'r|*') as f:
+            for member in f:
+                if member.isfile():
+                    names.append(member.name)
+    except (tarfile.ReadError, EOFError, OSError):  # e.g. not a tar
+        return None
+    return names
+
+
+def unpack(filename, cache_dir=None):
+    """
+    Decompress a compressed tar archive (.tar.gz, .tar.bz2, .tar.xz)
+    once to a plain .tar file in the ``archive`` subdirectory of the
+    cache directory (see :func:`~rasterx.cache.cache_path`).
+
+    Members of a plain tar archive are read by GDAL through ``/vsitar/``
+    without decompressing anything. The .tar file is reused as long as
+    ``filename`` does not change. Note that it takes the full
+    uncompressed size on disk.
+
+    Returns
+    -------
+    str
+        The filename of the .tar file.
+    """
+    kind = _container_type(filename)
+    if kind not in OPENERS:
+        raise ValueError(f'{filename} is not a compressed tar archive...')
+
+    path = cache_path('archive', _key(*_file_key(filename)) + '.tar',
+                      cache_dir)
+    if not os.path.exists(path):
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with OPENERS[kind](filename, 'rb') as src, open(tmp, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 2**20)
+        os.replace(tmp, path)
+    return path
+
+
+def archive_members(filename):
+    """
+    The type of an archive and the GDAL paths of its members.
+
+    The type is detected once from the magic bytes of the file. Zip
+    archives are listed from their central directory and tar archives
+    from an index that is built in a single pass and cached on disk
+    (see :data:`index_cache`). Members are handed to GDAL through
+    ``/vsizip/`` or ``/vsitar/``, which keeps their filenames, so that
+    drivers that rely on them (e.g. SRTM ``.hgt``) and side files
+    (e.g. ``.aux.xml``, ``.tfw``, ``.prj``) in the archive still work.
+    Compressed tar archives are decompressed by GDAL up to the member
+    unless they are unpacked (see :data:`UNPACK_GZIP` and
+    :func:`unpack`).
+
+    Returns
+    -------
+    kind : str or None
+        The type of archive or ``None`` if ``filename`` is not one.
+
+    members : dict
+        Maps the names of the members to their GDAL paths.
+    """
+    if _is_url(filename):  # list remote archives without downloading
+        prefix = _archive_type(filename)
+        if prefix is None:
+            return None, {}
+        base = f'/vsi{prefix}/{_vsicurl(filename)}'
+        return prefix, {name: f'{base}/{name}' for name in _list(base)}
+
+    kind = _container_type(filename)
+    if kind is None:
+        return None, {}
+
+    with stage('archive', filename=filename):
+        if kind == 'zip':
+            names = metadata_cache('zip', filename,
+                                   partial(_zip_index, filename))
+        else:
+            names = index_cache('tar', filename,
+                                partial(_tar_index, filename, kind))
+    if names is None:
+        return None, {}
+
+    if kind == 'zip':
+        return kind, {name: f'/vsizip/{filename}/{name}' for name in names}
+
+    source = filename
+    if kind != 'tar' and (UNPACK_GZIP or kind != 'tar.gz'):
+        source = unpack(filename)
+    return kind, {name: f'/vsitar/{source}/{name}' for name in names}
@@ -0,0 +1,146 @@
+import os
+
+import numpy as np
+
+from xarray import DataArray, Dataset, Variable
+
+from rasterx.utils import _gap_fill
+
+
+def _pair(value):
+    if isinstance(value, (tuple, list)):
+        return tuple(value)
+    return value, value
+
+
+def iter_windows(shape, block_shape, overlap=0):
+    """
+    Iterate over the blocks of a 2D ``(ny, nx)`` grid, row by row.
+
+    Yields
+    ------
+    core : tuple of slice
+        ``(y, x)`` pixel slices of the block.
+
+    halo : tuple of slice
+        ``(y, x)`` pixel slices of the block extended by ``overlap``
+        pixels on each side, clipped at the edges of the grid.
+    """
+    ny, nx = shape
+    by, bx = _pair(block_shape)
+    oy, ox = _pair(overlap)
+    if by < 1 or bx < 1:
+        raise ValueError('`block_shape` must be positive')
+    if oy < 0 or ox < 0:
+        raise ValueError('`overlap` must not be negative')
+
+    for j in range(0, ny, by):
+        for i in range(0, nx, bx):
+            core = slice(j, min(j + by, ny)), slice(i, min(i + bx, nx))
+            halo = (slice(max(j - oy, 0), min(j + by + oy, ny)),
+                    slice(max(i - ox, 0), min(i + bx + ox, nx)))
+            yield core, halo
+
+
+class BlockWriter:
+    """
+    Reassemble the results of block-wise processing into one dataset.
+
+    The output is preallocated, either in memory or as memory-mapped
+    ``.npy`` files (one per variable) in a directory, so that results
+    larger than RAM can be assembled with bounded memory. Results may
+    contain new variables, which are allocated on first write.
+
+    Parameters
+    ----------
+    like : :class:`~xarray.Dataset`
+        The dataset the blocks were taken from, see
+        :meth:`~rasterx.geo_accessor.GeoAccessor.iter_blocks`.
+
+    path : str, optional
+        A directory for memory-mapped output. By default, the output is
+        kept in memory.
+
+    Examples
+    --------
+    >>> writer = ds.geo.block_writer()
+    >>> for window, block in ds.geo.iter_blocks(1024, overlap=1):
+    ...     writer.write(window, process(block.load()))
+    >>> result = writer.result()
+    """
+    def __init__(self, like, path=None):
+        geo = like.geo
+        self._x, self._y = geo._x, geo._y
+        self._coords = {dim: like[dim].variable for dim in (self._y, self._x)}
+        self._indexes = {dim: like.indexes[dim] for dim in (self._y, self._x)}
+        self.path = path
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+        self._variables = {}
+        self._memmaps = []
+
+    def write(self, window, result):
+        """
+        Write the part of ``result`` within ``window``, dropping the
+        halo.
+
+        Parameters
+        ----------
+        window : dict
+            ``{dim: slice}`` pixel window of the block in the original
+            dataset, as yielded by
+            :meth:`~rasterx.geo_accessor.GeoAccessor.iter_blocks`.
+
+        result : :class:`~xarray.Dataset` or :class:`~xarray.DataArray`
+            The result of processing the block. It must have the spatial
+            coordinates of the block (with or without the halo).
+        """
+        if isinstance(result, DataArray):
+            result = result.to_dataset(name=result.name or 'data')
+
+        # locate the window within the result, i.e. drop the halo
+        core = {}
+        for dim in (self._y, self._x):
+            start = self._indexes[dim].get_loc(result[dim].values[0])
+            offset = window[dim].start - start
+            core[dim] = slice(offset,
+                              offset + window[dim].stop - window[dim].start)
+        result = result.isel(core)
+
+        for name, var in result.data_vars.items():
+            if self._x not in var.dims or self._y not in var.dims:
+                self._variables.setdefault(name, var.variable)
+                continue
+            out = self._allocate(name, var)
+            index = tuple(window.get(dim, slice(None)) for dim in var.dims)
+            out.data[index] = var.values
+
+    def _allocate(self, name, var):
+        if name in self._variables:
+            return self._variables[name]
+
+        shape = tuple(
+            self._coords[dim].size if dim in self._coords else size
+            for dim, size in zip(var.dims, var.shape)
+        )
+        fill_value, dtype = _gap_fill(var)
+        if self.path is None:
+            data = np.full(shape, fill_value, dtype=dtype)
+        else:
+            data = np.lib.format.open_memmap(
+                os.path.join(self.path, f'{name}.npy'), mode='w+',
+                dtype=dtype, shape=shape
+            )
+            data[...] = fill_value
+            self._memmaps.append(data)
+        self._variables[name] = Variable(var.dims, data, var.attrs)
+        return self._variables[name]
+
+    def result(self):
+        """
+        The reassembled :class:`~xarray.Dataset`. With memory-mapped
+        output, the data is flushed to disk and read on access.
+        """
+        for data in self._memmaps:
+            data.flush()
+        return Dataset(self._variables, coords=self._coords)
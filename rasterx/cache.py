@@ -0,0 +1,282 @@
+import os
+import json
+import shutil
+import hashlib
+from copy import deepcopy
+from threading import Lock
+from collections import OrderedDict
+
+from xarray import open_dataset, open_zarr
+
+from warnings import warn
+
+
+CACHE_DIR = os.environ.get(
+    'RASTERX_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'rasterx')
+)
+
+
+def _key(*parts):
+    """
+    Hash ``parts`` into a short, filename-safe key.
+    """
+    return hashlib.sha1(
+        '|'.join(str(part) for part in parts).encode()
+    ).hexdigest()[:20]
+
+
+def cache_path(subdir, filename, cache_dir=None):
+    """
+    Path to ``filename`` in the ``subdir`` of the cache directory.
+
+    The cache directory defaults to ``~/.cache/rasterx`` and can be set
+    with the ``RASTERX_CACHE_DIR`` environment variable. The directory
+    is created if needed.
+    """
+    path = os.path.join(cache_dir or CACHE_DIR, subdir)
+    os.makedirs(path, exist_ok=True)
+    return os.path.join(path, filename)
+
+
+def _file_key(filename):
+    """
+    ``(path, mtime, size)`` of a local file or ``None`` if it can not
+    be stat'ed (e.g. a ``/vsi*`` path or a url).
+    """
+    try:
+        stat = os.stat(filename)
+    except (OSError, TypeError, ValueError):
+        return None
+    return os.path.abspath(filename), stat.st_mtime_ns, stat.st_size
+
+
+class MetadataCache:
+    """
+    Cache of file metadata keyed by path, modification time and size.
+
+    Values are kept in an in-process LRU and, optionally, as JSON files
+    in the ``metadata`` subdirectory of the cache directory so that
+    they are shared between processes and sessions. Entries of a file
+    are invalidated as soon as the file is modified.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of entries kept in memory. Set to ``0`` to
+        disable the in-process cache.
+
+    persist : bool
+        Also store entries on disk.
+
+    cache_dir : str, optional
+        Overrides the default cache directory.
+    """
+    def __init__(self, maxsize=256, persist=False, cache_dir=None):
+        self.maxsize = maxsize
+        self.persist = persist
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __call__(self, kind, filename, compute, *args):
+        """
+        Get the ``kind`` metadata of ``filename`` from the cache or
+        compute it with ``compute()`` and cache it. ``args`` are any
+        additional arguments that the metadata depends on.
+        """
+        file_key = _file_key(filename)
+        if file_key is None:
+            return compute()
+
+        key = _key(kind, *file_key, *args)
+        try:
+            return deepcopy(self._get(key))
+        except KeyError:
+            pass
+
+        value = compute()
+        self._put(key, value)
+        return deepcopy(value)
+
+    def _path(self, key):
+        return cache_path('metadata', key + '.json', self.cache_dir)
+
+    def _get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        if not self.persist:
+            raise KeyError(key)
+        try:
+            with open(self._path(key)) as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            raise KeyError(key)
+        self._remember(key, value)
+        return value
+
+    def _put(self, key, value):
+        self._remember(key, value)
+        if not self.persist:
+            return
+        try:
+            filename = self._path(key)
+            tmp = f'{filename}.{os.getpid()}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(value, f)
+            os.replace(tmp, filename)
+        except (OSError, TypeError) as e:
+            warn(f'Unable to store metadata on disk: {e}')
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > max(self.maxsize, 0):
+                self._entries.popitem(last=False)
+
+
+# Used by get_info. Configure by setting its
+# attributes, e.g. ``rasterx.cache.metadata_cache.maxsize = 4096``.
+metadata_cache = MetadataCache()
+
+
+class MosaicCache:
+    """
+    On-disk cache of mosaics, as returned by :func:`~rasterx.core.read`.
+
+    Mosaics are stored as chunked NetCDF (or Zarr) files in the
+    ``mosaic`` subdirectory of the cache directory and are opened lazily
+    on a hit. The total size of the cache is bounded and the least
+    recently used mosaics are evicted first.
+
+    Parameters
+    ----------
+    maxbytes : int
+        Maximum total size of the cache in bytes.
+
+    format : {'netcdf', 'zarr'}
+        Storage format. Zarr requires the `zarr` package.
+
+    chunksize : int
+        Size of the (square) spatial chunks the mosaics are stored in.
+
+    cache_dir : str, optional
+        Overrides the default cache directory.
+    """
+    def __init__(self, maxbytes=8 * 2**30, format='netcdf', chunksize=512,
+                 cache_dir=None):
+        if format not in ('netcdf', 'zarr'):
+            raise ValueError(f"`format` must be 'netcdf' or 'zarr', "
+                             f"got {format!r}")
+        self.maxbytes = maxbytes
+        self.format = format
+        self.chunksize = chunksize
+        self.cache_dir = cache_dir
+
+    def _path(self, key):
+        ext = '.nc' if self.format == 'netcdf' else '.zarr'
+        return cache_path('mosaic', key + ext, self.cache_dir)
+
+    def get(self, key, chunks=None, mask_and_scale=False):
+        """
+        Lazily open the mosaic stored under ``key`` or return ``None``.
+        """
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)  # mark as recently used
+
+        if self.format == 'zarr':
+            return open_zarr(path, chunks=chunks,
+                             mask_and_scale=mask_and_scale)
+        return open_dataset(path, chunks=chunks,
+                            mask_and_scale=mask_and_scale)
+
+    def put(self, key, ds):
+        """
+        Store ``ds`` under ``key`` and evict old mosaics as needed.
+        """
+        path = self._path(key)
+        tmp = f'{path}.{os.getpid()}.tmp'
+
+        ds = ds.copy()
+        encoding = {}
+        for name, var in ds.variables.items():
+            var.encoding = {}
+            if (self.format == 'netcdf' and
+                    set(var.dims) >= {ds.geo._x, ds.geo._y}):
+                encoding[name] = {'chunksizes': tuple(
+                    min(size, self.chunksize) for size in var.shape
+                )}
+
+        try:
+            if self.format == 'zarr':
+                ds.to_zarr(tmp, mode='w')
+            else:
+                ds.to_netcdf(tmp, encoding=encoding)
+            os.replace(tmp, path)
+        except (OSError, ValueError, TypeError) as e:
+            warn(f'Unable to cache mosaic: {e}')
+            _remove(tmp)
+            return
+        self.evict()
+
+    def clear(self):
+        for path, _, _ in self._entries():
+            _remove(path)
+
+    def _entries(self):
+        # (path, size, last access) of all cached mosaics
+        directory = os.path.dirname(self._path('_'))
+        entries = []
+        for name in os.listdir(directory):
+            if name.endswith('.tmp'):
+                continue
+            path = os.path.join(directory, name)
+            entries.append((path, _size(path), os.stat(path).st_mtime))
+        return entries
+
+    def evict(self):
+        """
+        Remove the least recently used mosaics until the cache fits in
+        ``maxbytes``.
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        while entries and total > self.maxbytes:
+            path, size, _ = entries.pop(0)
+            _remove(path)
+            total -= size
+
+
+def _size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+
+def _remove(path):
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# Used by ``read(..., cache=True)``. Configure by setting its attributes,
+# e.g. ``rasterx.cache.mosaic_cache.maxbytes = 100 * 2**30``.
+mosaic_cache = MosaicCache()
@@ -1,55 +1,101 @@
 import numpy as np
 
-from xarray import Dataset, open_dataset, open_rasterio, merge
+from xarray import Dataset, open_dataset, open_rasterio, merge, decode_cf
 
 import os
+import threading
+from math import floor, ceil
 from glob import glob
+from contextlib import nullcontext
+from collections import deque
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from fnmatch import fnmatch
-from zipfile import ZipFile, BadZipFile
-import tarfile
-from tarfile import ReadError
 
 import gdal
 
+from rasterx.mosaicking import (mosaic, snap_to_grid, _grid_layout,
+                               _restore_dtypes)
+from rasterx.tile_index import get_tile_index
+from rasterx.cache import (metadata_cache, mosaic_cache, cache_path, _key,
+                           _file_key)
+from rasterx.remote import _is_url, _vsicurl
+from rasterx.archives import archive_members
+from rasterx.profiling import stage, logger
+
 from warnings import warn
 
 
-def _compressed(filename, substring=None):
-    contents = []
-    try:  # will work for various zip file formats
-        f_ = ZipFile(filename)
-        contents = f_.namelist()
-        prefix = 'zip'
-    except BadZipFile:
-        pass
-
-    try:  # will work for .tar, .tar.gz...
-        f_ = tarfile.open(filename)
-        contents = f_.getnames()
-        prefix = 'tar'
-    except ReadError:
-        pass
+def _members(filename, substring=None):
+    # {name: GDAL path} of the archive members matching substring
+    _, members = archive_members(filename)
 
     if substring is None:
         substring = '*'  # match everything
 
-    files = []
-    for item in contents:
+    matches = {}
+    for item, path in members.items():
         if item.startswith('._'):  # skip hidden files
             continue
 
         if fnmatch(item, substring) or substring in item:
-            files.append('/vsi{}/'.format(prefix) +
-                         os.path.join(filename, item))
-    return files
+            matches[item] = path
+    return matches
+
+
+def _compressed(filename, substring=None):
+    return list(_members(filename, substring).values())
 
 
 def get_info(filename, substring=None, format='text', **kwargs):
+    """
+    Get information on a raster file with :func:`gdal.Info`.
+
+    If ``filename`` is a compressed container, information on all the
+    raster files in it (optionally only those matching ``substring``)
+    is returned.
+
+    Results are cached by path, modification time and size of
+    ``filename`` and are reused until the file changes. See
+    :class:`~rasterx.cache.MetadataCache`.
+
+    Parameters
+    ----------
+    filename : str
+        Path to a raster file or a compressed container. Urls are read
+        through GDAL's ``/vsicurl/``.
+
+    substring : str, optional
+        See :func:`~.read`.
+
+    format : {'text', 'json'}
+        Format of the information returned.
+
+    Other keyword arguments are passed on to :func:`gdal.Info`.
+
+    Returns
+    -------
+    list
+        Information on each raster file found.
+    """
+    return metadata_cache(
+        'info', filename,
+        partial(_get_info, filename, substring, format, **kwargs),
+        substring, format, sorted(kwargs.items())
+    )
+
+
+def _gdal_info(filename, format='text', **kwargs):
+    with stage('info', filename=filename):
+        return gdal.Info(filename, format=format, **kwargs)
+
+
+def _get_info(filename, substring=None, format='text', **kwargs):
     errors = []
 
-    # check if file is a raster
+    # check if file is a raster, urls are read through /vsicurl/
     try:  # json format generates a TypeError if not a raster
-        info = gdal.Info(filename, format=format, **kwargs)
+        info = _gdal_info(_vsicurl(filename), format, **kwargs)
         if info:
             return [info]
     except TypeError:
@@ -63,7 +109,7 @@ def get_info(filename, substring=None, format='text', **kwargs):
         info = []
         for f in files:
             try:
-                info_ = gdal.Info(f, format=format, **kwargs)
+                info_ = _gdal_info(f, format, **kwargs)
                 if info_:
                     info.append(info_)
                 elif not info_:
@@ -74,10 +120,6 @@ def get_info(filename, substring=None, format='text', **kwargs):
             return info
 
     # file is not compressed or no raster was found in file
-    # try url...
-
-    # not implemented yet
-
     raise OSError(f'Could not find raster file in {filename}...\n'
                    'Collected messages from gdal:\n'
                   f'{errors}')
@@ -94,7 +136,7 @@ SOURCES = {
 
 
 def _get_tiles(path, x1, x2, y1, y2, template='AsterGDEM', ext='.nc',
-               lonlat=True, tilesize=1):
+               lonlat=True, tilesize=1, index=True):
     """
     This is a helper function for making up a mosaic. It generates a
     list of tile filenames that are needed for the stitching process.
@@ -128,6 +170,11 @@ def _get_tiles(path, x1, x2, y1, y2, template='AsterGDEM', ext='.nc',
         The left-, right-, bottom-, and top-most coordinates of the
         bounding box.
 
+        If ``x1 > x2`` (and ``lonlat``), the bounding box crosses the
+        antimeridian and only the tiles from ``x1`` to E179 and from
+        W180 to ``x2`` are returned, e.g. ``(177, -178, -19, -16)`` for
+        Fiji.
+
     template : {'AsterGDEM', 'SRTM'} or str
         `'AsterGDEM'` and `'SRTM'` are both undertood and have a known
         filename template. Pass a user-defined template to format.
@@ -142,55 +189,100 @@ def _get_tiles(path, x1, x2, y1, y2, template='AsterGDEM', ext='.nc',
 
     lonlat : bool
         By default x coordinates are treated as longitude and are
-        normalized between [W180, E179]. set to `False` to forgo this
-        normalization.
+        normalized between [W180, E179], and tiles beyond the poles are
+        not looked for. set to `False` to forgo this normalization.
 
     tilesize : float
         It is assumed that tiles are 1x1 degrees. Set to update this
         assumption. If a single value is passed, tile size is assumed to
         be the same in the x and y directions. Otherwise pass a tuple
         with ``x``, ``y`` values.
+
+    index : bool or 'info'
+        By default, tiles are looked up in a :class:`~.TileIndex` of
+        ``path``, which is built by scanning the directory once and is
+        cached in memory and on disk until the directory is modified.
+        See :func:`~rasterx.tile_index.get_tile_index`. Set to
+        ``'info'`` to also index files that do not match the template
+        by their footprint, which opens every such file once. Set to
+        ``False`` to glob for every tile instead.
     """
     if isinstance(tilesize, (tuple, list)):
         tsx, tsy = tilesize
     else:
         tsx = tsy = tilesize
 
-    # To get the SW corner coordinates of a tile with negative
-    # coordinates, subtract
-    y1 -= tsy if y1 < 0 else 0
-    x1 -= tsx if x1 < 0 else 0
+    # an extent that crosses the antimeridian
+    wrap = lonlat and x1 > x2
 
-    if x1 >= x2:
+    if x1 >= x2 and not wrap:
         raise ValueError('`x1` must be < `x2`')
     if y1 >= y2:
         raise ValueError('`y1` must be < `y2`')
 
-    yrange = range(int(y1), int(y2) + tsy)
-    xrange = range(int(x1), int(x2) + tsx)
+    # the x ranges of the extent, from west to east, split at the
+    # antimeridian
+    xranges = [(x1, x2)]
     if lonlat:
-        xrange = [_normalize_longitude(x) for x in xrange]
+        if wrap:  # east of x1 and west of x2
+            x2 += 360
+        pieces = [(max(x1 + shift, -180), min(x2 + shift, 180), shift)
+                  for shift in (-360, 0, 360)]
+        xranges = [(xa, xb) for xa, xb, shift in
+                   sorted(pieces, key=lambda p: p[0] - p[2]) if xa < xb]
+
+    # the SW corners of the tiles that intersect the extent
+    yrange = range(floor(y1 / tsy) * tsy, ceil(y2 / tsy) * tsy, tsy)
+    xrange = [x for xa, xb in xranges
+              for x in range(floor(xa / tsx) * tsx, ceil(xb / tsx) * tsx,
+                             tsx)]
+    if lonlat:
+        yrange = [y for y in yrange if -90 <= y < 90]
+        # each tile once, e.g. W180 for both -180 and 180
+        xrange = list(dict.fromkeys(_normalize_longitude(x)
+                                    for x in xrange))
 
     template = SOURCES.get(template, template) + ext
 
+    tile_index = None
+    if index or _is_url(path):  # urls can not be globbed
+        try:
+            tile_index = get_tile_index(path, template,
+                                        use_info=index == 'info')
+        except ValueError:  # template can not be indexed, use glob
+            pass
+
+    if tile_index is not None:
+        # one query, from the first to the last x range, i.e. across the
+        # antimeridian if the extent is split
+        tile_filenames = tile_index.query(xranges[0][0], xranges[-1][1],
+                                          y1, y2, (tsx, tsy))
+        missing = len(xrange) * len(yrange) - len(tile_filenames)
+        if missing > 0:
+            warn(f'Unable to find {missing} of the '
+                 f'{len(xrange) * len(yrange)} tiles in {path}...')
+        return tile_filenames
+
     tile_filenames = []
-    for y in yrange:
-        if y < 0:
+    for y_ in yrange:
+        if y_ < 0:
             y_sep = 'S'
-            y *= -1
+            y = -y_
         else:
             y_sep = 'N'
-        for x in xrange:
-            if x < 0:
+            y = y_
+        for x_ in xrange:
+            if x_ < 0:
                 x_sep = 'W'
-                x *= -1
+                x = -x_
             else:
                 x_sep = 'E'
+                x = x_
 
             glob_expression = template.format(
                 y_sep=y_sep, y=y, x_sep=x_sep, x=x
             )
-            files = glob(os.path.join(path, glob_expression))
+            files = sorted(glob(os.path.join(path, glob_expression)))
             if not files:
                 warn(f'Unable to find file {glob_expression}...')
             else:
@@ -199,35 +291,428 @@ def _get_tiles(path, x1, x2, y1, y2, template='AsterGDEM', ext='.nc',
     return tile_filenames
 
 
-def _readrasterfile(filename, substring=None):
-    # first try openning with xarray's open_dataset
-    try:
-        ds = open_dataset(filename)
+def _is_dir(path):
+    # a local directory or a url prefix (ending with '/') of tiles
+    return isinstance(path, str) and (
+        os.path.isdir(path) or (_is_url(path) and path.endswith('/'))
+    )
+
+
+def _window(ds, extent=None):
+    # trim lazily, before any data is read, so that only the pixels
+    # within extent are read from disk
+    if extent is None:
         return ds
+    with stage('trim'):
+        return ds.geo.trim(*extent)
+
 
-    # if that fails, try various VSI type files
-    # this is done by first trying to get some information on the file
-    except:
+def _read_netcdf(filename, substring=None, chunks=None, mask_and_scale=False):
+    ds = open_dataset(filename, chunks=chunks, mask_and_scale=mask_and_scale)
+    if mask_and_scale:
+        return ds
+
+    # keep the native dtype, but unpack packed (scaled) variables
+    packed = [name for name, var in ds.variables.items()
+              if {'scale_factor', 'add_offset'} & set(var.attrs)]
+    if packed:
+        decoded = decode_cf(ds[packed])
+        for name in packed:
+            ds[name] = decoded[name]
+    return ds
+
+
+def _read_gdal(filename, substring=None, chunks=None, mask_and_scale=False):
+    # urls are read through /vsicurl/, only the blocks read are fetched
+    return _open_rasterio([_vsicurl(filename)], chunks)
+
+
+def _read_archive(filename, substring=None, chunks=None,
+                  mask_and_scale=False):
+    members = _members(filename, substring)
+    if not members:
+        raise OSError(f'No files found in archive {filename}...')
+
+    # pick the rasters by extension, skipping e.g. readme files ...
+    files = [path for name, path in members.items()
+             if EXTENSIONS.get(_extension(name)) in ('netcdf', 'gdal')]
+    if not files:
+        # ... or let gdal tell rasters from other files
         infos = get_info(filename, substring, format='json')
-        files = []
-        for info in infos:
-            for f in info['files']:
-                files.append(f)
+        files = [info['files'][0] for info in infos]
 
     if len(files) > 1:
         _files = '\n'.join(files)
         warn( 'Found more than one raster file in container:\n'
              f'{_files}\n'
               'Try provide a `substring` to refine your selection...')
+    return _open_rasterio(files, chunks)
+
+
+# Readers, by name, take a filename, substring, chunks and mask_and_scale
+# and return a (lazy) Dataset. See register_reader.
+READERS = {
+    'netcdf': _read_netcdf,
+    'gdal': _read_gdal,
+    'archive': _read_archive,
+}
+
+EXTENSIONS = {
+    '.nc': 'netcdf', '.nc4': 'netcdf', '.cdf': 'netcdf', '.h5': 'netcdf',
+    '.tif': 'gdal', '.tiff': 'gdal', '.vrt': 'gdal', '.hgt': 'gdal',
+    '.img': 'gdal', '.dem': 'gdal', '.asc': 'gdal', '.jp2': 'gdal',
+    '.zip': 'archive', '.tar': 'archive', '.tar.gz': 'archive',
+    '.tgz': 'archive', '.tar.bz2': 'archive', '.tar.xz': 'archive',
+}
+
+# (offset, magic bytes, reader)
+MAGIC = [
+    (0, b'CDF\x01', 'netcdf'),
+    (0, b'CDF\x02', 'netcdf'),
+    (0, b'\x89HDF\r\n\x1a\n', 'netcdf'),
+    (0, b'II*\x00', 'gdal'),
+    (0, b'MM\x00*', 'gdal'),
+    (0, b'II+\x00', 'gdal'),
+    (0, b'MM\x00+', 'gdal'),
+    (0, b'PK\x03\x04', 'archive'),
+    (0, b'\x1f\x8b', 'archive'),
+    (257, b'ustar', 'archive'),
+]
+
+# readers that worked for extensions that are not in EXTENSIONS
+_LEARNED = {}
+
+
+def register_reader(name, reader, extensions=(), magic=()):
+    """
+    Register a reader for a raster format.
+
+    The reader of a file is picked once, by its extension or by the
+    magic bytes at the start of the file, so that files of a known
+    format are opened without probing any other reader. Files of
+    unknown format are tried with every reader in turn and the reader
+    that worked is remembered for their extension.
+
+    Parameters
+    ----------
+    name : str
+        Name of the reader. Registering an existing name replaces the
+        reader, e.g. ``'netcdf'``, ``'gdal'`` or ``'archive'``.
+
+    reader : callable
+        ``reader(filename, substring, chunks, mask_and_scale)`` returns
+        a (lazy) :class:`~xarray.Dataset`. See :func:`~.read` for the
+        arguments.
+
+    extensions : list of str
+        Extensions, e.g. ``'.grd'``, of files read with ``reader``.
+
+    magic : list of bytes or tuple
+        Magic bytes of files read with ``reader``, either ``bytes`` at
+        the start of the file or ``(offset, bytes)``.
+
+    Examples
+    --------
+    >>> def read_zarr(filename, substring, chunks, mask_and_scale):
+    ...     return xarray.open_zarr(filename, chunks=chunks,
+    ...                             mask_and_scale=mask_and_scale)
+    >>> register_reader('zarr', read_zarr, extensions=['.zarr'])
+    """
+    READERS[name] = reader
+    for ext in extensions:
+        EXTENSIONS[ext.lower()] = name
+    for item in magic:
+        offset, value = item if isinstance(item, tuple) else (0, item)
+        MAGIC.insert(0, (offset, value, name))
+
+
+def _extension(filename):
+    name = os.path.basename(filename.split('?')[0]).lower()
+    root, ext = os.path.splitext(name)
+    if ext in ('.gz', '.bz2', '.xz'):
+        ext = os.path.splitext(root)[1] + ext
+    return ext
+
+
+def _sniff(filename):
+    """
+    Name of the reader of ``filename``, from its extension or its magic
+    bytes, or ``None`` if the format is unknown.
+
+    URLs are read by GDAL, through ``/vsicurl/``, unless their extension
+    belongs to another reader that reads URLs, e.g. archives:
+    :func:`~xarray.open_dataset` does not read netCDF over HTTP.
+    """
+    ext = _extension(filename)
+    name = EXTENSIONS.get(ext, _LEARNED.get(ext))
+    if _is_url(filename):
+        return 'gdal' if name in (None, 'netcdf') else name
+    if name is not None:
+        return name
+
+    size = max(offset + len(value) for offset, value, _ in MAGIC)
+    try:
+        with open(filename, 'rb') as f:
+            head = f.read(size)
+    except OSError:  # e.g. a directory or a /vsi* path
+        return None
+    for offset, value, name in MAGIC:
+        if head[offset:offset + len(value)] == value:
+            return name
+    return None
+
+
+def _readrasterfile(filename, substring=None, chunks=None, extent=None,
+                    mask_and_scale=False):
+    name = _sniff(filename)
+    errors = []
+    if name is not None:
+        try:
+            ds = READERS[name](filename, substring, chunks, mask_and_scale)
+        except (OSError, ValueError, TypeError, RuntimeError) as e:
+            errors.append(f'{name}: {e}')  # wrong guess, probe the others
+        else:
+            return _window(ds, extent)
+
+    # unknown format, try every reader
+    for name_, reader in READERS.items():
+        if name_ == name:
+            continue
+        try:
+            ds = reader(filename, substring, chunks, mask_and_scale)
+        except (OSError, ValueError, TypeError, RuntimeError) as e:
+            errors.append(f'{name_}: {e}')
+            continue
+        ext = _extension(filename)
+        if ext and ext not in EXTENSIONS:
+            _LEARNED[ext] = name_
+        return _window(ds, extent)
+
+    raise OSError(f'Could not read raster file {filename}...\n'
+                   'Collected messages from the readers:\n'
+                  f'{errors}')
+
+
+def _open_rasterio(files, chunks=None):
+    # every band of every file becomes a variable
     ds = Dataset()
     for j, f in enumerate(files):
-        for i, band in enumerate(open_rasterio(f), 1):
+        for i, band in enumerate(open_rasterio(f, chunks=chunks), 1):
             ds[f'band{j}_{i}'] = band
     ds.attrs = band.attrs
     return ds
 
 
-def read(path, substring=None, extent=None, **kwargs):
+def build_vrt(files, filename=None, substring=None, **kwargs):
+    """
+    Build a GDAL virtual mosaic (VRT) over raster files.
+
+    Nothing is read or copied, the VRT only references the files, so
+    that GDAL serves just the pixels of the windows that are read from
+    it.
+
+    Parameters
+    ----------
+    files : list
+        Paths to raster files or compressed containers. Rasters inside
+        containers are referenced through ``/vsizip/`` or ``/vsitar/``,
+        nothing is extracted. Where files overlap, later files take
+        precedence.
+
+    filename : str, optional
+        Where to write the VRT. By default, it is written to the ``vrt``
+        subdirectory of the cache directory (see
+        :func:`~rasterx.cache.cache_path`) and reused for as long as
+        none of the ``files`` changes.
+
+    substring : str, optional
+        Limit the rasters used from compressed containers. See
+        :func:`~.read`.
+
+    Other keyword arguments are passed on to :func:`gdal.BuildVRT`.
+
+    Returns
+    -------
+    str
+        The filename of the VRT.
+    """
+    if filename is None:
+        filename = cache_path('vrt', _key(
+            *(_file_key(f) or f for f in files),
+            substring, sorted(kwargs.items())
+        ) + '.vrt')
+        if os.path.exists(filename):
+            return filename
+
+    sources = []
+    for f in files:
+        if os.path.isfile(f) or _is_url(f):
+            members = _compressed(f, substring)
+        else:
+            members = []
+        sources.extend(members or [_vsicurl(f)])
+
+    vrt = gdal.BuildVRT(filename, sources, **kwargs)
+    if vrt is None:
+        raise OSError(f'Could not build VRT {filename}...\n'
+                       'Collected messages from gdal:\n'
+                      f'{gdal.GetLastErrorMsg()}')
+    vrt.FlushCache()
+    del vrt  # closing the dataset writes the VRT to disk
+    return filename
+
+
+def _native_resolution(filename, substring=None):
+    # (dx, dy) of the first raster in filename
+    transform = get_info(filename, substring, format='json')[0]['geoTransform']
+    return transform[1], transform[5]
+
+
+def _all_tiles(path, template='AsterGDEM', ext='.nc', **kwargs):
+    # every tile in a directory, e.g. to build a global mosaic
+    template = SOURCES.get(template, template) + ext
+    return get_tile_index(path, template).filenames()
+
+
+_NETCDF_LOCK = threading.Lock()
+
+
+def _lock(filename):
+    # HDF5, under the netCDF reader, is not thread-safe: netCDF tiles are
+    # opened, decoded and closed one at a time within a process
+    return _NETCDF_LOCK if _sniff(filename) == 'netcdf' else nullcontext()
+
+
+def _read_tile(filename, substring=None, chunks=None, extent=None,
+               mask_and_scale=False):
+    with _lock(filename):
+        with stage('open', filename=filename):
+            tile = _readrasterfile(filename, substring, chunks, extent,
+                                   mask_and_scale)
+        tile = _decode(tile, filename, chunks)
+        if chunks is None and tile is not None:
+            tile.close()  # rather than later, by the GC of another thread
+    return tile
+
+
+def _decode(tile, filename, chunks=None):
+    if 0 in tile.sizes.values():  # tile is outside of extent
+        return None
+
+    if chunks is not None:
+        return tile
+
+    # decode here, so that it happens in the worker
+    with stage('decode', filename=filename) as frame:
+        tile = tile.load()
+        frame.nbytes = tile.nbytes
+    return tile
+
+
+ENGINES = (None, 'vrt')
+
+POOLS = {
+    'thread': ThreadPoolExecutor,
+    'process': ProcessPoolExecutor,
+}
+
+
+def _imap(func, *iterables, workers=1, pool='thread'):
+    """
+    Like :func:`map`, optionally in a pool of ``workers``, keeping a
+    bounded number of tasks in flight so that results that are not
+    consumed yet do not pile up in memory.
+    """
+    if workers is None or workers < 0:
+        workers = os.cpu_count()
+    if workers <= 1:
+        yield from map(func, *iterables)
+        return
+
+    try:
+        Executor = POOLS[pool]
+    except KeyError:
+        raise ValueError(
+            f'`pool` must be one of {list(POOLS)}, got {pool!r}'
+        )
+    with Executor(workers) as executor:
+        pending = deque()
+        for args in zip(*iterables):
+            pending.append(executor.submit(func, *args))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _read_tiles(filenames, substring=None, chunks=None, extent=None,
+                workers=1, pool='thread', mask_and_scale=False):
+    """
+    Open and decode a list of tiles, optionally in parallel.
+
+    Tiles are returned in the order of ``filenames``. Only the window of
+    each tile that falls within ``extent`` is read and tiles that fall
+    outside of ``extent`` are dropped. If reading a
+    tile fails, the error is raised just as it would be when reading
+    the tiles one after the other.
+
+    Parameters
+    ----------
+    filenames : list
+        Paths to the tiles.
+
+    substring, chunks, extent, mask_and_scale :
+        See :func:`~.read`.
+
+    workers : int, optional
+        Number of workers used to open and decode the tiles. ``None``
+        or ``-1`` uses all available cores.
+
+    pool : {'thread', 'process'}
+        The type of worker pool. Threads are cheap and work well with
+        GDAL readers, which release the GIL. netCDF tiles are read one
+        at a time by threads, as HDF5 is not thread-safe. Processes
+        avoid the GIL and read netCDF tiles in parallel, at the expense
+        of having to pickle the tiles back.
+    """
+    reader = partial(_read_tile, substring=substring, chunks=chunks,
+                     extent=extent, mask_and_scale=mask_and_scale)
+
+    if workers is None or workers < 0:
+        workers = os.cpu_count()
+    tiles = _imap(reader, filenames, workers=min(workers, len(filenames)),
+                  pool=pool)
+    return [tile for tile in tiles if tile is not None]
+
+
+def _merge_tiles(tiles, overlap='first', snap=True, lazy=False):
+    # stitch tiles into a single dataset, see read()
+    with stage('merge', tiles=len(tiles)) as frame:
+        if snap:
+            tiles = snap_to_grid(tiles)
+        if _grid_layout(tiles) is not None:
+            ds = mosaic(tiles, overlap)
+        else:
+            ds = _restore_dtypes(merge(tiles), tiles[0])
+        if not lazy:
+            frame.nbytes = ds.nbytes
+    return ds
+
+
+def _close_all(datasets):
+    for ds in datasets:
+        ds.close()
+
+
+def _add_validity(ds):
+    valid = ds.geo.validity()
+    return ds.merge(valid.rename({name: f'{name}_valid' for name in valid}))
+
+
+def read(path, substring=None, extent=None, chunks=None, workers=1,
+         pool='thread', overlap='first', snap=True, mask_and_scale=False,
+         validity=False, engine=None, cache=False, resolution=None,
+         decimate=None, resampling='nearest', **kwargs):
     """
     Read a raster file to a :class:`~xarray.Dataset` object.
 
@@ -247,6 +732,13 @@ def read(path, substring=None, extent=None, **kwargs):
         Alternatively, an explicit list of paths to files can be
         provided for merging.
 
+        Remote files and directories are given as http(s) urls (urls of
+        directories must end with ``/``) and are read through GDAL's
+        ``/vsicurl/`` with range requests, i.e. only the blocks of the
+        windows within ``extent`` are fetched. See
+        :func:`rasterx.remote.configure` to tune the block cache and
+        connection reuse.
+
     substring : str, optional
         If path points to a compressed container, that may contain more
         than one file, this ``substring`` can be used to limit the files
@@ -256,10 +748,115 @@ def read(path, substring=None, extent=None, **kwargs):
         If extent is not ``None``, it is used to trim the data to the
         extend bound by the tuple ``(x1, x2, y1, y2)`` defining the
         left-, right-, bottom-, and top-most coordinates of the
-        bounding box.
+        bounding box. Only the pixels within the extent are read from
+        each file.
 
         Extend is needed if ``path`` is a directory.
 
+        An extent with ``x1 > x2`` crosses the antimeridian, e.g.
+        ``(177, -178, -19, -16)``. Only the tiles (or pixels) on either
+        side of it are read and the mosaic has a continuous longitude
+        from ``x1`` to ``x2 + 360``. See :meth:`~.GeoAccessor.trim`.
+
+    chunks : int, tuple, dict, 'auto' or None, optional
+        If ``chunks`` is not ``None``, data is not loaded into memory.
+        Instead, each file (or tile) is opened as a dask-backed
+        :class:`~xarray.Dataset` with the given chunk sizes (see
+        :func:`xarray.open_dataset`) and the result is returned lazily.
+        Tiles on a common regular grid are placed block by block, so
+        that the chunks of the mosaic end at tile boundaries. Use
+        ``chunks=-1`` to have a single chunk per tile.
+
+        Only the chunks that survive the trim to ``extent`` are ever
+        read. Requires `dask`_.
+
+    workers : int, optional
+        Number of workers used to open and decode tiles in parallel
+        when ``path`` is a directory or a list of files. By default,
+        tiles are read one after the other. ``None`` or ``-1`` uses all
+        available cores. Tiles are always merged in the same order,
+        regardless of the number of workers.
+
+    pool : {'thread', 'process'}
+        The type of worker pool used if ``workers > 1``. HDF5 is not
+        thread-safe, so threads read netCDF tiles one at a time; use
+        ``'process'`` to read them in parallel. netCDF datasets read
+        lazily (with ``chunks``) are best closed (see
+        :meth:`~xarray.Dataset.close`) when done with, as HDF5 may crash
+        if they are garbage collected by one thread while another reads.
+
+    overlap : {'first', 'last', 'mean'}
+        How to resolve pixels covered by more than one tile, e.g. the
+        shared edge row and column of AsterGDEM and SRTM tiles. Only
+        used when tiles share a common regular grid, in which case they
+        are stitched with :func:`~rasterx.mosaicking.mosaic`, lazily if
+        ``chunks`` is given. Otherwise, tiles are merged with
+        :func:`xarray.merge`.
+
+    snap : bool
+        By default, the coordinates of all tiles are snapped to a
+        shared pixel lattice before merging, removing float drift
+        between tiles, so that shared edges are joined exactly. See
+        :func:`~rasterx.mosaicking.snap_to_grid`.
+
+    mask_and_scale : bool
+        By default, the native dtype of the data (e.g. AsterGDEM and
+        SRTM int16) is kept. Missing values and gaps between tiles are
+        marked with the nodata value of each variable (e.g.
+        ``_FillValue``), which takes half (or a quarter) of the memory
+        of float data. Packed netCDF variables (with ``scale_factor``
+        or ``add_offset``) are always unpacked to float, with ``NaN``
+        for missing values. Set to ``True`` to have all netCDF data
+        decoded by :func:`xarray.open_dataset`, i.e. missing values
+        replaced by ``NaN``, promoting integer data to float.
+
+    validity : bool
+        If ``True``, a boolean ``<name>_valid`` variable is added for
+        every spatial data variable, marking pixels that are neither
+        ``NaN`` nor nodata. See :meth:`~.GeoAccessor.validity`.
+
+    engine : {None, 'vrt'}
+        By default, tiles are read and stitched in Python. With
+        ``'vrt'``, a GDAL virtual mosaic of the files is built instead
+        (see :func:`~.build_vrt`) and opened as a lazily read
+        :class:`~xarray.Dataset`: data is only read from the tiles when
+        it is accessed and only for the window that is accessed. If
+        ``path`` is a directory and ``extent`` is ``None``, the mosaic
+        covers all the tiles in the directory, i.e. it can be opened
+        once and trimmed many times cheaply::
+
+            dem = read('/data/AsterGDEM', engine='vrt')
+            topo = dem.geo.trim(86.5, 87.5, 27.5, 28.5).load()
+
+        Only ``overlap='first'`` or ``'last'`` is supported.
+
+    cache : bool or :class:`~rasterx.cache.MosaicCache`
+        If ``True``, the result is stored on disk in the default
+        :class:`~rasterx.cache.MosaicCache` (or the one given) and
+        repeated reads of the same files, with the same ``substring``,
+        ``extent`` and reader options, open the stored mosaic lazily
+        instead of reading and merging the tiles again. Modifying any
+        of the files invalidates the stored mosaic.
+
+    resolution : float or tuple, optional
+        Read the data at a coarser resolution ``(dx, dy)`` (in the
+        units of the coordinates). The data is read through a GDAL
+        virtual mosaic (``engine='vrt'``) at the target resolution, so
+        that GDAL uses the overviews of the files where they exist (see
+        :func:`~rasterx.overviews.build_overviews`) or reads with a
+        decimating window otherwise. Full resolution data is never
+        loaded.
+
+    decimate : int, optional
+        Like ``resolution``, given as a factor of the native resolution
+        of the (first) file, e.g. ``decimate=16`` reads 1/256 of the
+        pixels.
+
+    resampling : str
+        Resampling algorithm used with ``resolution`` or ``decimate``,
+        e.g. ``'nearest'``, ``'average'``, ``'bilinear'``. See
+        :func:`gdal.BuildVRT`.
+
     Notes
     -----
     If ``path`` is a directory, list of filenames that are needed for
@@ -310,36 +907,277 @@ def read(path, substring=None, extent=None, **kwargs):
         be the same in the x and y directions. Otherwise pass a tuple
         with ``x``, ``y`` values.
 
+    index : bool or 'info'
+        By default, tiles are looked up in a cached spatial index of the
+        directory instead of globbing for every tile. Set to ``'info'``
+        to also index files that do not match the template by their
+        footprint or to ``False`` to disable. See
+        :func:`~rasterx.core._get_tiles`.
+
 
     .. _fnmatch:
         https://docs.python.org/3.8/library/fnmatch.html#module-fnmatch
+
+    .. _dask:
+        https://docs.dask.org/en/latest/
     """
+    if engine not in ENGINES:
+        raise ValueError(f'`engine` must be one of {ENGINES}, got {engine!r}')
+
+    if resolution is not None or decimate is not None:
+        engine = 'vrt'  # let GDAL do the downsampling
+
     try:
-        if os.path.isdir(path):
-            try:
-                x1, x2, y1, y2 = extent
-            except TypeError:
-                raise ValueError(
-                    '`path` is a directory. Indicate `extent=(x1, x2, y1, y2)`'
-                )
-            path = _get_tiles(path, x1, x2, y1, y2, **kwargs)
+        if _is_dir(path):
+            with stage('discover', path=path):
+                if engine == 'vrt' and extent is None:
+                    path = _all_tiles(path, **kwargs)
+                else:
+                    try:
+                        x1, x2, y1, y2 = extent
+                    except TypeError:
+                        raise ValueError(
+                            '`path` is a directory. '
+                            'Indicate `extent=(x1, x2, y1, y2)`'
+                        )
+                    path = _get_tiles(path, x1, x2, y1, y2, **kwargs)
     except TypeError:  # if error than it is probably a list
         pass
-    if isinstance(path, (list, tuple)):
-        files = '\n'.join(path)
-        print(f'Reading {len(path)} tiles:\n{files}')
-        tiles = []
-        for f in path:
-            tile = _readrasterfile(f, substring)
-            tiles.append(tile)
 
-        print('Merging tiles... be patient, this may take some time...')
-        ds = merge(tiles)
+    if cache:
+        if cache is True:
+            cache = mosaic_cache
+        files = [path] if isinstance(path, str) else path
+        key = _key(
+            *(_file_key(f) or f for f in files), substring, extent,
+            overlap, snap, mask_and_scale, validity, engine, resolution,
+            decimate, resampling, sorted(kwargs.items())
+        )
+        ds = cache.get(key, chunks, mask_and_scale)
+        if ds is not None:
+            return ds
+
+    if engine == 'vrt':
+        if overlap not in ('first', 'last'):
+            raise ValueError("`engine='vrt'` supports `overlap='first'` "
+                             "or `'last'` only")
+        if isinstance(path, str):
+            path = [path]
+        # in a VRT, later files take precedence
+        if overlap == 'first':
+            path = path[::-1]
+        options = {}
+        if decimate is not None:
+            dx, dy = _native_resolution(path[0], substring)
+            resolution = decimate * abs(dx), decimate * abs(dy)
+        if resolution is not None:
+            if not isinstance(resolution, (tuple, list)):
+                resolution = resolution, resolution
+            options = dict(resolution='user', xRes=resolution[0],
+                           yRes=resolution[1], resampleAlg=resampling)
+        vrt = build_vrt(path, substring=substring, **options)
+        ds = _window(_open_rasterio([vrt], chunks), extent)
+
+    elif isinstance(path, (list, tuple)):
+        logger.info('Reading %d tiles:\n%s', len(path), '\n'.join(path))
+        tiles = _read_tiles(path, substring, chunks, extent, workers, pool,
+                            mask_and_scale)
+        if not tiles:
+            raise ValueError('None of the tiles intersect with `extent`...')
+
+        logger.info('Merging %d tiles...', len(tiles))
+        ds = _merge_tiles(tiles, overlap, snap, lazy=chunks is not None)
 
     else:
-        ds = _readrasterfile(path, substring=None)
+        with stage('open', filename=path):
+            ds = _readrasterfile(path, substring=substring, chunks=chunks,
+                                 extent=extent, mask_and_scale=mask_and_scale)
+        tiles = [ds]
 
-    if extent is not None:
-        ds = ds.geo.trim(*extent)
+    if validity:
+        ds = _add_validity(ds)
+
+    if engine != 'vrt' and not any(ds is tile for tile in tiles):
+        # ds.close() closes the files that lazy data is read from
+        ds.set_close(partial(_close_all, tiles))
+
+    if cache:
+        cache.put(key, ds)
 
     return ds
+
+
+def _union(extents, bounds):
+    """
+    Bounding box of the parts of ``extents`` that fall within the
+    ``(x1, x2, y1, y2)`` bounds of a tile, or ``None``. Extents that
+    cross the antimeridian (``x1 > x2``) are split on either side of
+    it, like in :func:`_get_tiles` and :meth:`~.GeoAccessor.trim`.
+    """
+    X1, X2 = sorted(bounds[:2])
+    boxes = []
+    for x1, x2, y1, y2 in extents:
+        parts = [(x1, x2)]
+        if x1 > x2:
+            parts = [(x1, x2 + 360), (x1 - 360, x2)]
+        for x1_, x2_ in parts:
+            x1_, x2_ = max(x1_, X1), min(x2_, X2)
+            if x1_ < x2_:
+                boxes.append((x1_, x2_, y1, y2))
+    if not boxes:
+        return None
+    x1, x2, y1, y2 = zip(*boxes)
+    return min(x1), max(x2), min(y1), max(y2)
+
+
+def _read_union(filename, extents, substring=None, mask_and_scale=False):
+    # decode the window of a tile that covers all of extents, once
+    with _lock(filename):
+        with stage('open', filename=filename):
+            tile = _readrasterfile(filename, substring,
+                                   mask_and_scale=mask_and_scale)
+        with tile:
+            extent = _union(extents, tile.geo.extent)
+            if extent is None:
+                return None
+            return _decode(_window(tile, extent), filename)
+
+
+def read_many(path, extents, substring=None, workers=1, pool='thread',
+              overlap='first', snap=True, mask_and_scale=False,
+              validity=False, generator=False, **kwargs):
+    """
+    Read many extents from the same files, opening every file once.
+
+    Calling :func:`read` for every extent opens and decodes a tile once
+    for every extent that falls in it. Instead, the union of the tiles
+    needed by all extents is computed first and every tile is opened
+    and decoded once, for the window that covers all the extents that
+    fall in it. The windows of each extent are then cut from the decoded
+    tiles and stitched. A decoded tile is released as soon as the last
+    extent that needs it is done, so the cost scales with the number of
+    distinct tiles rather than with extents × tiles.
+
+    If ``path`` is a single file, every extent is read on its own, just
+    like :func:`read` does, so that distant extents do not decode the
+    whole file.
+
+    Parameters
+    ----------
+    path : str, list
+        Path to a file, a list of files or a directory of tiles. See
+        :func:`read`.
+
+    extents : list of tuple
+        The ``(x1, x2, y1, y2)`` extents to read.
+
+    workers : int, optional
+        Number of workers used to open and decode tiles in parallel.
+        ``None`` or ``-1`` uses all available cores.
+
+    generator : bool
+        By default, a list of datasets is returned. Set to ``True`` to
+        get a generator that yields the datasets one by one, in the order
+        of ``extents``, keeping only the tiles that are still needed in
+        memory. With ``workers > 1``, tiles are decoded ahead of time.
+
+    substring, pool, overlap, snap, mask_and_scale, validity :
+        See :func:`read`.
+
+    Other Parameters
+    ----------------
+    template, ext, lonlat, tilesize, index :
+        Used to find the tiles if ``path`` is a directory. See
+        :func:`read`.
+
+    Returns
+    -------
+    list or generator of :class:`~xarray.Dataset`
+        One dataset for every extent.
+
+    Examples
+    --------
+    >>> extents = [(86.1, 86.2, 27.1, 27.2), (86.3, 86.4, 27.1, 27.2)]
+    >>> for ds in read_many('/data/AsterGDEM', extents, generator=True):
+    ...     process(ds)
+    """
+    extents = [tuple(extent) for extent in extents]
+    if _is_dir(path):
+        with stage('discover', path=path):
+            needed = [_get_tiles(path, *extent, **kwargs)
+                      for extent in extents]
+    elif isinstance(path, str):
+        needed = None
+    else:
+        needed = [list(path)] * len(extents)
+
+    if needed is None:
+        results = _read_each(path, extents, substring, workers, pool,
+                             mask_and_scale, validity)
+    else:
+        results = _read_many(extents, needed, substring, workers, pool,
+                             overlap, snap, mask_and_scale, validity)
+    if generator:
+        return results
+    return list(results)
+
+
+def _read_each(filename, extents, substring=None, workers=1,
+               pool='thread', mask_and_scale=False, validity=False):
+    # the window of every extent in a single file, like read() does
+    reader = partial(_read_tile, filename, substring, None,
+                     mask_and_scale=mask_and_scale)
+    for extent, ds in zip(extents, _imap(reader, extents, workers=workers,
+                                         pool=pool)):
+        if ds is None:
+            raise ValueError(
+                f'{filename} does not intersect with extent {extent}...'
+            )
+        if validity:
+            ds = _add_validity(ds)
+        yield ds
+
+
+def _read_many(extents, needed, substring=None, workers=1, pool='thread',
+               overlap='first', snap=True, mask_and_scale=False,
+               validity=False):
+    # the extents every tile is needed by, in order of first use
+    users = {}
+    for n, filenames in enumerate(needed):
+        for filename in filenames:
+            users.setdefault(filename, []).append(n)
+    filenames = list(users)
+    windows = [[extents[n] for n in users[f]] for f in filenames]
+    reader = partial(_read_union, substring=substring,
+                     mask_and_scale=mask_and_scale)
+
+    # tiles are decoded in order of first use, a few ahead at most
+    decoded_tiles = zip(filenames, _imap(reader, filenames, windows,
+                                         workers=workers, pool=pool))
+    remaining = {f: len(users[f]) for f in filenames}
+    decoded = {}
+    for extent, filenames in zip(extents, needed):
+        while any(f not in decoded for f in filenames):
+            filename, tile = next(decoded_tiles)
+            decoded[filename] = tile
+
+        tiles = []
+        for filename in filenames:
+            tile = decoded[filename]
+            remaining[filename] -= 1
+            if not remaining[filename]:
+                del decoded[filename]
+            if tile is None:
+                continue
+            tile = _window(tile, extent)
+            if 0 not in tile.sizes.values():
+                tiles.append(tile)
+
+        if not tiles:
+            raise ValueError(
+                f'None of the tiles intersect with extent {extent}...'
+            )
+        ds = _merge_tiles(tiles, overlap, snap)
+        if validity:
+            ds = _add_validity(ds)
+        yield ds
@@ -1,44 +1,165 @@
-from xarray import Dataset, register_dataset_accessor
+from xarray import Dataset, Variable, register_dataset_accessor, concat
 import numpy as np
+from collections import namedtuple
 from warnings import warn
 
+from rasterx.utils import _is_nan, _fill_value, _gap_fill
+from rasterx.blocks import BlockWriter, iter_windows
+from rasterx.terrain import derive
+
+# tolerance, in pixels, when converting coordinates to pixel indices
+EPS = 1e-6
+
+
+def _is_regular(coord, d, rtol=1e-6):
+    if coord.size < 2:
+        return False
+    return np.allclose(np.diff(coord), d, rtol=rtol, atol=0)
+
+
+def _interp_index(c, coord):
+    # fractional index of c in a monotonic, irregular coordinate
+    index = np.arange(coord.size)
+    if coord.size > 1 and coord[-1] < coord[0]:
+        return np.interp(c, coord[::-1], index[::-1])
+    return np.interp(c, coord, index)
+
+
+def _spacing(coord):
+    if coord.size < 2:
+        return np.nan
+    return coord[1] - coord[0]
+
+
+class Grid(namedtuple('Grid', 'xdim ydim nx ny x0 y0 dx dy regular')):
+    """
+    Compact description of the spatial grid of a dataset.
+
+    Attributes
+    ----------
+    xdim, ydim : str
+        Names of the spatial dimensions.
+
+    nx, ny : int
+        Number of pixels along each dimension.
+
+    x0, y0 : float
+        Coordinates of the center of the first pixel.
+
+    dx, dy : float
+        Grid spacing, negative for decreasing coordinates.
+
+    regular : bool
+        ``True`` if both coordinates are evenly spaced. Otherwise,
+        ``x0``, ``y0``, ``dx`` and ``dy`` only describe the first pixel.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_coords(cls, xdim, ydim, x, y):
+        dx, dy = _spacing(x), _spacing(y)
+        regular = _is_regular(x, dx) and _is_regular(y, dy)
+        x0 = x[0] if x.size else np.nan
+        y0 = y[0] if y.size else np.nan
+        return cls(xdim, ydim, x.size, y.size, x0, y0, dx, dy, regular)
+
+    @property
+    def shape(self):
+        return self.ny, self.nx
+
+    @property
+    def transform(self):
+        """
+        GDAL-style affine transform ``(x, dx, 0, y, 0, dy)`` of the
+        corner of the first pixel (regular grids only).
+        """
+        return (self.x0 - 0.5 * self.dx, self.dx, 0.0,
+                self.y0 - 0.5 * self.dy, 0.0, self.dy)
+
+    def window(self, i, j, nx, ny):
+        """
+        The grid of the ``nx`` by ``ny`` window starting at pixel
+        ``(i, j)`` (regular grids only).
+        """
+        return self._replace(nx=nx, ny=ny, x0=self.x0 + i * self.dx,
+                             y0=self.y0 + j * self.dy)
+
 
 @register_dataset_accessor('geo')
 class GeoAccessor:
     def __init__(self, xarray_obj):
         self._obj = xarray_obj
+        self._grid = None
         # figure out the spatial coords
         try:
             self._set_spatial_coord(*self._get_spatial_coords())
         except TypeError:
             pass
 
-        self.dx = self.x.data[1] - self.x.data[0]
-        self.dy = self.y.data[1] - self.y.data[0]
+    @property
+    def grid(self):
+        """
+        The :class:`Grid` of the dataset.
+
+        It is computed on first access and reused by :attr:`extent`,
+        :meth:`trim`, :meth:`xy_to_index`, :meth:`index_to_xy`, etc.
+        as long as the spatial coordinates are not replaced.
+        """
+        variables = self._obj.variables
+        coords = variables[self._x], variables[self._y]
+        if (self._grid is None or
+                any(a is not b for a, b in zip(coords, self._grid_coords))):
+            self._grid = Grid.from_coords(self._x, self._y,
+                                          coords[0].values, coords[1].values)
+            self._grid_coords = coords
+        return self._grid
+
+    def _set_grid(self, grid):
+        # attach a grid that is already known, e.g. after trimming
+        variables = self._obj.variables
+        self._grid = grid
+        self._grid_coords = variables[self._x], variables[self._y]
+
+    @property
+    def dx(self):
+        return self.grid.dx
+
+    @property
+    def dy(self):
+        return self.grid.dy
 
     @property
     def extent(self):
+        grid = self.grid
+        if grid.regular:
+            x1, y1 = grid.x0, grid.y0
+            x2 = grid.x0 + (grid.nx - 1) * grid.dx
+            y2 = grid.y0 + (grid.ny - 1) * grid.dy
+        else:
+            x1, x2 = self.x.data[0], self.x.data[-1]
+            y1, y2 = self.y.data[0], self.y.data[-1]
         return (
-            self.x.data[0] - 0.5 * self.dx,
-            self.x.data[-1] + 0.5 * self.dx,
-            self.y.data[0] - 0.5 * self.dy,
-            self.y.data[-1] + 0.5 * self.dy
+            x1 - 0.5 * grid.dx,
+            x2 + 0.5 * grid.dx,
+            y1 - 0.5 * grid.dy,
+            y2 + 0.5 * grid.dy
         )
 
     def _get_spatial_coords(self):
         for var in self._obj.values():
             if 'x' in var.dims and 'y' in var.dims:
-                return var.dims
+                return 'y', 'x'
 
             if 'lon' in var.dims and 'lat' in var.dims:
-                return var.dims
+                return 'lat', 'lon'
 
-            warn('Not sure which coordinates are spatial. Try setting them...')
-            return None, None
+        warn('Not sure which coordinates are spatial. Try setting them...')
+        return None
 
     def _set_spatial_coord(self, y, x):
         self._x = x
         self._y = y
+        self._grid = None
 
     @property
     def x(self):
@@ -54,6 +175,333 @@ class GeoAccessor:
     def set_y(self, y):
         self._obj[self._y] = y
 
+    @property
+    def is_regular(self):
+        """
+        ``True`` if both spatial coordinates are evenly spaced.
+        """
+        return self.grid.regular
+
+    def xy_to_index(self, x, y, fractional=False):
+        """
+        Convert coordinates to pixel indices.
+
+        Parameters
+        ----------
+        x, y : float or array-like
+            Coordinates to convert. Arrays are broadcast against each
+            other.
+
+        fractional : bool
+            By default, the indices of the nearest pixels are returned.
+            Set to ``True`` to get fractional pixel indices, e.g. for
+            interpolation.
+
+        Returns
+        -------
+        i, j : :class:`~numpy.ndarray`
+            Column (x) and row (y) indices. Coordinates outside the grid
+            map to indices outside ``[0, nx)`` or ``[0, ny)`` on a regular
+            grid and are clipped to the edges otherwise.
+        """
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float),
+                                   np.asarray(y, dtype=float))
+        grid = self.grid
+        if grid.regular:
+            i = (x - grid.x0) / grid.dx
+            j = (y - grid.y0) / grid.dy
+        else:
+            i = _interp_index(x, self.x.data)
+            j = _interp_index(y, self.y.data)
+
+        if fractional:
+            return i, j
+        return (np.floor(i + 0.5).astype(int),
+                np.floor(j + 0.5).astype(int))
+
+    def index_to_xy(self, i, j):
+        """
+        Convert (possibly fractional) pixel indices to coordinates.
+
+        Parameters
+        ----------
+        i, j : float or array-like
+            Column (x) and row (y) indices. Arrays are broadcast against
+            each other.
+
+        Returns
+        -------
+        x, y : :class:`~numpy.ndarray`
+        """
+        i, j = np.broadcast_arrays(np.asarray(i, dtype=float),
+                                   np.asarray(j, dtype=float))
+        grid = self.grid
+        if grid.regular:
+            return grid.x0 + i * grid.dx, grid.y0 + j * grid.dy
+        return (np.interp(i, np.arange(grid.nx), self.x.data),
+                np.interp(j, np.arange(grid.ny), self.y.data))
+
+    def sample(self, x, y, method='nearest'):
+        """
+        Sample the spatial data variables at points.
+
+        The points are converted to (fractional) pixel indices with
+        :meth:`xy_to_index` and all of them are looked up at once. Only
+        the pixels within the bounding box of the points are loaded.
+
+        Parameters
+        ----------
+        x, y : float or array-like
+            Coordinates of the points. Arrays are broadcast against each
+            other and flattened.
+
+        method : {'nearest', 'bilinear'}
+            ``'nearest'`` takes the value of the nearest pixel and keeps
+            the dtype of the data. ``'bilinear'`` interpolates between
+            the four surrounding pixels and returns floats. Points next
+            to a nodata pixel interpolate to ``NaN``.
+
+        Returns
+        -------
+        :class:`~xarray.Dataset`
+            The sampled variables along a new ``points`` dimension, with
+            the coordinates of the points. Points outside the grid get
+            the nodata value of the variable or ``NaN``.
+        """
+        if method not in ('nearest', 'bilinear'):
+            raise ValueError(f"`method` must be 'nearest' or 'bilinear', "
+                             f"got {method!r}")
+
+        x, y = (a.ravel() for a in np.broadcast_arrays(
+            np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        ))
+        i, j = self.xy_to_index(x, y, fractional=True)
+        grid = self.grid
+
+        if method == 'nearest':
+            i = np.floor(i + 0.5).astype(int)
+            j = np.floor(j + 0.5).astype(int)
+            inside = (i >= 0) & (i < grid.nx) & (j >= 0) & (j < grid.ny)
+            corners = [(i, j, None)]
+        else:
+            inside = ((i > -EPS) & (i < grid.nx - 1 + EPS) &
+                      (j > -EPS) & (j < grid.ny - 1 + EPS))
+            i0 = np.clip(np.floor(i), 0, max(grid.nx - 2, 0)).astype(int)
+            j0 = np.clip(np.floor(j), 0, max(grid.ny - 2, 0)).astype(int)
+            fi = np.clip(i - i0, 0, 1)
+            fj = np.clip(j - j0, 0, 1)
+            i1 = np.minimum(i0 + 1, grid.nx - 1)
+            j1 = np.minimum(j0 + 1, grid.ny - 1)
+            corners = [(i0, j0, (1 - fi) * (1 - fj)), (i1, j0, fi * (1 - fj)),
+                       (i0, j1, (1 - fi) * fj), (i1, j1, fi * fj)]
+
+        # only load the bounding box of the points
+        window = {}
+        if inside.any():
+            for dim, index, n in ((self._x, 0, grid.nx),
+                                  (self._y, 1, grid.ny)):
+                values = np.concatenate([c[index][inside] for c in corners])
+                window[dim] = slice(max(values.min(), 0),
+                                    min(values.max() + 1, n))
+        else:
+            window = {self._x: slice(0, 1), self._y: slice(0, 1)}
+        ds = self._obj.isel(window)
+        offsets = window[self._x].start, window[self._y].start
+
+        data_vars = {}
+        for name, var in ds.data_vars.items():
+            if self._x not in var.dims or self._y not in var.dims:
+                continue
+            dims = [dim for dim in var.dims if dim not in (self._x, self._y)]
+            values = var.transpose(*dims, self._y, self._x).values
+
+            def take(i, j):
+                return values[..., np.clip(j[inside] - offsets[1], 0, None),
+                              np.clip(i[inside] - offsets[0], 0, None)]
+
+            fill_value, dtype = _gap_fill(var)
+            if method == 'bilinear':
+                fill_value, dtype = np.nan, np.promote_types(var.dtype,
+                                                             np.float32)
+            data = np.full(values.shape[:-2] + x.shape, fill_value,
+                           dtype=dtype)
+
+            if method == 'nearest':
+                data[..., inside] = take(i, j)
+            elif inside.any():
+                nodata = _fill_value(var)
+                total = 0
+                for i_, j_, weight in corners:
+                    corner = take(i_, j_).astype(dtype)
+                    if nodata is not None and not _is_nan(nodata):
+                        corner[corner == nodata] = np.nan
+                    total = total + corner * weight[inside]
+                data[..., inside] = total
+
+            attrs = var.attrs
+            if method == 'bilinear' and _fill_value(var) is not None:
+                attrs = {key: value for key, value in attrs.items()
+                         if key not in ('_FillValue', 'missing_value',
+                                        'nodata', 'nodatavals')}
+            data_vars[name] = Variable(dims + ['points'], data, attrs)
+
+        coords = {
+            self._x: Variable('points', x, self.x.attrs),
+            self._y: Variable('points', y, self.y.attrs),
+        }
+        for name, coord in ds.coords.items():
+            if name not in (self._x, self._y) and not (
+                    {self._x, self._y} & set(coord.dims)):
+                coords[name] = coord.variable
+        return Dataset(data_vars, coords=coords, attrs=self._obj.attrs)
+
+    def validity(self):
+        """
+        Boolean validity masks of the spatial data variables.
+
+        A pixel is valid if it is not ``NaN`` and does not equal the
+        nodata value of the variable (e.g. ``_FillValue``), which is how
+        gaps are marked when the native integer dtype is preserved.
+
+        Returns
+        -------
+        :class:`~xarray.Dataset`
+            A boolean variable for every spatial data variable.
+        """
+        masks = {}
+        for name, var in self._obj.data_vars.items():
+            if self._x not in var.dims or self._y not in var.dims:
+                continue
+            valid = var.notnull()
+            fill_value = _fill_value(var)
+            if fill_value is not None and not _is_nan(fill_value):
+                valid &= var != fill_value
+            masks[name] = valid
+        return Dataset(masks)
+
+    def iter_blocks(self, block_shape, overlap=0):
+        """
+        Iterate over spatial blocks of the dataset, with a halo.
+
+        Blocks are taken with :meth:`~xarray.Dataset.isel` and are
+        therefore lazy if the dataset is lazy (e.g. tiles read with
+        ``chunks`` or ``engine='vrt'``): data is only read when a block
+        is loaded, so that datasets larger than RAM can be processed
+        with bounded memory. Combine with :meth:`block_writer` to
+        reassemble the results.
+
+        Parameters
+        ----------
+        block_shape : int or tuple
+            ``(ny, nx)`` size of the blocks in pixels. Blocks at the
+            edges may be smaller.
+
+        overlap : int or tuple
+            ``(y, x)`` number of neighbouring pixels added to each side
+            of every block (the halo), e.g. for stencil operations.
+            The halo is clipped at the edges of the dataset.
+
+        Yields
+        ------
+        window : dict
+            ``{dim: slice}`` pixel window of the block, without the
+            halo, in the dataset.
+
+        block : :class:`~xarray.Dataset`
+            The block, including the halo, with its coordinates.
+        """
+        grid = self.grid
+        for core, halo in iter_windows(grid.shape, block_shape, overlap):
+            window = {self._y: core[0], self._x: core[1]}
+            block = self._obj.isel({self._y: halo[0], self._x: halo[1]})
+            if grid.regular:
+                block.geo._set_grid(grid.window(
+                    halo[1].start, halo[0].start,
+                    halo[1].stop - halo[1].start,
+                    halo[0].stop - halo[0].start
+                ))
+            yield window, block
+
+    def block_writer(self, path=None):
+        """
+        A :class:`~rasterx.blocks.BlockWriter` that reassembles results
+        of :meth:`iter_blocks` into a dataset on the grid of this
+        dataset, in memory or memory-mapped in ``path``.
+        """
+        return BlockWriter(self._obj, path)
+
+    def slope(self, units='degrees', z_factor=1, geographic=None,
+              block_shape=1024, workers=1, path=None):
+        """
+        Slope of the spatial data variables, e.g. elevations.
+
+        Parameters
+        ----------
+        units : {'degrees', 'percent'}
+            Units of the slope.
+
+        z_factor, geographic, block_shape, workers, path :
+            See :func:`~rasterx.terrain.derive`, which also describes
+            how lon/lat grids and lazy data are handled.
+
+        Returns
+        -------
+        :class:`~xarray.Dataset`
+            The slope of every spatial data variable.
+        """
+        if units not in ('degrees', 'percent'):
+            raise ValueError("`units` must be 'degrees' or 'percent', "
+                             f"got {units!r}")
+        return derive(self._obj, 'slope', z_factor, geographic,
+                      block_shape, workers, path, units=units)
+
+    def aspect(self, geographic=None, block_shape=1024, workers=1,
+               path=None):
+        """
+        Aspect of the spatial data variables, i.e. the azimuth, in
+        degrees clockwise from north, that the slope faces. Flat areas
+        are ``NaN``.
+
+        See :func:`~rasterx.terrain.derive` for the parameters.
+        """
+        return derive(self._obj, 'aspect', 1, geographic, block_shape,
+                      workers, path)
+
+    def hillshade(self, azimuth=315, altitude=45, z_factor=1,
+                  geographic=None, block_shape=1024, workers=1, path=None):
+        """
+        Shaded relief of the spatial data variables.
+
+        Parameters
+        ----------
+        azimuth : float
+            Direction of the light source, in degrees clockwise from
+            north.
+
+        altitude : float
+            Altitude of the light source, in degrees above the horizon.
+
+        z_factor, geographic, block_shape, workers, path :
+            See :func:`~rasterx.terrain.derive`.
+
+        Returns
+        -------
+        :class:`~xarray.Dataset`
+            The illumination of every pixel, from 0 (shadow) to 1.
+        """
+        return derive(self._obj, 'hillshade', z_factor, geographic,
+                      block_shape, workers, path, azimuth=azimuth,
+                      altitude=altitude)
+
+    @staticmethod
+    def _index_range(c0, d, c1, c2):
+        # first and last (inclusive) pixel indices of the coordinates
+        # between c1 and c2, may be out of bounds
+        p1 = (c1 - c0) / d
+        p2 = (c2 - c0) / d
+        lo, hi = min(p1, p2), max(p1, p2)
+        return int(np.ceil(lo - EPS)), int(np.floor(hi + EPS))
+
     def set_xy(self, x, y):
         """
         Attach a 2D dimensions to the x (horizontal) and y (vertical)
@@ -72,6 +520,11 @@ class GeoAccessor:
             The left-, right-, bottom-, and top-most coordinates of the
             bounding box.
 
+            If ``x1 > x2`` and x is longitude (in [-180, 360]), the
+            bounding box crosses the antimeridian. The data east of
+            ``x1`` and west of ``x2`` is stitched into a continuous x
+            coordinate from ``x1`` to ``x2 + 360``.
+
         pad : bool, optional
             Gives the possibility to trim at coordinates outside the
             original extent, filling with the ``_FillValue`` or with a
@@ -79,62 +532,186 @@ class GeoAccessor:
 
         fill_value : float or None, optional
             Value to pad the data with in case extent is expanded beyond
-            the data. If ``None``, the ``_FillValue`` is used.
+            the data. If ``None``, the ``_FillValue`` (or other nodata
+            attribute) of each variable is used, preserving its dtype.
+            Integer data without a nodata value is promoted to float and
+            padded with ``NaN``.
 
+        Notes
+        -----
+        On a regular grid, the pixel window is computed directly from
+        the grid spacing and the padded output is allocated once.
+        Irregular coordinates are trimmed by label and padded by
+        alignment, which is considerably slower.
         """
+        if x1 > x2 and self._is_longitude():
+            return self._trim_wrapped(x1, x2, y1, y2, pad, fill_value)
         if x1 >= x2:
             raise ValueError('`x1` must be < `x2`')
         if y1 >= y2:
             raise ValueError('`y1` must be < `y2`')
 
+        if self.is_regular:
+            return self._trim_regular(x1, x2, y1, y2, pad, fill_value)
+
         # Stage 1: Trim
+        # coordinates may be decreasing, e.g. y in GeoTIFF files
+        x_slice = slice(x2, x1) if self.dx < 0 else slice(x1, x2)
+        y_slice = slice(y2, y1) if self.dy < 0 else slice(y1, y2)
         trimmed = self._obj.sel(
-            {self._x: slice(x1, x2),
-             self._y: slice(y1, y2)}
+            {self._x: x_slice,
+             self._y: y_slice}
         )
 
         if pad is False:  # no padding...
             return trimmed
 
         # Stage 2: Pad (if needed):
-        X1, X2, Y1, Y2 = (trimmed.geo.x.data[0],
-                          trimmed.geo.x.data[-1],
-                          trimmed.geo.y.data[0],
-                          trimmed.geo.y.data[-1])
-
-#         if X1 <= w < e <= X2 and Y1 <= s < n <= Y2:  # no need to pad
-#             return trimmed
-
-        # set the new coordinate space
-        x = np.hstack(
-            (np.arange(X1 - self.dx, x1, -self.dx)[::-1],
-             trimmed.geo.x,
-             np.arange(X2 + self.dx, x2, self.dx))
-        )
-        y = np.hstack(
-            (np.arange(Y1 - self.dy, y1, -self.dy)[::-1],
-             trimmed.geo.y,
-             np.arange(Y2 + self.dy, y2, self.dy))
-        )
+        return self._pad(trimmed, x1, x2, y1, y2, fill_value)
 
-        # make a dummy dataset with the new spatial extent
-        padded = Dataset(
-            data_vars={
-                self._x: (
-                    self._x,
-                    x,
-                    trimmed.geo.x.attrs,
-                    trimmed.geo.x.encoding
-                ),
-                self._y: (
-                    self._y,
-                    y,
-                    trimmed.geo.y.attrs,
-                    trimmed.geo.y.encoding
-                ),
-            }
-        )
+    def _is_longitude(self):
+        # x coordinates within [-180, 360], i.e. possibly longitude
+        x1, x2 = sorted(self.extent[:2])
+        tol = abs(self.dx)
+        return -180 - tol <= x1 and x2 <= 360 + tol
+
+    def _trim_wrapped(self, x1, x2, y1, y2, pad=False, fill_value=None):
+        """
+        Trim to a bounding box that crosses the antimeridian, i.e. from
+        ``x1`` to ``x2 + 360``, by trimming the copies of the data
+        shifted by -360, 0 and 360 degrees that intersect with it and
+        joining them along x.
+        """
+        x2 += 360
+        X1, X2 = sorted(self.extent[:2])
+        xdim = self._x
+
+        parts = []
+        for shift in (-360, 0, 360):
+            if X2 + shift < x1 or X1 + shift > x2:
+                continue
+            part = self.trim(x1 - shift, x2 - shift, y1, y2)
+            if not part.sizes[xdim]:
+                continue
+            coord = part[xdim].variable
+            parts.append(part.assign_coords({xdim: Variable(
+                xdim, coord.values + shift, coord.attrs, coord.encoding
+            )}))
+
+        if not parts:
+            return self.trim(x1, x2, y1, y2, pad, fill_value)
+
+        if self.dx < 0:  # decreasing x
+            parts = parts[::-1]
+        for i in range(1, len(parts)):
+            # drop columns repeated at the seam, e.g. at -180 and 180
+            last = parts[i - 1][xdim].values[-1]
+            if abs(parts[i][xdim].values[0] - last) < 0.5 * abs(self.dx):
+                parts[i] = parts[i].isel({xdim: slice(1, None)})
+
+        trimmed = parts[0]
+        if len(parts) > 1:
+            trimmed = concat(parts, dim=xdim, data_vars='minimal',
+                             coords='minimal', compat='override')
+        if pad is False:
+            return trimmed
+        return trimmed.geo.trim(x1, x2, y1, y2, pad, fill_value)
 
-        # update with the trimmed data
-        padded.update(trimmed)
+    def _pad(self, trimmed, x1, x2, y1, y2, fill_value=None):
+        # extend the coordinates by whole pixels up to the bounding box,
+        # including pixels on its edges, as on regular grids
+        x = self._pad_coord(trimmed.geo.x.data, self.dx, x1, x2)
+        y = self._pad_coord(trimmed.geo.y.data, self.dy, y1, y2)
+        return self._reindex(trimmed, x, y, fill_value)
+
+    def _pad_coord(self, coord, d, c1, c2):
+        before = self._index_range(coord[0], d, c1, c2)[0]
+        after = self._index_range(coord[-1], d, c1, c2)[1]
+        return np.hstack((coord[0] + np.arange(min(before, 0), 0) * d,
+                          coord,
+                          coord[-1] + np.arange(1, max(after, 0) + 1) * d))
+
+    def _reindex(self, trimmed, x, y, fill_value=None):
+        # pad by alignment onto new coordinates, which keeps lazy data
+        # lazy
+        fill_values = {
+            name: _gap_fill(var, fill_value)[0]
+            for name, var in trimmed.data_vars.items()
+        }
+        padded = trimmed.reindex(
+            {self._x: x, self._y: y}, fill_value=fill_values
+        )
+        for dim in (self._x, self._y):
+            padded[dim].attrs = trimmed[dim].attrs
+            padded[dim].encoding = trimmed[dim].encoding
         return padded
+
+    def _trim_regular(self, x1, x2, y1, y2, pad=False, fill_value=None):
+        """
+        Trim (and pad) a regular grid by computing the pixel window from
+        the grid spacing instead of searching the coordinates.
+        """
+        grid = self.grid
+        nx, ny = grid.nx, grid.ny
+        i1, i2 = self._index_range(grid.x0, grid.dx, x1, x2)
+        j1, j2 = self._index_range(grid.y0, grid.dy, y1, y2)
+
+        x_slice = slice(max(i1, 0), max(min(i2, nx - 1) + 1, 0))
+        y_slice = slice(max(j1, 0), max(min(j2, ny - 1) + 1, 0))
+        trimmed = self._obj.isel({self._x: x_slice, self._y: y_slice})
+        trimmed.geo._set_spatial_coord(self._y, self._x)
+        trimmed.geo._set_grid(grid.window(
+            x_slice.start, y_slice.start,
+            trimmed.sizes[self._x], trimmed.sizes[self._y]
+        ))
+
+        if pad is False or (0 <= i1 and i2 < nx and 0 <= j1 and j2 < ny):
+            return trimmed
+
+        sizes = {self._x: i2 - i1 + 1, self._y: j2 - j1 + 1}
+        offsets = {self._x: max(i1, 0) - i1, self._y: max(j1, 0) - j1}
+
+        coords = {}
+        for dim, (k1, k2), d in ((self._y, (j1, j2), self.dy),
+                                 (self._x, (i1, i2), self.dx)):
+            coord = self._obj[dim]
+            c0 = grid.x0 if dim == self._x else grid.y0
+            data = c0 + np.arange(k1, k2 + 1) * d
+            # keep the original coordinates where there is data
+            offset = offsets[dim]
+            data[offset:offset + trimmed.sizes[dim]] = trimmed[dim].data
+            coords[dim] = Variable(dim, data, coord.attrs, coord.encoding)
+
+        if any(var.chunks is not None for var in trimmed.variables.values()):
+            # keep lazy data lazy, pad by alignment onto the same pixels
+            return self._reindex(trimmed, coords[self._x].data,
+                                 coords[self._y].data, fill_value)
+
+        # Pad by allocating the output once and writing the data in
+        for name, coord in trimmed.coords.items():
+            if name not in coords:
+                coords[name] = self._pad_variable(
+                    coord.variable, sizes, offsets, fill_value
+                )
+
+        data_vars = {
+            name: self._pad_variable(var.variable, sizes, offsets, fill_value)
+            for name, var in trimmed.data_vars.items()
+        }
+        return Dataset(data_vars, coords=coords, attrs=trimmed.attrs)
+
+    @staticmethod
+    def _pad_variable(var, sizes, offsets, fill_value=None):
+        if not set(var.dims) & set(sizes):
+            return var
+
+        fill_value, dtype = _gap_fill(var, fill_value)
+        shape = tuple(sizes.get(dim, size)
+                      for dim, size in zip(var.dims, var.shape))
+        index = tuple(
+            slice(offsets[dim], offsets[dim] + size) if dim in offsets
+            else slice(None) for dim, size in zip(var.dims, var.shape)
+        )
+        data = np.full(shape, fill_value, dtype=dtype)
+        data[index] = var.values
+        return Variable(var.dims, data, var.attrs, var.encoding)
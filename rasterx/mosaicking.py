@@ -0,0 +1,424 @@
+import numpy as np
+
+from xarray import Dataset, Variable
+
+from rasterx.utils import _fill_value, _gap_fill, _is_nan
+
+
+OVERLAP_RULES = ('first', 'last', 'mean')
+
+
+def _grid_layout(tiles, rtol=1e-6, tol=1e-3):
+    """
+    Figure out where each tile goes on a common regular grid.
+
+    Parameters
+    ----------
+    tiles : list of :class:`~xarray.Dataset`
+        The tiles to place on the grid.
+
+    rtol : float
+        Relative tolerance used when comparing the spacing of the
+        tiles.
+
+    tol : float
+        Tolerance, in pixels, of the tile offsets from the integer
+        pixel lattice.
+
+    Returns
+    -------
+    ``None`` if the tiles do not share a common regular grid. Otherwise
+    a list of ``(x, y)`` integer pixel offsets, one for each tile, and
+    the ``(nx, ny)`` shape of the mosaic.
+    """
+    first = tiles[0].geo
+    dims = first._x, first._y
+    dx, dy = first.dx, first.dy
+    names = set(tiles[0].data_vars)
+    shapes = {
+        name: {dim: size for dim, size in zip(var.dims, var.shape)
+               if dim not in dims}
+        for name, var in tiles[0].data_vars.items()
+    }
+
+    offsets = []
+    for tile in tiles:
+        geo = tile.geo
+        if (geo._x, geo._y) != dims or set(tile.data_vars) != names:
+            return None
+
+        if not (geo.is_regular and np.isclose(geo.dx, dx, rtol=rtol, atol=0)
+                and np.isclose(geo.dy, dy, rtol=rtol, atol=0)):
+            return None
+
+        for name, coord in tile.coords.items():
+            if name not in dims and set(dims) & set(coord.dims):
+                return None  # 2D coordinates, not a regular grid
+
+        for name, var in tile.data_vars.items():
+            shape = {dim: size for dim, size in zip(var.dims, var.shape)
+                     if dim not in dims}
+            if shape != shapes[name]:
+                return None
+
+        x_offset = (geo.x.data[0] - first.x.data[0]) / dx
+        y_offset = (geo.y.data[0] - first.y.data[0]) / dy
+        if (abs(x_offset - round(x_offset)) > tol or
+                abs(y_offset - round(y_offset)) > tol):
+            return None
+        offsets.append((int(round(x_offset)), int(round(y_offset))))
+
+    x0 = min(x for x, _ in offsets)
+    y0 = min(y for _, y in offsets)
+    offsets = [(x - x0, y - y0) for x, y in offsets]
+    nx = max(x + tile.geo.x.size for (x, _), tile in zip(offsets, tiles))
+    ny = max(y + tile.geo.y.size for (_, y), tile in zip(offsets, tiles))
+    return offsets, (nx, ny)
+
+
+def _nominal_spacing(coord, d):
+    """
+    Grid spacing estimated from the first and last coordinates, which
+    is less sensitive to float drift than the spacing ``d`` of the grid
+    (the first two coordinates). ``d`` is used as is for coordinates of
+    a single pixel, e.g. an edge tile trimmed to one row or column.
+    Spacings that are within rounding error of ``1 / n`` (e.g. 1/3600
+    of a degree) are snapped to it.
+    """
+    if coord.size > 1:
+        d = (coord[-1] - coord[0]) / (coord.size - 1)
+    n = round(1 / abs(d))
+    if n >= 1 and abs(1 / abs(d) - n) < 1e-6 * n:
+        d = np.copysign(1 / n, d)
+    return d
+
+
+def snap_to_grid(tiles, tol=1e-3):
+    """
+    Snap the spatial coordinates of tiles to a shared pixel lattice.
+
+    Tile coordinates typically carry float drift (e.g. ``dx`` of
+    ``0.0002777777777822621`` instead of 1/3600), so that shared edges
+    of neighbouring tiles are near-duplicates rather than identical.
+    The lattice is defined by the origin of the first tile and the
+    nominal resolution, and every coordinate of every tile is replaced
+    by the exact lattice value, so that joining tiles is exact.
+
+    Parameters
+    ----------
+    tiles : list of :class:`~xarray.Dataset`
+        The tiles to snap.
+
+    tol : float
+        Maximum distance, in pixels, a coordinate may be moved. Tiles
+        that are not on the lattice within ``tol`` are left untouched.
+
+    Returns
+    -------
+    list of :class:`~xarray.Dataset`
+    """
+    # the lattice is defined by the first tile with a known spacing,
+    # tiles of a single pixel only know it if they were trimmed
+    reference = next((tile for tile in tiles if tile.geo.is_regular), None)
+    if reference is None:
+        return tiles
+
+    geo = reference.geo
+    dims = geo._x, geo._y
+    dx = _nominal_spacing(geo.x.data, geo.dx)
+    dy = _nominal_spacing(geo.y.data, geo.dy)
+    x0, y0 = geo.x.data[0], geo.y.data[0]
+
+    snapped = []
+    for tile in tiles:
+        geo_ = tile.geo
+        if ((geo_._x, geo_._y) != dims or not geo_.is_regular or
+                not np.isclose(geo_.dx, dx, rtol=1e-6, atol=0) or
+                not np.isclose(geo_.dy, dy, rtol=1e-6, atol=0)):
+            snapped.append(tile)
+            continue
+
+        coords = {}
+        for dim, c0, d in ((geo_._x, x0, dx), (geo_._y, y0, dy)):
+            coord = tile[dim]
+            offset = int(round((coord.data[0] - c0) / d))
+            data = c0 + (offset + np.arange(coord.size)) * d
+            if np.abs(data - coord.data).max() > tol * abs(d):
+                break
+            coords[dim] = Variable(dim, data, coord.attrs, coord.encoding)
+        else:
+            grid = geo_.grid._replace(x0=coords[geo_._x].data[0],
+                                      y0=coords[geo_._y].data[0],
+                                      dx=dx, dy=dy)
+            tile = tile.assign_coords(coords)
+            # keep the spacing of tiles of a single pixel
+            tile.geo._set_grid(grid)
+        snapped.append(tile)
+    return snapped
+
+
+def _restore_dtypes(ds, template):
+    """
+    Undo the float promotion of :func:`xarray.merge`, which fills gaps
+    with ``NaN``: gaps in variables that have a nodata value are filled
+    with it and the dtype of the variables in ``template`` is restored.
+    """
+    for name, var in template.data_vars.items():
+        if name not in ds or ds[name].dtype == var.dtype:
+            continue
+        fill_value, dtype = _gap_fill(var)
+        if dtype == var.dtype:
+            ds[name] = ds[name].fillna(fill_value).astype(dtype)
+    return ds
+
+
+def _index(var, x_slice, y_slice, xdim, ydim):
+    index = [slice(None)] * var.ndim
+    index[var.dims.index(xdim)] = x_slice
+    index[var.dims.index(ydim)] = y_slice
+    return tuple(index)
+
+
+def _mosaic_coords(first, order, origin, nx, ny):
+    """
+    Coordinates of the mosaic of ``(tile, (x, y) offset)`` pairs in
+    ``order``, taken from the tiles where they cover the mosaic (the
+    last one wins) and from the grid of the ``first`` tile, at pixel
+    offset ``origin``, elsewhere.
+    """
+    geo = first.geo
+    xdim, ydim = geo._x, geo._y
+    x = geo.x.data[0] + (np.arange(nx) - origin[0]) * geo.dx
+    y = geo.y.data[0] + (np.arange(ny) - origin[1]) * geo.dy
+    for tile, (xo, yo) in order:
+        x[xo:xo + tile.geo.x.size] = tile.geo.x.data
+        y[yo:yo + tile.geo.y.size] = tile.geo.y.data
+
+    coords = {
+        ydim: Variable(ydim, y, first[ydim].attrs, first[ydim].encoding),
+        xdim: Variable(xdim, x, first[xdim].attrs, first[xdim].encoding),
+    }
+    for name, coord in first.coords.items():
+        if name not in coords:
+            coords[name] = coord.variable
+    return coords
+
+
+def _blocks(order, nx, ny, overlap='first'):
+    """
+    Split the mosaic of ``(tile, (x, y) offset)`` pairs in ``order``
+    into blocks along the edges of the tiles.
+
+    Returns the ``xs`` and ``ys`` pixel edges of the blocks and, for
+    every block, the indices in ``order`` of the tiles it is taken
+    from: the last tile that covers it, or all of them with
+    ``overlap='mean'``. Blocks in gaps between tiles have none.
+    Neighbouring blocks taken from the same tiles are joined, so that
+    e.g. the shared edge of two tiles is not a block of its own.
+    """
+    xs, ys = {0, nx}, {0, ny}
+    for tile, (xo, yo) in order:
+        xs.update((xo, xo + tile.geo.x.size))
+        ys.update((yo, yo + tile.geo.y.size))
+    xs, ys = sorted(xs), sorted(ys)
+
+    sources = []
+    for y1, y2 in zip(ys[:-1], ys[1:]):
+        row = []
+        for x1, x2 in zip(xs[:-1], xs[1:]):
+            cover = tuple(
+                k for k, (tile, (xo, yo)) in enumerate(order)
+                if xo <= x1 and x2 <= xo + tile.geo.x.size and
+                yo <= y1 and y2 <= yo + tile.geo.y.size
+            )
+            row.append(cover if overlap == 'mean' else cover[-1:])
+        sources.append(row)
+
+    keep = [0]
+    for i in range(1, len(xs) - 1):
+        if any(row[i] != row[keep[-1]] for row in sources):
+            keep.append(i)
+    xs = [xs[i] for i in keep] + [xs[-1]]
+    sources = [[row[i] for i in keep] for row in sources]
+
+    keep = [0]
+    for j in range(1, len(ys) - 1):
+        if sources[j] != sources[keep[-1]]:
+            keep.append(j)
+    ys = [ys[j] for j in keep] + [ys[-1]]
+    sources = [sources[j] for j in keep]
+    return xs, ys, sources
+
+
+def _valid(values, nodata=None):
+    # pixels that are neither NaN nor nodata, numpy or dask
+    valid = values == values
+    if nodata is not None and not _is_nan(nodata):
+        valid = valid & (values != nodata)
+    return valid
+
+
+def _lazy_data(name, var, order, blocks, xdim, ydim, fill_value, dtype,
+               overlap='first'):
+    """
+    Dask-backed mosaic of variable ``name``, joined from the blocks of
+    :func:`_blocks`. Every block is a slice of the (lazy) data of the
+    tile it is taken from, so that chunks end at tile boundaries.
+    """
+    import dask.array as da
+
+    dims = [dim for dim in var.dims if dim not in (xdim, ydim)]
+    dims += [ydim, xdim]
+    lead = tuple(var.sizes[dim] for dim in dims[:-2])
+    nodata = _fill_value(var)
+    xs, ys, sources = blocks
+
+    rows = []
+    for y1, y2, row in zip(ys[:-1], ys[1:], sources):
+        rows.append([])
+        for x1, x2, source in zip(xs[:-1], xs[1:], row):
+            pieces = []
+            for k in source:
+                tile, (xo, yo) = order[k]
+                data = da.asarray(tile[name].transpose(*dims).data)
+                pieces.append(data[..., y1 - yo:y2 - yo, x1 - xo:x2 - xo])
+
+            if not pieces:  # gap
+                block = da.full(lead + (y2 - y1, x2 - x1), fill_value,
+                                dtype=dtype)
+            elif len(pieces) == 1:
+                block = pieces[0].astype(dtype)
+            else:  # mean of the valid pixels
+                total = count = 0
+                for piece in pieces:
+                    valid = _valid(piece, nodata)
+                    total = total + da.where(valid, piece, 0).astype(
+                        np.float64)
+                    count = count + valid
+                block = da.where(count > 0,
+                                 total / da.maximum(count, 1), fill_value)
+                if not np.issubdtype(dtype, np.floating):
+                    block = da.round(block)
+                block = block.astype(dtype)
+            rows[-1].append(block)
+
+    data = Variable(dims, da.block(rows), var.attrs, var.encoding)
+    return data.transpose(*var.dims)
+
+
+def mosaic(tiles, overlap='first'):
+    """
+    Mosaic tiles that share a common regular grid.
+
+    Unlike :func:`xarray.merge`, which aligns the tiles with an outer
+    join on their (float) coordinates, the integer pixel offset of each
+    tile is computed from the grid spacing (``dx``, ``dy``), the output
+    is allocated once and every tile is copied into place.
+
+    Parameters
+    ----------
+    tiles : list of :class:`~xarray.Dataset`
+        The tiles to mosaic. All tiles must have the same variables and
+        the same spatial resolution and their origins must be on the
+        same pixel lattice.
+
+    overlap : {'first', 'last', 'mean'}
+        How to resolve pixels covered by more than one tile, e.g. the
+        shared edge row and column of AsterGDEM and SRTM tiles.
+        ``'first'`` keeps the value of the first tile in ``tiles``,
+        ``'last'`` keeps the value of the last one and ``'mean'``
+        averages all of their valid (not nodata) values. Note that
+        ``'mean'`` needs an additional accumulator the size of the
+        mosaic.
+
+    Returns
+    -------
+    :class:`~xarray.Dataset`
+        The mosaic. If the tiles do not cover the whole extent of the
+        mosaic, gaps are filled with the nodata value (e.g.
+        ``_FillValue``) of each variable, preserving its dtype. Only
+        integer data without a nodata value is promoted to float and
+        filled with ``NaN``, just like :func:`xarray.merge` does.
+
+        If any of the tiles is dask-backed, the mosaic is lazy: it is
+        joined from the chunks of the tiles, cut along tile boundaries,
+        so that every chunk of the mosaic is read from a single tile
+        (e.g. one chunk per tile for tiles opened with ``chunks=-1``)
+        and gaps are chunks of their own.
+    """
+    if overlap not in OVERLAP_RULES:
+        raise ValueError(
+            f'`overlap` must be one of {OVERLAP_RULES}, got {overlap!r}'
+        )
+
+    layout = _grid_layout(tiles)
+    if layout is None:
+        raise ValueError('Tiles do not share a common regular grid...')
+    offsets, (nx, ny) = layout
+
+    first = tiles[0]
+    geo = first.geo
+    xdim, ydim = geo._x, geo._y
+
+    # the order in which tiles are written, last one wins
+    order = list(zip(tiles, offsets))
+    if overlap == 'first':
+        order = order[::-1]
+
+    coords = _mosaic_coords(first, order, offsets[0], nx, ny)
+    blocks = _blocks(order, nx, ny, overlap)
+    gaps = not all(source for row in blocks[2] for source in row)
+    lazy = any(var.chunks is not None
+               for tile in tiles for var in tile.data_vars.values())
+
+    data_vars = {}
+    for name, var in first.data_vars.items():
+        if xdim not in var.dims or ydim not in var.dims:
+            data_vars[name] = var.variable  # not spatial, keep as is
+            continue
+
+        shape = tuple(
+            nx if dim == xdim else ny if dim == ydim else size
+            for dim, size in zip(var.dims, var.shape)
+        )
+        fill_value, dtype = _gap_fill(var)
+        if not gaps:
+            dtype = var.dtype
+
+        if lazy:
+            data_vars[name] = _lazy_data(name, var, order, blocks, xdim,
+                                         ydim, fill_value, dtype, overlap)
+            continue
+
+        if overlap == 'mean':
+            # average valid pixels only
+            nodata = _fill_value(var)
+            total = np.zeros(shape, dtype=np.float64)
+            count = np.zeros(shape, dtype=np.uint16)
+            for tile, (xo, yo) in order:
+                index = _index(var, slice(xo, xo + tile.geo.x.size),
+                               slice(yo, yo + tile.geo.y.size), xdim, ydim)
+                values = tile[name].transpose(*var.dims).values
+                valid = _valid(values, nodata)
+                total[index] += np.where(valid, values, 0)
+                count[index] += valid
+            total = np.divide(total, count,
+                              out=np.full_like(total, fill_value),
+                              where=count > 0)
+            if not np.issubdtype(dtype, np.floating):
+                total = np.round(total)
+            data = total.astype(dtype, copy=False)
+            del count
+        else:
+            if gaps:
+                data = np.full(shape, fill_value, dtype=dtype)
+            else:
+                data = np.empty(shape, dtype=dtype)
+            for tile, (xo, yo) in order:
+                index = _index(var, slice(xo, xo + tile.geo.x.size),
+                               slice(yo, yo + tile.geo.y.size), xdim, ydim)
+                data[index] = tile[name].transpose(*var.dims).values
+
+        data_vars[name] = Variable(var.dims, data, var.attrs, var.encoding)
+
+    return Dataset(data_vars, coords=coords, attrs=first.attrs)
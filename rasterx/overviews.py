@@ -0,0 +1,78 @@
+import os
+
+import gdal
+
+from warnings import warn
+
+from rasterx.core import _all_tiles, _compressed
+
+
+def build_overviews(path, levels=(2, 4, 8, 16), resampling='average',
+                    **kwargs):
+    """
+    Build and persist overview pyramids for raster files.
+
+    Overviews are written to external ``.ovr`` files next to each file,
+    which is not modified. GDAL then picks them automatically whenever
+    data is read at a coarser resolution, e.g. with
+    ``read(..., resolution=...)`` or ``read(..., decimate=...)``.
+
+    Parameters
+    ----------
+    path : str or list
+        A directory of tiles or a list of files. Tiles are found in a
+        directory with their filename template, see
+        :func:`~rasterx.core._get_tiles`.
+
+    levels : tuple
+        Decimation factors of the overviews.
+
+    resampling : str
+        Resampling algorithm, e.g. ``'average'``, ``'nearest'``,
+        ``'gauss'``. See `gdaladdo`_.
+
+    Other keyword arguments (``template``, ``ext``) are used to find the
+    tiles in a directory.
+
+    Returns
+    -------
+    list
+        The files overviews were built for. Files that already have
+        them are skipped.
+
+    Notes
+    -----
+    Overviews can not be written into compressed containers, so files
+    inside ``.zip`` or ``.tar`` archives are skipped with a warning.
+
+    .. _gdaladdo:
+        https://gdal.org/programs/gdaladdo.html
+    """
+    if isinstance(path, str) and os.path.isdir(path):
+        path = _all_tiles(path, **kwargs)
+    elif isinstance(path, str):
+        path = [path]
+
+    built = []
+    for f in path:
+        if (f.startswith('/vsi') or not os.path.isfile(f) or
+                _compressed(f)):
+            warn(f'Can not write overviews for {f}, skipping...')
+            continue
+        if os.path.exists(f + '.ovr'):
+            continue
+
+        ds = gdal.Open(f, gdal.GA_ReadOnly)
+        if ds is None:
+            warn(f'Unable to open {f}, skipping...\n'
+                 f'{gdal.GetLastErrorMsg()}')
+            continue
+        try:
+            if ds.BuildOverviews(resampling.upper(), list(levels)) != 0:
+                warn(f'Unable to build overviews for {f}...\n'
+                     f'{gdal.GetLastErrorMsg()}')
+                continue
+        finally:
+            ds = None  # flushes the overviews to disk
+        built.append(f)
+    return built
@@ -0,0 +1,160 @@
+import numpy as np
+
+from xarray import Dataset, Variable
+
+from rasterx.core import read, _get_tiles, _is_dir, _readrasterfile
+from rasterx.geo_accessor import _is_regular
+from rasterx.utils import _gap_fill
+
+
+def _pixel_size(filename, substring=None):
+    # (dx, dy) of a file, from its (lazily read) coordinates
+    with _readrasterfile(filename, substring) as ds:
+        return abs(ds.geo.dx), abs(ds.geo.dy)
+
+
+def _overlaps(filename, extent, substring=None):
+    # whether any pixel of a file is within extent, as read() trims it
+    with _readrasterfile(filename, substring, extent=extent) as tile:
+        return 0 not in tile.sizes.values()
+
+
+def _bbox(x, y, pad):
+    # bounding box of points, padded by (px, py) on each side
+    return (x.min() - pad[0], x.max() + pad[0],
+            y.min() - pad[1], y.max() + pad[1])
+
+
+def sample(path, x, y, method='nearest', substring=None,
+           mask_and_scale=False, **kwargs):
+    """
+    Sample raster data at points, reading only the pixels needed.
+
+    If ``path`` is a directory of tiles, the points are grouped by the
+    tile they fall in and, for every group, only the window around its
+    points is read (see :func:`~rasterx.core.read`), mosaicking with
+    neighbouring tiles where points are close to a tile edge. Tiles
+    without any points are never opened. The values are then looked up
+    for all points of a group at once with
+    :meth:`~rasterx.geo_accessor.GeoAccessor.sample`.
+
+    Parameters
+    ----------
+    path : str, list
+        Path to a file, a list of files or a directory of tiles. See
+        :func:`~rasterx.core.read`.
+
+    x, y : float or array-like
+        Coordinates of the points. Arrays are broadcast against each
+        other and flattened.
+
+    method : {'nearest', 'bilinear'}
+        See :meth:`~rasterx.geo_accessor.GeoAccessor.sample`.
+
+    substring, mask_and_scale :
+        See :func:`~rasterx.core.read`.
+
+    Other Parameters
+    ----------------
+    template, ext, lonlat, tilesize, index :
+        Used to find the tiles if ``path`` is a directory. See
+        :func:`~rasterx.core.read`.
+
+    Returns
+    -------
+    :class:`~xarray.Dataset`
+        The sampled variables along a ``points`` dimension, in the order
+        of the points. Points that are not covered by any tile get the
+        nodata value of the variable or ``NaN``.
+
+    Examples
+    --------
+    >>> elevation = sample('/data/AsterGDEM', lons, lats,
+    ...                    method='bilinear')
+    """
+    x, y = (a.ravel() for a in np.broadcast_arrays(
+        np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    ))
+    if not x.size:
+        raise ValueError('No points to sample...')
+
+    if _is_dir(path):
+        tilesize = kwargs.get('tilesize', 1)
+        if isinstance(tilesize, (tuple, list)):
+            tsx, tsy = tilesize
+        else:
+            tsx = tsy = tilesize
+        cells = np.stack((np.floor(x / tsx), np.floor(y / tsy)))
+        _, groups = np.unique(cells, axis=1, return_inverse=True)
+        groups = groups.ravel()
+        # split the points by group, sorting them once
+        order = np.argsort(groups, kind='stable')
+        bounds = np.flatnonzero(np.diff(groups[order])) + 1
+        groups = np.split(order, bounds)
+
+        # pixel size of the first tile that any of the points fall in
+        for index in groups:
+            files = _get_tiles(path, *_bbox(x[index], y[index], (1e-9,) * 2),
+                               **kwargs)
+            if files:
+                pad = _pixel_size(files[0], substring)
+                break
+        else:
+            groups = []  # none of the points fall within a tile
+    else:
+        groups = [np.arange(x.size)]
+        pad = _pixel_size(path if isinstance(path, str) else path[0],
+                          substring)
+
+    results = []
+    for index in groups:
+        # the window around the points, padded so that neighbouring
+        # tiles are read where points are close to a tile edge
+        extent = _bbox(x[index], y[index], (2 * pad[0], 2 * pad[1]))
+        if _is_dir(path):
+            # the tiles found may only touch the extent, e.g. if the
+            # tile of the points is missing
+            files = [f for f in _get_tiles(path, *extent, **kwargs)
+                     if _overlaps(f, extent, substring)]
+            if not files:
+                continue
+            ds = read(files, substring, extent=extent,
+                      mask_and_scale=mask_and_scale)
+        else:
+            ds = read(path, substring, extent=extent,
+                      mask_and_scale=mask_and_scale)
+        geo = ds.geo
+        grid = geo.grid
+        if not grid.regular and 1 in grid.shape:
+            # a window of a single row or column (e.g. the edge of a
+            # neighbouring tile) has no spacing, it is that of the tiles
+            dx = pad[0] if grid.nx == 1 else grid.dx
+            dy = pad[1] if grid.ny == 1 else grid.dy
+            if all(n == 1 or _is_regular(c, d) for n, c, d in (
+                    (grid.nx, geo.x.values, dx),
+                    (grid.ny, geo.y.values, dy))):
+                geo._set_grid(grid._replace(dx=dx, dy=dy, regular=True))
+        results.append(
+            (index, geo._x, geo._y, geo.sample(x[index], y[index], method))
+        )
+
+    if not results:
+        raise ValueError('None of the points fall within a tile...')
+
+    _, xdim, ydim, first = results[0]
+    data_vars = {}
+    for name, var in first.data_vars.items():
+        fill_value, dtype = _gap_fill(var)
+        data = np.full(var.shape[:-1] + x.shape, fill_value, dtype=dtype)
+        for index, _, _, result in results:
+            data[..., index] = result[name].values
+        data_vars[name] = Variable(var.dims, data, var.attrs)
+
+    coords = {
+        xdim: Variable('points', x, first[xdim].attrs),
+        ydim: Variable('points', y, first[ydim].attrs),
+    }
+    for name, coord in first.coords.items():
+        if name not in coords:
+            coords[name] = coord.variable
+    return Dataset(data_vars, coords=coords, attrs=first.attrs)
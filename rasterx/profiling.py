@@ -0,0 +1,207 @@
+import logging
+import tracemalloc
+from time import perf_counter
+from threading import Lock, local
+from contextlib import contextmanager
+from collections import namedtuple
+
+
+# Progress is logged at INFO and every stage at DEBUG level, e.g.
+# ``logging.getLogger('rasterx').setLevel(logging.DEBUG)``
+logger = logging.getLogger('rasterx')
+
+Stage = namedtuple('Stage', 'name wall nbytes peak info')
+Stage.__doc__ = """
+A timed stage of reading, as passed to hooks.
+
+Attributes
+----------
+name : str
+    ``'discover'`` (finding the tiles), ``'archive'`` (listing archive
+    members), ``'info'`` (:func:`gdal.Info`), ``'open'`` (opening a file
+    lazily), ``'trim'``, ``'decode'`` (reading the data of a tile) or
+    ``'merge'``.
+
+wall : float
+    Wall time in seconds.
+
+nbytes : int or None
+    Size of the arrays read or produced, if any.
+
+peak : int or None
+    Peak memory allocated during the stage, in bytes, if memory is
+    traced (see :func:`profile`).
+
+info : dict
+    Details, e.g. the ``filename``.
+"""
+
+_hooks = []
+_lock = Lock()
+_local = local()
+
+
+class _Frame:
+    __slots__ = ('nbytes', 'peak', 'memory')
+
+    def __init__(self):
+        self.nbytes = None
+        self.peak = 0
+        self.memory = 0
+
+
+def add_hook(callback):
+    """
+    Call ``callback(stage)`` with a :class:`Stage` at the end of every
+    stage, in any thread.
+    """
+    with _lock:
+        _hooks.append(callback)
+
+
+def remove_hook(callback):
+    with _lock:
+        _hooks.remove(callback)
+
+
+@contextmanager
+def stage(name, **info):
+    """
+    Time the enclosed block as stage ``name``. Set ``nbytes`` on the
+    yielded object to report the size of the data read.
+    """
+    frame = _Frame()
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:  # keep the peak of the enclosing stage so far
+            stack[-1].peak = max(stack[-1].peak, peak)
+        frame.memory = current
+        tracemalloc.reset_peak()
+
+    stack.append(frame)
+    start = perf_counter()
+    try:
+        yield frame
+    finally:
+        wall = perf_counter() - start
+        stack.pop()
+
+        peak = None
+        if tracing and tracemalloc.is_tracing():
+            frame.peak = max(frame.peak, tracemalloc.get_traced_memory()[1])
+            peak = frame.peak - frame.memory
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, frame.peak)
+            tracemalloc.reset_peak()
+
+        if _hooks or logger.isEnabledFor(logging.DEBUG):
+            record = Stage(name, wall, frame.nbytes, peak, info)
+            logger.debug('%s %.4fs %s bytes, peak %s bytes %s', name, wall,
+                         frame.nbytes, peak, info)
+            for hook in list(_hooks):
+                hook(record)
+
+
+class Report:
+    """
+    The stages collected by :func:`profile`.
+
+    Attributes
+    ----------
+    stages : list of :class:`Stage`
+        All stages, in the order they ended.
+
+    wall : float
+        Total wall time of the profiled block in seconds.
+    """
+    def __init__(self):
+        self.stages = []
+        self.wall = None
+        self._lock = Lock()
+
+    def __call__(self, stage):
+        with self._lock:
+            self.stages.append(stage)
+
+    def summary(self):
+        """
+        Totals per stage name: ``{name: {'count', 'wall', 'nbytes',
+        'peak'}}``, where ``peak`` is the largest peak of the stage.
+        """
+        summary = {}
+        for stage in self.stages:
+            totals = summary.setdefault(
+                stage.name, dict(count=0, wall=0.0, nbytes=0, peak=None)
+            )
+            totals['count'] += 1
+            totals['wall'] += stage.wall
+            totals['nbytes'] += stage.nbytes or 0
+            if stage.peak is not None:
+                totals['peak'] = max(totals['peak'] or 0, stage.peak)
+        return summary
+
+    def __str__(self):
+        lines = [f'{"stage":<10}{"count":>8}{"wall [s]":>12}'
+                 f'{"MB":>12}{"peak MB":>12}']
+        for name, totals in self.summary().items():
+            peak = totals['peak']
+            peak = '-' if peak is None else f'{peak / 2**20:.1f}'
+            lines.append(f'{name:<10}{totals["count"]:>8}'
+                         f'{totals["wall"]:>12.3f}'
+                         f'{totals["nbytes"] / 2**20:>12.1f}{peak:>12}')
+        if self.wall is not None:
+            lines.append(f'{"total":<10}{"":>8}{self.wall:>12.3f}')
+        return '\n'.join(lines)
+
+
+@contextmanager
+def profile(callback=None, memory=True):
+    """
+    Collect the stages of everything read within the block.
+
+    Stages are collected process wide, in all threads. Stages that run
+    in worker processes (``pool='process'``) are not collected.
+
+    Parameters
+    ----------
+    callback : callable, optional
+        Also called with every :class:`Stage` as it ends.
+
+    memory : bool
+        Trace memory allocations with :mod:`tracemalloc` to report the
+        peak memory of every stage. Tracing slows down allocation heavy
+        code. Peaks are process wide, i.e. include concurrent stages.
+
+    Yields
+    ------
+    :class:`Report`
+
+    Examples
+    --------
+    >>> with rasterx.profile() as report:
+    ...     ds = rasterx.read('/data/AsterGDEM', extent=(86, 88, 27, 29))
+    >>> print(report)
+    """
+    report = Report()
+    trace = memory and not tracemalloc.is_tracing()
+    if trace:
+        tracemalloc.start()
+    add_hook(report)
+    if callback is not None:
+        add_hook(callback)
+
+    start = perf_counter()
+    try:
+        yield report
+    finally:
+        report.wall = perf_counter() - start
+        remove_hook(report)
+        if callback is not None:
+            remove_hook(callback)
+        if trace:
+            tracemalloc.stop()
@@ -0,0 +1,142 @@
+import os
+
+import gdal
+
+
+URL_SCHEMES = ('http://', 'https://', 'ftp://')
+
+# GDAL configuration options for reading through /vsicurl/, see
+# https://gdal.org/user/configoptions.html
+OPTIONS = {
+    # do not list the directory of every file that is opened, which
+    # costs a request per file. Note that external overviews (.ovr) of
+    # remote files are not found either.
+    'GDAL_DISABLE_READDIR_ON_OPEN': 'EMPTY_DIR',
+    # merge requests of neighbouring blocks into one range request
+    'GDAL_HTTP_MERGE_CONSECUTIVE_RANGES': 'YES',
+    # reuse connections, multiplexed over HTTP/2 where supported
+    'GDAL_HTTP_MULTIPLEX': 'YES',
+    'GDAL_HTTP_VERSION': '2TLS',
+    'GDAL_HTTP_TCP_KEEPALIVE': 'YES',
+    # in-memory caches of the blocks fetched, in bytes
+    'CPL_VSIL_CURL_CACHE_SIZE': str(64 * 2**20),
+    'VSI_CACHE': 'TRUE',
+    'VSI_CACHE_SIZE': str(64 * 2**20),
+}
+
+# Options that also change how local files are read, which can only be
+# set for /vsicurl/ paths with GDAL >= 3.6, and are skipped otherwise
+LOCAL_OPTIONS = ('GDAL_DISABLE_READDIR_ON_OPEN', 'VSI_CACHE',
+                 'VSI_CACHE_SIZE')
+
+_configured = False
+
+
+def _set_option(key, value):
+    # for /vsicurl/ paths only, where GDAL supports it
+    if hasattr(gdal, 'SetPathSpecificOption'):
+        gdal.SetPathSpecificOption('/vsicurl/', key, value)
+    elif key not in LOCAL_OPTIONS:
+        gdal.SetConfigOption(key, value)
+
+
+def configure(cache_size=None, connection_reuse=None, **options):
+    """
+    Configure how remote files are read through GDAL's ``/vsicurl/``.
+
+    Options are set for ``/vsicurl/`` paths only, with
+    :func:`gdal.SetPathSpecificOption`, so that reading local files in
+    the same process is not affected, e.g. their external overviews
+    (.ovr) and side files (.aux.xml, .tfw) are still found. GDAL older
+    than 3.6 can not scope options to paths: options that only affect
+    network reads are then set process-wide and those in
+    :data:`LOCAL_OPTIONS` are skipped. The environment is never
+    changed. Rasterio only sees the options if it uses the same GDAL
+    library.
+
+    The defaults in :data:`OPTIONS` are applied the first time a url
+    is read, unless the option is already set in the environment.
+
+    Parameters
+    ----------
+    cache_size : int, optional
+        Size, in bytes, of the in-memory cache of the blocks fetched
+        from remote files. Blocks that were fetched once are not
+        requested again, e.g. when reading overlapping windows.
+
+    connection_reuse : bool, optional
+        Keep connections alive and multiplex requests over them (with
+        HTTP/2 servers) instead of opening a new connection per request.
+
+    Other keyword arguments are GDAL configuration options, e.g.
+    ``GDAL_HTTP_TIMEOUT=30``.
+
+    Examples
+    --------
+    >>> rasterx.remote.configure(cache_size=512 * 2**20)
+    """
+    global _configured
+
+    if cache_size is not None:
+        options['CPL_VSIL_CURL_CACHE_SIZE'] = cache_size
+        options['VSI_CACHE_SIZE'] = cache_size
+    if connection_reuse is not None:
+        value = 'YES' if connection_reuse else 'NO'
+        options['GDAL_HTTP_MULTIPLEX'] = value
+        options['GDAL_HTTP_TCP_KEEPALIVE'] = value
+
+    if not _configured:
+        options = {**{key: value for key, value in OPTIONS.items()
+                      if key not in os.environ}, **options}
+        _configured = True
+
+    for key, value in options.items():
+        _set_option(key, str(value))
+
+
+def _is_url(path):
+    # True for urls and /vsicurl/ paths
+    return isinstance(path, str) and (
+        path.startswith(URL_SCHEMES) or path.startswith('/vsicurl/')
+    )
+
+
+def _vsicurl(path):
+    """
+    The GDAL ``/vsicurl/`` path of a url, which is read with http range
+    requests, i.e. only the blocks that are accessed are fetched. Other
+    paths are returned as is.
+    """
+    if not _is_url(path):
+        return path
+    if not _configured:
+        configure()
+    if path.startswith('/vsicurl/'):
+        return path
+    return '/vsicurl/' + path
+
+
+def _archive_type(url):
+    # the vsi prefix of a remote archive, guessed from its extension
+    name = url.lower().split('?')[0]
+    if name.endswith('.zip'):
+        return 'zip'
+    if name.endswith(('.tar', '.tar.gz', '.tgz')):
+        return 'tar'
+    return None
+
+
+def _list(path):
+    """
+    Names of the files in a remote directory or in an archive, given its
+    ``/vsizip/`` or ``/vsitar/`` path, as listed by GDAL. Remote
+    directories are listed from the html index served for the url.
+    """
+    if _is_url(path):
+        names = gdal.ReadDir(_vsicurl(path).rstrip('/'))
+    else:
+        names = gdal.ReadDirRecursive(path)
+    if names is None:
+        raise OSError(f'Unable to list {path}...\n'
+                      f'{gdal.GetLastErrorMsg()}')
+    return [name for name in names if not name.endswith('/')]
@@ -0,0 +1,471 @@
+from itertools import repeat
+from warnings import catch_warnings, simplefilter
+
+import numpy as np
+
+from xarray import Dataset, Variable
+
+from rasterx.core import (_is_dir, _get_tiles, _readrasterfile, _imap,
+                          _lock)
+from rasterx.mosaicking import snap_to_grid, _grid_layout
+from rasterx.utils import _fill_value, _is_nan
+from rasterx.profiling import stage, logger
+
+
+STATS = ('count', 'sum', 'mean', 'var', 'std', 'min', 'max', 'histogram')
+
+
+class _Aggregate:
+    """
+    Mergeable partial aggregate of the valid values of a variable within
+    a region: count, sum, sum of squared deviations from the mean, min,
+    max and histogram, for every 2D slice of the variable.
+
+    Sums of squared deviations are merged with the pairwise update of
+    Chan et al., which, unlike raw sums of squares, does not lose
+    precision when the variance is small compared to the mean.
+    """
+    def __init__(self, size, bins=None):
+        self.count = np.zeros(size, dtype=np.int64)
+        self.sum = np.zeros(size)
+        self.m2 = np.zeros(size)
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+        self.bins = bins
+        self.histogram = None
+        if bins is not None:
+            self.histogram = np.zeros((size, len(bins) - 1), dtype=np.int64)
+
+    def add(self, k, values):
+        # add the (1D, valid) values of slice k
+        if not values.size:
+            return
+        values = values.astype(np.float64, copy=False)
+        total = values.sum()
+        m2 = np.square(values - total / values.size).sum()
+        self._update(k, values.size, total, m2, values.min(), values.max())
+        if self.bins is not None:
+            self.histogram[k] += np.histogram(values, self.bins)[0]
+
+    def _update(self, k, n, total, m2, vmin, vmax):
+        count = self.count[k]
+        if count:
+            delta = total / n - self.sum[k] / count
+            m2 += self.m2[k] + delta**2 * count * n / (count + n)
+        self.count[k] += n
+        self.sum[k] += total
+        self.m2[k] = m2
+        self.min[k] = min(self.min[k], vmin)
+        self.max[k] = max(self.max[k], vmax)
+
+    def merge(self, other):
+        for k in np.flatnonzero(other.count):
+            self._update(k, other.count[k], other.sum[k], other.m2[k],
+                         other.min[k], other.max[k])
+        if self.histogram is not None:
+            self.histogram += other.histogram
+        return self
+
+    def result(self, stat):
+        if stat == 'count':
+            return self.count
+        if stat == 'histogram':
+            return self.histogram
+
+        empty = self.count == 0
+        count = np.where(empty, 1, self.count)
+        values = {
+            'sum': self.sum,
+            'mean': self.sum / count,
+            'var': self.m2 / count,
+            'std': np.sqrt(self.m2 / count),
+            'min': self.min,
+            'max': self.max,
+        }[stat]
+        if stat == 'sum':
+            return values
+        return np.where(empty, np.nan, values)
+
+
+def _region(region):
+    """
+    The ``(x1, x2, y1, y2)`` bounding box of a region and the rings of
+    its polygon, or ``None`` if the region is a bounding box.
+    """
+    geometry = getattr(region, '__geo_interface__', region)
+    if isinstance(geometry, dict):
+        if geometry.get('type') == 'Feature':
+            geometry = geometry['geometry']
+        kind, coordinates = geometry.get('type'), geometry['coordinates']
+        if kind == 'Polygon':
+            rings = coordinates
+        elif kind == 'MultiPolygon':
+            rings = [ring for polygon in coordinates for ring in polygon]
+        else:
+            raise ValueError(f'Unsupported geometry type {kind!r}...')
+        rings = [np.asarray(ring, dtype=float)[:, :2] for ring in rings]
+    else:
+        array = np.asarray(region, dtype=float)
+        if array.shape == (4,):
+            x1, x2, y1, y2 = array
+            if x1 >= x2:
+                raise ValueError('`x1` must be < `x2`')
+            if y1 >= y2:
+                raise ValueError('`y1` must be < `y2`')
+            return (x1, x2, y1, y2), None
+        if array.ndim != 2 or array.shape[1] != 2 or len(array) < 3:
+            raise ValueError('A region must be an `(x1, x2, y1, y2)` '
+                             'bounding box, an `(n, 2)` array of polygon '
+                             'vertices or a (Multi)Polygon geometry')
+        rings = [array]
+
+    points = np.concatenate(rings)
+    x, y = points[:, 0], points[:, 1]
+    return (x.min(), x.max(), y.min(), y.max()), rings
+
+
+def _regions(regions):
+    # (single, names, [(bbox, rings), ...]) of the regions argument
+    if isinstance(regions, dict) and 'type' not in regions:
+        names = list(regions)
+        return False, names, [_region(regions[name]) for name in names]
+
+    try:  # a single region...
+        return True, [0], [_region(regions)]
+    except (ValueError, TypeError, KeyError):
+        pass
+    # ... or a list of them
+    regions = list(regions)
+    return False, list(range(len(regions))), [_region(r) for r in regions]
+
+
+def _polygon_mask(x, y, rings):
+    """
+    Mask of the pixels, centered at ``x`` (columns) and ``y`` (rows),
+    within a polygon, by the even-odd rule. Scanlines are intersected
+    with the edges of all rings, so that holes are excluded.
+    """
+    starts = np.concatenate(rings)
+    ends = np.concatenate([np.roll(ring, -1, axis=0) for ring in rings])
+    x0, y0 = starts[:, 0], starts[:, 1]
+    x1, y1 = ends[:, 0], ends[:, 1]
+
+    mask = np.zeros((y.size, x.size), dtype=bool)
+    for j, yj in enumerate(y):
+        crossing = (y0 <= yj) != (y1 <= yj)
+        if not crossing.any():
+            continue
+        a, b, c, d = x0[crossing], y0[crossing], x1[crossing], y1[crossing]
+        xs = np.sort(a + (yj - b) * (c - a) / (d - b))
+        mask[j] = np.searchsorted(xs, x, side='right') % 2 == 1
+    return mask
+
+
+def _reduce_tile(tile, filename, windows, blocked, bins=None):
+    """
+    Partial aggregates of the valid pixels of a tile that fall within
+    each region and that the tile owns in the mosaic.
+
+    Parameters
+    ----------
+    windows : list
+        ``(k, rows, cols, rings)`` of every region ``k`` intersecting
+        the tile, with the pixel slices of its bounding box and the
+        rings of its polygon, if any.
+
+    blocked : list
+        ``(rows, cols)`` pixel slices of the tile that are covered by
+        tiles which take precedence in the mosaic.
+
+    Returns
+    -------
+    dict
+        ``{k: {name: _Aggregate}}``
+    """
+    geo = tile.geo
+    xdim, ydim = geo._x, geo._y
+    rows = slice(min(w[1].start for w in windows),
+                 max(w[1].stop for w in windows))
+    cols = slice(min(w[2].start for w in windows),
+                 max(w[2].stop for w in windows))
+
+    with _lock(filename), stage('decode', filename=filename) as frame:
+        block = tile.isel({ydim: rows, xdim: cols}).load()
+        frame.nbytes = block.nbytes
+
+    owned = np.ones((rows.stop - rows.start, cols.stop - cols.start),
+                    dtype=bool)
+    for r, c in blocked:
+        owned[max(r.start - rows.start, 0):max(r.stop - rows.start, 0),
+              max(c.start - cols.start, 0):max(c.stop - cols.start, 0)] = False
+
+    x, y = block[xdim].values, block[ydim].values
+    variables = {}
+    for name, var in block.data_vars.items():
+        if xdim in var.dims and ydim in var.dims:
+            values = var.transpose(..., ydim, xdim).values
+            variables[name] = (values.reshape((-1,) + values.shape[-2:]),
+                               _fill_value(var))
+
+    partials = {}
+    for k, r, c, rings in windows:
+        r = slice(r.start - rows.start, r.stop - rows.start)
+        c = slice(c.start - cols.start, c.stop - cols.start)
+        mask = owned[r, c]
+        if rings is not None:
+            mask = mask & _polygon_mask(x[c], y[r], rings)
+
+        partials[k] = {}
+        for name, (values, nodata) in variables.items():
+            aggregate = _Aggregate(len(values), bins)
+            for i, v in enumerate(values):
+                v = v[r, c][mask]
+                if v.dtype.kind == 'f':
+                    v = v[~np.isnan(v)]
+                if nodata is not None and not _is_nan(nodata):
+                    v = v[v != nodata]
+                aggregate.add(i, v)
+            partials[k][name] = aggregate
+    return partials
+
+
+def _plan(raw, offsets, parsed, overlap='first'):
+    """
+    ``(tile index, windows, blocked)`` of every tile intersecting the
+    regions, see :func:`_reduce_tile`.
+    """
+    offsets = np.array(offsets)
+    sizes = np.array([(t.geo.grid.nx, t.geo.grid.ny) for t in raw])
+    ends = offsets + sizes
+
+    plan = []
+    for t, tile in enumerate(raw):
+        grid = tile.geo.grid
+        windows = []
+        for k, ((x1, x2, y1, y2), rings) in enumerate(parsed):
+            # the pixels trim would select, see GeoAccessor.trim
+            i1, i2 = tile.geo._index_range(grid.x0, grid.dx, x1, x2)
+            j1, j2 = tile.geo._index_range(grid.y0, grid.dy, y1, y2)
+            i1, i2 = max(i1, 0), min(i2, grid.nx - 1)
+            j1, j2 = max(j1, 0), min(j2, grid.ny - 1)
+            if i1 <= i2 and j1 <= j2:
+                windows.append((k, slice(j1, j2 + 1), slice(i1, i2 + 1),
+                                rings))
+        if not windows:
+            continue
+
+        # tiles that win the pixels they share with this one
+        others = np.arange(len(raw))
+        others = others[others < t] if overlap == 'first' else others[
+            others > t]
+        start = np.maximum(offsets[others], offsets[t])
+        stop = np.minimum(ends[others], ends[t])
+        hit = np.all(start < stop, axis=1)
+        blocked = [
+            (slice(y0 - offsets[t][1], y1 - offsets[t][1]),
+             slice(x0 - offsets[t][0], x1 - offsets[t][0]))
+            for (x0, y0), (x1, y1) in zip(start[hit], stop[hit])
+        ]
+        plan.append((t, windows, blocked))
+    return plan
+
+
+def stats(path, regions, stats=('count', 'min', 'max', 'mean', 'std'),
+          substring=None, bins=None, bin_range=None, workers=1,
+          pool='thread', overlap='first', snap=True, mask_and_scale=False,
+          **kwargs):
+    """
+    Statistics of raster data within regions, without building a
+    mosaic.
+
+    The tiles covering the regions are reduced one at a time (or in
+    parallel): only the window of each tile that covers the regions is
+    read and reduced to partial aggregates (count, sum, sum of squared
+    deviations, min, max and histogram) per region, which are then
+    merged. Memory stays at about one tile window per worker.
+
+    Pixels shared by several tiles (e.g. the edges of AsterGDEM and
+    SRTM tiles) are counted once, from the tile that
+    :func:`~rasterx.core.read` would keep (see ``overlap``), so that the
+    statistics are the same as those of the mosaic read with
+    ``extent`` set to the bounding box of each region (and masked by
+    its polygon).
+
+    Parameters
+    ----------
+    path : str, list
+        Path to a file, a list of files or a directory of tiles. See
+        :func:`~rasterx.core.read`.
+
+    regions : tuple, array, geometry, list or dict
+        A region or a list or dict of regions. A region is either an
+        ``(x1, x2, y1, y2)`` bounding box, an ``(n, 2)`` array of the
+        ``(x, y)`` vertices of a polygon or a GeoJSON-like Polygon or
+        MultiPolygon (e.g. a shapely geometry, through its
+        ``__geo_interface__``). Pixels are within a polygon if their
+        center is (centers on its boundary may fall either way).
+
+    stats : list of str
+        Any of ``'count'`` (of valid pixels), ``'sum'``, ``'mean'``,
+        ``'var'``, ``'std'`` (population variance and standard
+        deviation), ``'min'``, ``'max'`` and ``'histogram'``.
+
+    substring : str, optional
+        See :func:`~rasterx.core.read`.
+
+    bins : int or array-like, optional
+        Number of bins (with ``bin_range``) or bin edges of the
+        histogram. Required for ``'histogram'``, as the bins must be
+        known before the tiles are reduced. See :func:`numpy.histogram`.
+
+    bin_range : tuple, optional
+        ``(min, max)`` of the bins if ``bins`` is a number.
+
+    workers : int, optional
+        Number of tiles reduced in parallel. ``None`` or ``-1`` uses all
+        available cores.
+
+    pool : {'thread', 'process'}
+        The type of worker pool used if ``workers > 1``.
+
+    overlap : {'first', 'last'}
+        Which tile pixels shared by several tiles are taken from. See
+        :func:`~rasterx.core.read`.
+
+    snap, mask_and_scale :
+        See :func:`~rasterx.core.read`.
+
+    Other Parameters
+    ----------------
+    template, ext, lonlat, tilesize, index :
+        Used to find the tiles if ``path`` is a directory. See
+        :func:`~rasterx.core.read`.
+
+    Returns
+    -------
+    :class:`~xarray.Dataset`
+        A ``<name>_<stat>`` variable for every spatial data variable and
+        statistic, along a ``region`` dimension (unless a single region
+        is given), with the names (keys) or indices of the regions. The
+        histogram has an additional ``bin`` dimension with
+        ``bin_lower`` and ``bin_upper`` coordinates. Regions without
+        valid pixels get a count of 0 and ``NaN`` statistics.
+
+    Examples
+    --------
+    >>> stats('/data/AsterGDEM', {'everest': (86.8, 87.1, 27.8, 28.1),
+    ...                           'nepal': nepal_polygon},
+    ...       stats=['min', 'max', 'mean', 'histogram'],
+    ...       bins=100, bin_range=(0, 9000), workers=4)
+    """
+    for stat in stats:
+        if stat not in STATS:
+            raise ValueError(f'`stats` must be any of {STATS}, got {stat!r}')
+    if overlap not in ('first', 'last'):
+        raise ValueError("`stats` supports `overlap='first'` or `'last'` "
+                         "only")
+
+    edges = None
+    if 'histogram' in stats:
+        if bins is None or (np.ndim(bins) == 0 and bin_range is None):
+            raise ValueError("'histogram' requires `bins` edges or a "
+                             "number of `bins` and a `bin_range`")
+        edges = np.histogram_bin_edges([], bins, bin_range)
+
+    single, names, parsed = _regions(regions)
+
+    if _is_dir(path):
+        with stage('discover', path=path):
+            wanted = set()
+            for bbox, _ in parsed:
+                wanted.update(_get_tiles(path, *bbox, **kwargs))
+            # all tiles in the order read() would merge them
+            x1, _, y1, _ = np.min([bbox for bbox, _ in parsed], axis=0)
+            _, x2, _, y2 = np.max([bbox for bbox, _ in parsed], axis=0)
+            with catch_warnings():
+                simplefilter('ignore')  # missing tiles are warned above
+                files = [f for f in _get_tiles(path, x1, x2, y1, y2,
+                                               **kwargs) if f in wanted]
+    elif isinstance(path, str):
+        files = [path]
+    else:
+        files = list(path)
+    if not files:
+        raise ValueError('None of the tiles intersect with `regions`...')
+
+    # tiles are opened lazily, only their coordinates are read
+    raw = []
+    for f in files:
+        with stage('open', filename=f):
+            raw.append(_readrasterfile(f, substring, None, None,
+                                       mask_and_scale))
+    tiles = snap_to_grid(raw) if snap else raw
+    layout = _grid_layout(tiles)
+    if layout is None:
+        raise ValueError('Tiles do not share a common regular grid...')
+
+    plan = _plan(raw, layout[0], parsed, overlap)
+    logger.info('Reducing %d tiles...', len(plan))
+    partials = _imap(
+        _reduce_tile,
+        [tiles[t] for t, _, _ in plan], [files[t] for t, _, _ in plan],
+        [windows for _, windows, _ in plan],
+        [blocked for _, _, blocked in plan], repeat(edges),
+        workers=workers, pool=pool
+    )
+
+    totals = {}
+    try:
+        for aggregates in partials:
+            for k, named in aggregates.items():
+                for name, aggregate in named.items():
+                    if name in totals.setdefault(k, {}):
+                        totals[k][name].merge(aggregate)
+                    else:
+                        totals[k][name] = aggregate
+    finally:
+        for tile in raw:
+            tile.close()
+
+    first = tiles[0]
+    xdim, ydim = first.geo._x, first.geo._y
+    data_vars = {}
+    coords = {'region': Variable('region', names)}
+    for name, var in first.data_vars.items():
+        if xdim not in var.dims or ydim not in var.dims:
+            continue
+        dims = var.transpose(..., ydim, xdim).dims[:-2]
+        shape = tuple(var.sizes[dim] for dim in dims)
+        for dim in dims:
+            if dim in first.coords:
+                coords[dim] = first[dim].variable
+
+        aggregates = [
+            totals.get(k, {}).get(name) or
+            _Aggregate(int(np.prod(shape)), edges)
+            for k in range(len(parsed))
+        ]
+        attrs = {key: var.attrs[key] for key in ('units',)
+                 if key in var.attrs}
+        for stat in stats:
+            values = np.stack([a.result(stat) for a in aggregates])
+            if stat == 'histogram':
+                data_vars[f'{name}_{stat}'] = Variable(
+                    ('region',) + dims + ('bin',),
+                    values.reshape((len(parsed),) + shape + (-1,))
+                )
+            else:
+                data_vars[f'{name}_{stat}'] = Variable(
+                    ('region',) + dims,
+                    values.reshape((len(parsed),) + shape),
+                    {} if stat in ('count', 'var') else attrs
+                )
+
+    if edges is not None:
+        coords['bin_lower'] = Variable('bin', edges[:-1])
+        coords['bin_upper'] = Variable('bin', edges[1:])
+
+    ds = Dataset(data_vars, coords=coords)
+    if single:
+        ds = ds.isel(region=0, drop=True)
+    return ds
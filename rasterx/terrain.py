@@ -0,0 +1,288 @@
+from functools import partial
+
+import numpy as np
+
+from xarray import Dataset, Variable
+
+from rasterx.core import _imap
+from rasterx.utils import _fill_value, _is_nan
+
+
+# WGS84 ellipsoid, used for the metric spacing of lon/lat grids
+SEMI_MAJOR_AXIS = 6378137.0
+FLATTENING = 1 / 298.257223563
+
+
+def _metric_spacing(lat, dlon, dlat):
+    """
+    East-west and north-south spacing, in meters, of a lon/lat grid
+    with spacing ``dlon``, ``dlat`` (degrees, signed) at latitudes
+    ``lat``, from the radii of curvature of the ellipsoid.
+    """
+    e2 = FLATTENING * (2 - FLATTENING)
+    phi = np.radians(lat)
+    w = 1 - e2 * np.sin(phi)**2
+    n = SEMI_MAJOR_AXIS / np.sqrt(w)  # prime vertical
+    m = SEMI_MAJOR_AXIS * (1 - e2) / w**1.5  # meridian
+    return n * np.cos(phi) * np.radians(dlon), m * np.radians(dlat)
+
+
+def _is_geographic(ds):
+    """
+    ``True`` if the grid of ``ds`` is lon/lat, from the names or units
+    of its spatial coordinates, its CRS attributes or, lacking those,
+    from the range of its coordinates.
+    """
+    geo = ds.geo
+    if geo._x in ('lon', 'longitude') and geo._y in ('lat', 'latitude'):
+        return True
+    if str(ds[geo._x].attrs.get('units', '')).startswith('degree'):
+        return True
+
+    for attrs in [ds.attrs] + [var.attrs for var in ds.variables.values()]:
+        for key in ('crs_wkt', 'spatial_ref', 'crs'):
+            crs = attrs.get(key)
+            if isinstance(crs, str) and crs:
+                crs = crs.strip()
+                return (crs.upper().startswith(('GEOGCS', 'GEOGCRS')) or
+                        'longlat' in crs or 'latlong' in crs or
+                        crs.lower().endswith('epsg:4326'))
+
+    y1, y2 = sorted(geo.extent[2:])
+    return geo._is_longitude() and -90 <= y1 and y2 <= 90
+
+
+def _gradient(z, dx, dy):
+    """
+    ``(dz/dx, dz/dy)`` along the last two ``(y, x)`` axes of ``z`` with
+    Horn's 3x3 stencil. ``dx`` and ``dy`` are the (signed) spacing of
+    every row, shaped ``(ny, 1)``. The outermost pixels, which lack
+    neighbours, are ``NaN``.
+    """
+    p = np.full(z.shape, np.nan, dtype=z.dtype)
+    q = np.full(z.shape, np.nan, dtype=z.dtype)
+    if z.shape[-2] < 3 or z.shape[-1] < 3:
+        return p, q
+
+    a, b, c = z[..., :-2, :-2], z[..., :-2, 1:-1], z[..., :-2, 2:]
+    d, f = z[..., 1:-1, :-2], z[..., 1:-1, 2:]
+    g, h, i = z[..., 2:, :-2], z[..., 2:, 1:-1], z[..., 2:, 2:]
+    p[..., 1:-1, 1:-1] = ((c + 2 * f + i) - (a + 2 * d + g)) / (8 * dx[1:-1])
+    q[..., 1:-1, 1:-1] = ((g + 2 * h + i) - (a + 2 * b + c)) / (8 * dy[1:-1])
+    return p, q
+
+
+def _slope(p, q, units='degrees'):
+    gradient = np.hypot(p, q)
+    if units == 'percent':
+        return 100 * gradient
+    return np.degrees(np.arctan(gradient))
+
+
+def _aspect(p, q):
+    # azimuth of the downslope direction, NaN where flat
+    aspect = np.degrees(np.arctan2(-p, -q)) % 360
+    aspect[(p == 0) & (q == 0)] = np.nan
+    return aspect
+
+
+def _hillshade(p, q, azimuth=315, altitude=45):
+    # cosine of the angle between the surface normal and the sun
+    azimuth, altitude = np.radians(azimuth), np.radians(altitude)
+    shade = (np.sin(altitude) -
+             np.cos(altitude) * (p * np.sin(azimuth) + q * np.cos(azimuth))
+             ) / np.sqrt(1 + p * p + q * q)
+    return np.clip(shade, 0, 1)
+
+
+# Derivatives, by name, of the gradient towards (east, north)
+DERIVATIVES = {
+    'slope': _slope,
+    'aspect': _aspect,
+    'hillshade': _hillshade,
+}
+
+
+def _kernel(z, dx, dy, derivative, fill_value=None, z_factor=1, **kwargs):
+    # the derivative of a block of z (incl. halo) with nodata as NaN
+    dtype = np.float64 if z.dtype == np.float64 else np.float32
+    nodata = None
+    if fill_value is not None and not _is_nan(fill_value):
+        nodata = z == fill_value
+    z = z.astype(dtype)
+    if nodata is not None:
+        z[nodata] = np.nan
+
+    p, q = _gradient(z, dx.astype(dtype), dy.astype(dtype))
+    if z_factor != 1:
+        p *= z_factor
+        q *= z_factor
+    # the stencil skips the center pixel, which may itself be nodata
+    p[np.isnan(z)] = np.nan
+    return DERIVATIVES[derivative](p, q, **kwargs).astype(dtype, copy=False)
+
+
+def _attrs(derivative, units='degrees', **kwargs):
+    if derivative == 'hillshade':
+        return dict(long_name=derivative)
+    return dict(long_name=derivative, units=units)
+
+
+def derive(ds, derivative, z_factor=1, geographic=None, block_shape=1024,
+           workers=1, path=None, **kwargs):
+    """
+    Terrain derivative of every spatial data variable of ``ds``.
+
+    The gradient is computed with Horn's 3x3 stencil, as in `gdaldem`_.
+    On lon/lat grids, the spacing is converted to meters for every row,
+    from the latitude and the WGS84 ellipsoid, so that elevations in
+    meters give true slopes at any latitude. Nodata pixels (``NaN`` or
+    the nodata value of the variable) and the outermost pixels of the
+    dataset, which lack neighbours, are ``NaN``.
+
+    Dask-backed variables (e.g. read with ``chunks``) are processed
+    lazily, chunk by chunk with a halo of one pixel (see
+    :func:`dask.array.map_overlap`), and computed in parallel by the
+    dask scheduler. Other variables are processed in blocks of
+    ``block_shape`` with a halo (see
+    :meth:`~rasterx.geo_accessor.GeoAccessor.iter_blocks`), so that
+    lazily opened files are read one block at a time, by ``workers``
+    threads.
+
+    Parameters
+    ----------
+    ds : :class:`~xarray.Dataset`
+        Elevations on a regular grid.
+
+    derivative : {'slope', 'aspect', 'hillshade'}
+        See :data:`DERIVATIVES`.
+
+    z_factor : float
+        Multiplies the elevations, e.g. to convert feet to meters.
+
+    geographic : bool, optional
+        Whether the grid is lon/lat (in degrees) and the spacing is to
+        be converted to meters. By default, this is guessed from the
+        names, units and CRS of the spatial coordinates. Otherwise, the
+        spacing must be in the units of the elevations.
+
+    block_shape : int or tuple
+        ``(ny, nx)`` size of the blocks of variables that are not
+        dask-backed.
+
+    workers : int, optional
+        Number of threads processing blocks. ``None`` or ``-1`` uses
+        all available cores.
+
+    path : str, optional
+        A directory for memory-mapped output of variables that are not
+        dask-backed (see :class:`~rasterx.blocks.BlockWriter`).
+
+    Other keyword arguments are passed on to the derivative, e.g.
+    ``units`` of the slope or ``azimuth`` and ``altitude`` of the
+    hillshade.
+
+    Returns
+    -------
+    :class:`~xarray.Dataset`
+        The derivative of every spatial data variable, as float32 (or
+        float64 for float64 data).
+
+    .. _gdaldem:
+        https://gdal.org/programs/gdaldem.html
+    """
+    if derivative not in DERIVATIVES:
+        raise ValueError(f'`derivative` must be one of {list(DERIVATIVES)}, '
+                         f'got {derivative!r}')
+
+    geo = ds.geo
+    xdim, ydim = geo._x, geo._y
+    grid = geo.grid
+    if not grid.regular:
+        raise ValueError('Terrain derivatives require a regular grid...')
+    if geographic is None:
+        geographic = _is_geographic(ds)
+
+    def spacing(y):
+        # (dx, dy) of every row at y, shaped (ny, 1)
+        if geographic:
+            dx, dy = _metric_spacing(y, grid.dx, grid.dy)
+        else:
+            dx, dy = np.full(y.shape, grid.dx), np.full(y.shape, grid.dy)
+        return dx[:, None], dy[:, None]
+
+    variables = [name for name, var in ds.data_vars.items()
+                 if xdim in var.dims and ydim in var.dims]
+    if not variables:
+        raise ValueError('No spatial data variables...')
+
+    attrs = _attrs(derivative, **kwargs)
+    kernel = partial(_kernel, derivative=derivative, z_factor=z_factor,
+                     **kwargs)
+
+    lazy = {name for name in variables if ds[name].chunks is not None}
+    data_vars = {}
+    for name in lazy:
+        var = ds[name]
+        data_vars[name] = _derive_lazy(
+            var, xdim, ydim, spacing(ds[ydim].values),
+            partial(kernel, fill_value=_fill_value(var)), attrs
+        )
+
+    eager = [name for name in variables if name not in lazy]
+    if eager:
+        result = _derive_blocks(ds[eager], spacing, kernel, block_shape,
+                                workers, path)
+        for name in eager:
+            var = result[name]
+            var.attrs = dict(attrs)
+            data_vars[name] = var
+
+    return Dataset({name: data_vars[name] for name in variables},
+                   attrs=ds.attrs)
+
+
+def _derive_lazy(var, xdim, ydim, spacing, kernel, attrs):
+    import dask.array as da
+
+    dims = var.dims
+    var = var.transpose(..., ydim, xdim)
+    data = var.data
+    ychunks = data.chunks[-2]
+    dx, dy = (da.from_array(d, chunks=(ychunks, 1)) for d in spacing)
+
+    depth = {data.ndim - 2: 1, data.ndim - 1: 1}
+    out = da.map_overlap(
+        lambda z, dx, dy: kernel(z, dx, dy), data, dx, dy,
+        depth=[depth, {0: 1, 1: 0}, {0: 1, 1: 0}], boundary='none',
+        dtype=np.float64 if data.dtype == np.float64 else np.float32
+    )
+    var = var.copy(data=out)
+    var.attrs = dict(attrs)
+    var.encoding = {}
+    return var.transpose(*dims)
+
+
+def _derive_blocks(ds, spacing, kernel, block_shape=1024, workers=1,
+                   path=None):
+    geo = ds.geo
+    xdim, ydim = geo._x, geo._y
+
+    def derive_block(item):
+        window, block = item
+        dx, dy = spacing(block[ydim].values)
+        data_vars = {}
+        for name, var in block.data_vars.items():
+            z = var.transpose(..., ydim, xdim)
+            data_vars[name] = Variable(
+                z.dims, kernel(z.values, dx, dy, fill_value=_fill_value(var))
+            )
+        return window, Dataset(data_vars, coords={
+            ydim: block[ydim].variable, xdim: block[xdim].variable
+        })
+
+    writer = geo.block_writer(path)
+    blocks = geo.iter_blocks(block_shape, overlap=1)
+    for window, block in _imap(derive_block, blocks, workers=workers):
+        writer.write(window, block)
+    return writer.result()
@@ -0,0 +1,372 @@
+import os
+import re
+import json
+from string import Formatter
+
+import numpy as np
+
+from warnings import warn
+
+from rasterx.cache import cache_path, _key
+from rasterx.remote import _is_url, _list
+
+
+INDEX_VERSION = 1
+
+# in-process indexes, keyed by (path, template, use_info)
+_INDEXES = {}
+
+# cache directories that indexes could not be saved to
+_UNWRITABLE = set()
+
+
+def _template_regex(template):
+    """
+    Translate a tile filename template, e.g.
+    ``'*_{y_sep}{y:02d}{x_sep}{x:03d}*.nc'``, into a regular expression
+    that parses the coordinates of the SW corner of a tile from its
+    filename. Glob wildcards (``*`` and ``?``) are understood.
+    """
+    fields = {
+        'y_sep': '(?P<y_sep>[NS])',
+        'x_sep': '(?P<x_sep>[EW])',
+    }
+
+    pattern = ''
+    for literal, field, spec, _ in Formatter().parse(template):
+        literal = re.escape(literal)
+        pattern += literal.replace(r'\*', '.*').replace(r'\?', '.')
+        if field is None:
+            continue
+        if field in fields:
+            pattern += fields[field]
+        elif field in ('x', 'y'):
+            width = re.search(r'(\d+)d$', spec or '')
+            digits = r'\d{%d}' % int(width.group(1)) if width else r'\d+'
+            pattern += f'(?P<{field}>{digits})'
+        else:
+            raise ValueError(f'Unknown field {field!r} in template...')
+    return re.compile(pattern)
+
+
+def _parse_cell(match):
+    x = int(match['x']) * (-1 if match['x_sep'] == 'W' else 1)
+    y = int(match['y']) * (-1 if match['y_sep'] == 'S' else 1)
+    return x, y
+
+
+def _match_cells(template, names):
+    """
+    Map the SW tile corners parsed from ``names`` to sorted lists of
+    names. Also returns the names that do not match ``template``.
+    """
+    if os.sep in template:
+        raise ValueError('Templates with subdirectories can not be '
+                         'indexed...')
+    regex = _template_regex(template)
+
+    cells = {}
+    others = []
+    for name in names:
+        if name.startswith('.'):  # skip hidden files
+            continue
+        match = regex.fullmatch(name)
+        if match:
+            cells.setdefault(_parse_cell(match), []).append(name)
+        else:
+            others.append(name)
+
+    for files in cells.values():
+        files.sort()
+    return cells, others
+
+
+class TileIndex:
+    """
+    Spatial index of the tiles in a directory.
+
+    The directory is scanned once and the SW corner of every tile is
+    parsed from its filename using the template (see
+    :func:`~rasterx.core._get_tiles`). Optionally, the footprint of
+    files that do not match the template is read with
+    :func:`~rasterx.core.get_info`. Queries are then answered in memory.
+
+    Use :func:`get_tile_index` rather than instantiating directly, to
+    benefit from the in-process and on-disk caching of indexes.
+
+    Parameters
+    ----------
+    path : str
+        Base directory where tiles reside.
+
+    template : str
+        The full filename template, including the extention.
+
+    cells : dict
+        Maps ``(x, y)`` SW tile corners to a sorted list of filenames.
+
+    footprints : list
+        ``(filename, x1, x2, y1, y2)`` footprints of tiles that were
+        indexed with :func:`~rasterx.core.get_info`.
+
+    mtime : int
+        The modification time (in ns) of ``path`` when it was scanned.
+    """
+    def __init__(self, path, template, cells=None, footprints=None,
+                 mtime=None):
+        self.path = path
+        self.template = template
+        self.cells = cells or {}
+        self.footprints = footprints or []
+        self.mtime = mtime
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}({self.path!r}, '
+                f'{self.template!r}, {len(self)} tiles)')
+
+    def __len__(self):
+        return (sum(len(files) for files in self.cells.values()) +
+                len(self.footprints))
+
+    @classmethod
+    def scan(cls, path, template, use_info=False):
+        """
+        Scan ``path`` (not recursively) and index the tiles in it.
+
+        If ``use_info`` is ``True``, files that do not match the
+        ``template`` are indexed by their footprint, read with
+        :func:`~rasterx.core.get_info`. This is slow, as every such file
+        has to be opened.
+        """
+        mtime = os.stat(path).st_mtime_ns
+        with os.scandir(path) as entries:
+            files = {entry.name: entry.is_file() for entry in entries}
+        cells, others = _match_cells(template, files)
+
+        footprints = []
+        if use_info:
+            for name in sorted(others):
+                if not files[name]:  # skip directories
+                    continue
+                bounds = _info_footprint(os.path.join(path, name))
+                if bounds is not None:
+                    footprints.append((name, *bounds))
+
+        return cls(path, template, cells, footprints, mtime)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Load an index saved with :meth:`save`.
+        """
+        with open(filename) as f:
+            state = json.load(f)
+        if state.get('version') != INDEX_VERSION:
+            raise ValueError('Incompatible index version...')
+        cells = {(x, y): files for x, y, files in state['cells']}
+        footprints = [tuple(item) for item in state['footprints']]
+        return cls(state['path'], state['template'], cells, footprints,
+                   state['mtime'])
+
+    def save(self, filename):
+        """
+        Save the index to ``filename`` as JSON.
+        """
+        state = {
+            'version': INDEX_VERSION,
+            'path': self.path,
+            'template': self.template,
+            'mtime': self.mtime,
+            'cells': [[x, y, files] for (x, y), files in self.cells.items()],
+            'footprints': self.footprints,
+        }
+        tmp = f'{filename}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, filename)
+
+    def is_stale(self):
+        """
+        ``True`` if the directory was modified since it was scanned.
+        """
+        try:
+            return os.stat(self.path).st_mtime_ns != self.mtime
+        except OSError:
+            return True
+
+    def get(self, x, y):
+        """
+        Full paths of the tiles with SW corner at ``(x, y)``.
+
+        Tiles indexed by their footprint are matched by rounding their
+        SW corner to the nearest integer.
+        """
+        names = self.cells.get((x, y), []) + [
+            name for name, x1, _, y1, _ in self.footprints
+            if (round(x1), round(y1)) == (x, y)
+        ]
+        return [os.path.join(self.path, name) for name in names]
+
+    def filenames(self):
+        """
+        Full paths of all indexed tiles.
+        """
+        names = [name for files in self.cells.values() for name in files]
+        names += [name for name, *_ in self.footprints]
+        return [os.path.join(self.path, name) for name in sorted(names)]
+
+    def bounds(self, tilesize=1):
+        """
+        The ``(filenames, x1, x2, y1, y2)`` footprints of all indexed
+        tiles as arrays.
+        """
+        if isinstance(tilesize, (tuple, list)):
+            tsx, tsy = tilesize
+        else:
+            tsx = tsy = tilesize
+
+        names, x1, y1 = [], [], []
+        for (x, y), files in self.cells.items():
+            for name in files:
+                names.append(name)
+                x1.append(x)
+                y1.append(y)
+        x1 = np.array(x1, dtype=float)
+        y1 = np.array(y1, dtype=float)
+        x2, y2 = x1 + tsx, y1 + tsy
+
+        if self.footprints:
+            names_, *bounds = zip(*self.footprints)
+            names += names_
+            x1, x2, y1, y2 = (
+                np.hstack((a, b)) for a, b in zip((x1, x2, y1, y2), bounds)
+            )
+        return names, x1, x2, y1, y2
+
+    def query(self, x1, x2, y1, y2, tilesize=1):
+        """
+        Full paths of the tiles that intersect the bounding box
+        ``(x1, x2, y1, y2)``, from south to north and west to east. If
+        ``x1 > x2``, the bounding box crosses the antimeridian, from
+        ``x1`` to 180 and on from -180 to ``x2``.
+
+        Of the files with the same SW corner (e.g. the ``_dem`` and
+        ``_num`` files of AsterGDEM), only the first, by name, is
+        returned. Tiles indexed by their footprint are matched by
+        rounding their SW corner to the nearest integer, as in
+        :meth:`get`.
+        """
+        names, X1, X2, Y1, Y2 = self.bounds(tilesize)
+        if x1 > x2:
+            # tiles west of the antimeridian come first
+            hit_x = (X2 > x1) | (X1 < x2)
+            X = np.where(X2 > x1, X1, X1 + 360)
+        else:
+            hit_x = (X1 < x2) & (X2 > x1)
+            X = X1
+        hit = np.flatnonzero(hit_x & (Y1 < y2) & (Y2 > y1))
+
+        filenames = {}
+        for i in sorted(hit, key=lambda i: (Y1[i], X[i], names[i])):
+            corner = round(X1[i]), round(Y1[i])
+            if corner not in filenames:
+                filenames[corner] = os.path.join(self.path, names[i])
+        return list(filenames.values())
+
+
+def _info_footprint(filename):
+    from rasterx.core import get_info
+
+    try:
+        info = get_info(filename, format='json')[0]
+        corners = info['cornerCoordinates']
+    except (OSError, KeyError, TypeError):
+        return None
+    (x1, y2), (x2, y1) = corners['upperLeft'], corners['lowerRight']
+    return min(x1, x2), max(x1, x2), min(y1, y2), max(y1, y2)
+
+
+def get_tile_index(path, template, use_info=False, persist=True,
+                   cache_dir=None):
+    """
+    Get an up-to-date :class:`TileIndex` of the tiles in ``path``.
+
+    The index is kept in memory and, if ``persist`` is ``True``, saved
+    to disk in the ``tile_index`` subdirectory of the cache directory
+    (see :func:`~rasterx.cache.cache_path`). A cached index is reused
+    as long as the modification time of ``path`` does not change, i.e.
+    no tiles were added, removed or renamed. Otherwise, ``path`` is
+    scanned again.
+
+    Parameters
+    ----------
+    path : str
+        Base directory where tiles reside.
+
+    template : str
+        The full filename template, including the extention.
+
+    use_info : bool
+        Index files that do not match the template by their footprint.
+        See :meth:`TileIndex.scan`.
+
+    persist : bool
+        Save (and load) the index to (and from) disk. If the cache
+        directory is not writable, e.g. a read-only home directory,
+        this is warned about once and indexes are kept in memory only.
+
+    cache_dir : str, optional
+        Overrides the default cache directory.
+
+    Notes
+    -----
+    ``path`` may also be a url prefix of the tiles (ending with ``/``),
+    if the server lists the directory (see :func:`gdal.ReadDir`). As
+    there is no modification time to check, a remote directory is only
+    listed once per session and its index is not saved to disk.
+    """
+    if _is_url(path):
+        key = (path, template, False)
+        if key not in _INDEXES:
+            cells, _ = _match_cells(template, _list(path))
+            _INDEXES[key] = TileIndex(path, template, cells)
+        return _INDEXES[key]
+
+    path = os.path.abspath(path)
+    key = (path, template, use_info)
+
+    index = _INDEXES.get(key)
+    if index is not None and not index.is_stale():
+        return index
+
+    filename = None
+    if persist and cache_dir not in _UNWRITABLE:
+        try:
+            filename = cache_path('tile_index', _key(*key) + '.json',
+                                  cache_dir)
+        except OSError as e:
+            _unwritable(cache_dir, e)
+
+    if filename is not None and os.path.exists(filename):
+        try:
+            index = TileIndex.load(filename)
+        except (OSError, ValueError, KeyError):
+            index = None
+
+    if index is None or index.is_stale():
+        index = TileIndex.scan(path, template, use_info)
+        if filename is not None:
+            try:
+                index.save(filename)
+            except OSError as e:
+                _unwritable(cache_dir, e)
+
+    _INDEXES[key] = index
+    return index
+
+
+def _unwritable(cache_dir, error):
+    # warn once, then keep indexes of this session in memory only
+    _UNWRITABLE.add(cache_dir)
+    warn(f'Unable to save tile indexes, they are kept in memory only: '
+         f'{error}')
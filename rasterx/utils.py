@@ -0,0 +1,45 @@
+import numpy as np
+
+
+def _is_nan(value):
+    return isinstance(value, (float, np.floating)) and np.isnan(value)
+
+
+def _fill_value(var):
+    """
+    The nodata value of a variable (``_FillValue``, ``missing_value``,
+    ``nodata`` or rasterio's ``nodatavals`` attributes) or ``None``.
+    """
+    attrs = var.attrs
+    for key in ('_FillValue', 'missing_value', 'nodata'):
+        if key in attrs:
+            return attrs[key]
+
+    nodatavals = attrs.get('nodatavals')
+    if nodatavals is not None:
+        values = {value for value in np.atleast_1d(nodatavals)
+                  if value is not None and not _is_nan(value)}
+        if len(values) == 1:
+            value = values.pop()
+            if np.issubdtype(var.dtype, np.integer):
+                value = var.dtype.type(value)
+            return value
+    return None
+
+
+def _gap_fill(var, fill_value=None):
+    """
+    The value and dtype to fill gaps in ``var`` with. Unless given, the
+    nodata value is used so that the native dtype is preserved. Only
+    if there is none, integer data is promoted to float and ``NaN`` is
+    used.
+    """
+    if fill_value is None:
+        fill_value = _fill_value(var)
+    if fill_value is None:
+        fill_value = np.nan
+
+    dtype = var.dtype
+    if _is_nan(fill_value) and not np.issubdtype(dtype, np.floating):
+        dtype = np.promote_types(dtype, np.float32)
+    return fill_value, dtype
@@ -0,0 +1,335 @@
+from collections import namedtuple
+
+import numpy as np
+import netCDF4
+
+from xarray import Dataset
+
+import gdal
+import osr
+
+from rasterx.core import _is_dir, _get_tiles, _all_tiles, _readrasterfile
+from rasterx.mosaicking import snap_to_grid, _grid_layout, _mosaic_coords
+from rasterx.utils import _gap_fill
+
+
+FORMATS = ('netcdf', 'zarr', 'gtiff')
+
+GDAL_TYPES = {
+    'uint8': gdal.GDT_Byte,
+    'uint16': gdal.GDT_UInt16,
+    'int16': gdal.GDT_Int16,
+    'uint32': gdal.GDT_UInt32,
+    'int32': gdal.GDT_Int32,
+    'float32': gdal.GDT_Float32,
+    'float64': gdal.GDT_Float64,
+}
+
+# a spatial variable of the output, its dims end with (y, x)
+_Spec = namedtuple('_Spec', 'dims shape dtype fill_value attrs')
+
+
+def _attrs(attrs):
+    # attributes that can be stored as netCDF or zarr attributes
+    clean = {}
+    for key, value in attrs.items():
+        if key in ('_FillValue', 'missing_value') or value is None:
+            continue
+        if isinstance(value, (tuple, list, np.ndarray)):
+            value = [v.item() if isinstance(v, np.generic) else v
+                     for v in value]
+            if not all(isinstance(v, (int, float)) for v in value):
+                continue
+        elif isinstance(value, np.generic):
+            value = value.item()
+        if isinstance(value, bool):
+            value = int(value)
+        clean[key] = value
+    return clean
+
+
+def _crs(ds):
+    """
+    The CRS of a dataset, as found in the attributes of the dataset or
+    of its variables (e.g. a CF grid mapping variable), as a string GDAL
+    understands. Lon/lat grids without a CRS are assumed to be WGS84.
+    """
+    for attrs in [ds.attrs] + [var.attrs for var in ds.variables.values()]:
+        for key in ('crs_wkt', 'spatial_ref', 'crs'):
+            value = attrs.get(key)
+            if isinstance(value, str) and value:
+                return value
+    if (ds.geo._x, ds.geo._y) == ('lon', 'lat'):
+        return 'EPSG:4326'
+    return None
+
+
+class _NetCDFSink:
+    def __init__(self, out, skeleton, variables, chunksize, crs=None):
+        skeleton.to_netcdf(out)
+        self._nc = netCDF4.Dataset(out, 'a')
+        self._variables = {}
+        for name, spec in variables.items():
+            for dim, size in zip(spec.dims, spec.shape):
+                if dim not in self._nc.dimensions:
+                    self._nc.createDimension(dim, size)
+            chunks = [1] * (len(spec.shape) - 2) + [
+                min(size, chunksize) for size in spec.shape[-2:]
+            ]
+            var = self._nc.createVariable(
+                name, spec.dtype, spec.dims, zlib=True, chunksizes=chunks,
+                fill_value=spec.fill_value
+            )
+            var.set_auto_maskandscale(False)
+            var.setncatts(_attrs(spec.attrs))
+            self._variables[name] = var
+
+    def write(self, name, index, values):
+        self._variables[name][index] = values
+
+    def close(self):
+        self._nc.close()
+
+
+class _ZarrSink:
+    def __init__(self, out, skeleton, variables, chunksize, crs=None):
+        import zarr
+
+        self._out = out
+        skeleton.to_zarr(out, mode='w', consolidated=False)
+        group = zarr.open_group(out, mode='a')
+        self._variables = {}
+        for name, spec in variables.items():
+            chunks = (1,) * (len(spec.shape) - 2) + tuple(
+                min(size, chunksize) for size in spec.shape[-2:]
+            )
+            var = group.create_dataset(
+                name, shape=spec.shape, chunks=chunks, dtype=spec.dtype,
+                fill_value=spec.fill_value
+            )
+            var.attrs.update(_attrs(spec.attrs),
+                             _ARRAY_DIMENSIONS=list(spec.dims))
+            self._variables[name] = var
+
+    def write(self, name, index, values):
+        self._variables[name][index] = values
+
+    def close(self):
+        import zarr
+
+        zarr.consolidate_metadata(self._out)
+
+
+class _GTiffSink:
+    def __init__(self, out, skeleton, variables, chunksize, crs=None):
+        dtypes = {spec.dtype for spec in variables.values()}
+        if len(dtypes) > 1:
+            raise ValueError('All variables must have the same dtype to be '
+                             'written as bands of a GeoTIFF...')
+        dtype = dtypes.pop()
+
+        # every 2D slice of every variable is a band
+        self._bands = {}
+        nbands = 0
+        for name, spec in variables.items():
+            self._bands[name] = nbands + 1
+            nbands += int(np.prod(spec.shape[:-2]))
+        ydim, xdim = spec.dims[-2:]
+        ny, nx = spec.shape[-2:]
+
+        x, y = skeleton[xdim].values, skeleton[ydim].values
+        dx = (x[-1] - x[0]) / (nx - 1) if nx > 1 else 1.0
+        dy = (y[-1] - y[0]) / (ny - 1) if ny > 1 else -1.0
+        self._flip = dy > 0  # GeoTIFFs are written north up
+        self._ny = ny
+        top = max(y[0], y[-1]) + 0.5 * abs(dy)
+
+        blocksize = max(16, chunksize // 16 * 16)
+        self._ds = gdal.GetDriverByName('GTiff').Create(
+            out, int(nx), int(ny), nbands, GDAL_TYPES[dtype.name],
+            options=['TILED=YES', f'BLOCKXSIZE={blocksize}',
+                     f'BLOCKYSIZE={blocksize}', 'COMPRESS=DEFLATE',
+                     'BIGTIFF=IF_SAFER', 'SPARSE_OK=TRUE']
+        )
+        if self._ds is None:
+            raise OSError(f'Could not create {out}...\n'
+                          f'{gdal.GetLastErrorMsg()}')
+        self._ds.SetGeoTransform(
+            (x[0] - 0.5 * dx, dx, 0.0, top, 0.0, -abs(dy))
+        )
+        if crs is not None:
+            srs = osr.SpatialReference()
+            srs.SetFromUserInput(crs)
+            self._ds.SetProjection(srs.ExportToWkt())
+
+        for name, spec in variables.items():
+            first = self._bands[name]
+            for band in range(first, first + int(np.prod(spec.shape[:-2]))):
+                band = self._ds.GetRasterBand(band)
+                band.SetDescription(name)
+                band.SetNoDataValue(float(spec.fill_value))
+
+    def write(self, name, index, values):
+        y, x = index[-2:]
+        yoff = self._ny - y.stop if self._flip else y.start
+        values = values.reshape((-1,) + values.shape[-2:])
+        for i, array in enumerate(values):
+            if self._flip:
+                array = array[::-1]
+            band = self._ds.GetRasterBand(self._bands[name] + i)
+            band.WriteArray(array, x.start, yoff)
+
+    def close(self):
+        self._ds.FlushCache()
+        self._ds = None  # closing the dataset writes it to disk
+
+
+SINKS = {
+    'netcdf': _NetCDFSink,
+    'zarr': _ZarrSink,
+    'gtiff': _GTiffSink,
+}
+
+
+def mosaic_to(path, out, extent=None, format='netcdf', substring=None,
+              overlap='first', snap=True, mask_and_scale=False,
+              chunksize=512, **kwargs):
+    """
+    Mosaic tiles straight into a file, one tile at a time.
+
+    Unlike :func:`~rasterx.core.read`, which builds the whole mosaic in
+    memory, the tiles are opened lazily, the output file is created with
+    the full size of the mosaic (chunked or tiled, so that nothing is
+    allocated in memory) and every tile is then read and written into
+    place before the next one is read. Peak memory is about one tile,
+    whatever the size of the output.
+
+    Parameters
+    ----------
+    path : str, list
+        Path to a file, a list of files or a directory of tiles. See
+        :func:`~rasterx.core.read`. If ``path`` is a directory and
+        ``extent`` is ``None``, all the tiles in it are mosaicked.
+
+    out : str
+        The output file (or directory, for zarr).
+
+    extent : tuple, optional
+        ``(x1, x2, y1, y2)`` extent of the mosaic. Only the pixels of the
+        tiles within it are read.
+
+    format : {'netcdf', 'zarr', 'gtiff'}
+        Format of the output. Zarr requires the `zarr` package. All
+        variables of a GeoTIFF must have the same dtype, every 2D slice
+        of every variable is written as a band, north up.
+
+    substring, overlap, snap :
+        See :func:`~rasterx.core.read`. Only ``overlap='first'`` or
+        ``'last'`` is supported.
+
+    mask_and_scale : bool
+        By default, the native dtype of the data is kept and gaps are
+        marked with the nodata value of each variable. See
+        :func:`~rasterx.core.read`.
+
+    chunksize : int
+        Size of the (square) spatial chunks or GeoTIFF tiles of the
+        output.
+
+    Other Parameters
+    ----------------
+    template, ext, lonlat, tilesize, index :
+        Used to find the tiles if ``path`` is a directory. See
+        :func:`~rasterx.core.read`.
+
+    Returns
+    -------
+    str
+        ``out``.
+
+    Examples
+    --------
+    >>> mosaic_to('/data/AsterGDEM', 'alps.tif', extent=(5, 16, 43, 48),
+    ...           format='gtiff')
+    """
+    if format not in FORMATS:
+        raise ValueError(f'`format` must be one of {FORMATS}, got {format!r}')
+    if overlap not in ('first', 'last'):
+        raise ValueError("`mosaic_to` supports `overlap='first'` or "
+                         "`'last'` only")
+
+    if _is_dir(path):
+        if extent is None:
+            files = _all_tiles(path, **kwargs)
+        else:
+            files = _get_tiles(path, *extent, **kwargs)
+    elif isinstance(path, str):
+        files = [path]
+    else:
+        files = list(path)
+
+    # tiles are opened lazily, only their coordinates are read
+    tiles = [_readrasterfile(f, substring, None, extent, mask_and_scale)
+             for f in files]
+    tiles = [tile for tile in tiles if 0 not in tile.sizes.values()]
+    if not tiles:
+        raise ValueError('None of the tiles intersect with `extent`...')
+    if snap:
+        tiles = snap_to_grid(tiles)
+
+    layout = _grid_layout(tiles)
+    if layout is None:
+        raise ValueError('Tiles do not share a common regular grid...')
+    offsets, (nx, ny) = layout
+
+    # the order in which tiles are written, last one wins
+    order = list(zip(tiles, offsets))
+    if overlap == 'first':
+        order = order[::-1]
+
+    first = tiles[0]
+    xdim, ydim = first.geo._x, first.geo._y
+    coords = _mosaic_coords(first, order, offsets[0], nx, ny)
+    x, y = coords[xdim].values, coords[ydim].values
+    crs = _crs(first)
+
+    variables = {}
+    others = {}
+    for name, var in first.data_vars.items():
+        if xdim not in var.dims or ydim not in var.dims:
+            others[name] = var.variable  # not spatial, keep as is
+            continue
+        dims = tuple(dim for dim in var.dims if dim not in (xdim, ydim))
+        fill_value, dtype = _gap_fill(var)
+        variables[name] = _Spec(
+            dims + (ydim, xdim),
+            tuple(var.sizes[dim] for dim in dims) + (ny, nx),
+            np.dtype(dtype), fill_value, var.attrs
+        )
+
+    # everything but the spatial variables, which are written by the sink
+    skeleton = Dataset(others, coords=coords, attrs=first.attrs).copy()
+    for var in skeleton.variables.values():
+        var.encoding = {}
+    if crs is not None:
+        skeleton.attrs.setdefault('crs', crs)
+    if 'transform' in skeleton.attrs and nx > 1 and ny > 1:
+        # rasterio's affine transform, of the corner of the mosaic
+        dx, dy = (x[-1] - x[0]) / (nx - 1), (y[-1] - y[0]) / (ny - 1)
+        skeleton.attrs['transform'] = (dx, 0.0, x[0] - 0.5 * dx,
+                                       0.0, dy, y[0] - 0.5 * dy)
+
+    sink = SINKS[format](out, skeleton, variables, chunksize, crs)
+    try:
+        for tile, (xo, yo) in order:
+            for name, spec in variables.items():
+                values = tile[name].transpose(*spec.dims).values
+                index = (Ellipsis, slice(yo, yo + values.shape[-2]),
+                         slice(xo, xo + values.shape[-1]))
+                sink.write(name, index, values.astype(spec.dtype,
+                                                      copy=False))
+                del values
+            tile.close()
+    finally:
+        sink.close()
+    return out
@@ -0,0 +1,52 @@
+import os
+import tarfile
+from zipfile import ZipFile
+
+import pytest
+
+from rasterx import archives
+from rasterx.archives import archive_members
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    cache_dir = tmp_path / 'cache'
+    monkeypatch.setattr(archives.index_cache, 'cache_dir', str(cache_dir))
+    archives.index_cache.clear()
+    return cache_dir
+
+
+def _members(directory, names):
+    files = []
+    for name in names:
+        files.append(directory / name)
+        files[-1].write_bytes(b'\0' * 64)
+    return files
+
+
+@pytest.mark.parametrize('mode', ['w', 'w:gz'])
+def test_tar_members_keep_their_names(tmp_path, cache_dir, mode):
+    names = ['N27E086.hgt', 'N27E086.hgt.aux.xml']
+    filename = str(tmp_path / 'N27E086.tar')
+    with tarfile.open(filename, mode) as f:
+        for member in _members(tmp_path, names):
+            f.add(member, member.name)
+
+    kind, members = archive_members(filename)
+    assert kind == ('tar' if mode == 'w' else 'tar.gz')
+    assert members == {name: f'/vsitar/{filename}/{name}' for name in names}
+    assert os.listdir(cache_dir / 'metadata')
+
+
+def test_only_tar_indexes_are_persisted(tmp_path, cache_dir):
+    filename = str(tmp_path / 'N27E086.zip')
+    with ZipFile(filename, 'w') as f:
+        for member in _members(tmp_path, ['N27E086.hgt']):
+            f.write(member, member.name)
+    assert archive_members(filename) == (
+        'zip', {'N27E086.hgt': f'/vsizip/{filename}/N27E086.hgt'}
+    )
+
+    # not an archive at all
+    assert archive_members(str(tmp_path / 'N27E086.hgt')) == (None, {})
+    assert not cache_dir.exists()
@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+import pytest
+
+from xarray import Dataset, Variable
+
+import rasterx  # noqa: F401, registers the geo accessor
+from rasterx.blocks import iter_windows
+
+
+NODATA = -9999
+
+
+@pytest.fixture
+def ds():
+    # 0.1 degree int16 pixels, north-up, with a constant variable
+    lon = 86 + np.arange(23) / 10
+    lat = 28 - np.arange(17) / 10
+    z = np.arange(lat.size * lon.size, dtype='int16').reshape(lat.size, -1)
+    return Dataset(
+        {'z': Variable(('lat', 'lon'), z, {'_FillValue': NODATA}),
+         'crs': Variable((), 0)},
+        coords=dict(lon=lon, lat=lat)
+    )
+
+
+def _mean3(z):
+    # mean of the 3 x 3 neighbourhood, on the interior pixels only
+    out = np.full(z.shape, np.nan)
+    out[1:-1, 1:-1] = sum(
+        z[1 + j:z.shape[0] - 1 + j, 1 + i:z.shape[1] - 1 + i]
+        for j in (-1, 0, 1) for i in (-1, 0, 1)
+    ) / 9
+    return out
+
+
+def test_windows_cover_grid():
+    covered = np.zeros((17, 23), dtype=int)
+    for core, halo in iter_windows((17, 23), (5, 8), overlap=(1, 2)):
+        covered[core] += 1
+        for c, h, o, size in zip(core, halo, (1, 2), (17, 23)):
+            assert h.start == max(c.start - o, 0)
+            assert h.stop == min(c.stop + o, size)
+    assert (covered == 1).all()
+
+    with pytest.raises(ValueError):
+        list(iter_windows((17, 23), 0))
+    with pytest.raises(ValueError):
+        list(iter_windows((17, 23), 4, overlap=-1))
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+@pytest.mark.parametrize('path', [None, 'blocks'])
+def test_round_trip(ds, tmp_path, lazy, path):
+    if lazy:
+        ds = ds.chunk(lat=4, lon=4)
+    if path is not None:
+        path = str(tmp_path / path)
+
+    writer = ds.geo.block_writer(path)
+    for window, block in ds.geo.iter_blocks((5, 8), overlap=1):
+        assert block.z.shape[0] <= 5 + 2 and block.z.shape[1] <= 8 + 2
+        assert block.geo.dx == pytest.approx(0.1)
+        assert (block.z.chunks is not None) == lazy
+        block = block.load()
+        writer.write(window, block.assign(
+            mean=(('lat', 'lon'), _mean3(block.z.values))
+        ))
+    result = writer.result()
+
+    # the halo is dropped, every pixel comes from the block it is in
+    assert result.z.dtype == np.int16
+    assert result.z.attrs['_FillValue'] == NODATA
+    np.testing.assert_array_equal(result.z.values, ds.z.values)
+    np.testing.assert_array_equal(result.lon.values, ds.lon.values)
+    np.testing.assert_array_equal(result.lat.values, ds.lat.values)
+    assert int(result.crs) == 0
+
+    # a halo of 1 pixel is enough for a 3 x 3 stencil
+    np.testing.assert_allclose(result['mean'].values,
+                               _mean3(ds.z.values.astype(float)))
+
+    if path is not None:
+        assert sorted(os.listdir(path)) == ['mean.npy', 'z.npy']
+        np.testing.assert_array_equal(np.load(f'{path}/z.npy'), ds.z.values)
@@ -0,0 +1,91 @@
+import os
+
+import numpy as np
+import pytest
+
+from xarray import Dataset, Variable
+
+import rasterx
+from rasterx.cache import MosaicCache
+
+
+NODATA = -9999
+
+
+def _write_tile(directory, x, y, size=11):
+    # an AsterGDEM style int16 netCDF tile with SW corner (x, y)
+    lon = x + np.arange(size) / (size - 1)
+    lat = y + np.arange(size) / (size - 1)
+    z = np.round(100 * np.add.outer(lat - 27, lon - 86)).astype('int16')
+    z[size // 2, size // 2] = NODATA
+    ds = Dataset(
+        {'z': Variable(('lat', 'lon'), z)},
+        coords=dict(lon=lon, lat=lat)
+    )
+    corner = (f'{"S" if y < 0 else "N"}{abs(y):02d}'
+              f'{"W" if x < 0 else "E"}{abs(x):03d}')
+    ds.to_netcdf(directory / f'ASTGTMV003_{corner}_dem.nc',
+                 encoding={'z': {'_FillValue': NODATA}})
+
+
+@pytest.fixture
+def tiles(tmp_path):
+    path = tmp_path / 'tiles'
+    path.mkdir()
+    for y in (27, 28):
+        for x in (86, 87):
+            _write_tile(path, x, y)
+    return str(path)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return MosaicCache(cache_dir=str(tmp_path / 'cache'), chunksize=8)
+
+
+def test_mosaic_round_trip(tiles, cache):
+    extent = (86.5, 87.5, 27.5, 28.5)
+    expected = rasterx.read(tiles, extent=extent)
+    ds = rasterx.read(tiles, extent=extent, cache=cache)
+    assert ds.identical(expected)
+    assert len(cache._entries()) == 1
+
+    # a hit is read lazily from the cache, with the native dtype
+    with rasterx.read(tiles, extent=extent, cache=cache, chunks=-1) as hit:
+        assert hit.z.chunks is not None
+        assert hit.z.dtype == np.int16
+        assert hit.z.attrs['_FillValue'] == NODATA
+        np.testing.assert_array_equal(hit.z.values, expected.z.values)
+        np.testing.assert_array_equal(hit.lon.values, expected.lon.values)
+        np.testing.assert_array_equal(hit.lat.values, expected.lat.values)
+
+    # other arguments are other mosaics
+    masked = rasterx.read(tiles, extent=extent, mask_and_scale=True)
+    for _ in range(2):
+        with rasterx.read(tiles, extent=extent, cache=cache,
+                          mask_and_scale=True) as ds:
+            assert ds.z.dtype == np.float32
+            assert np.isnan(ds.z.values).sum() == 4
+            np.testing.assert_array_equal(ds.z.values, masked.z.values)
+    assert len(cache._entries()) == 2
+
+
+def test_least_recently_used_is_evicted(tiles, cache):
+    # mosaics of the same shape, i.e. of about the same size
+    extents = [(86.1 + d, 86.4 + d, 27.1, 27.4) for d in (0, 0.1, 0.2)]
+
+    def read(extent):
+        rasterx.read(tiles, extent=extent, cache=cache).close()
+        return {path: size for path, size, _ in cache._entries()}
+
+    (first, size), = read(extents[0]).items()
+    second, = set(read(extents[1])) - {first}
+    os.utime(first, (1, 1))
+    os.utime(second, (2, 2))
+
+    # room for two mosaics, the first one is used again
+    cache.maxbytes = 2 * size + size // 2
+    read(extents[0])
+    remaining = read(extents[2])
+    assert len(remaining) == 2
+    assert first in remaining and second not in remaining
@@ -0,0 +1,230 @@
+import numpy as np
+import pytest
+
+from xarray import Dataset, Variable
+
+import rasterx
+from rasterx import core
+from rasterx.core import _read_tiles, _sniff, register_reader
+
+
+NODATA = -9999
+
+
+def _write_tile(directory, x, y, size=11):
+    # an AsterGDEM style int16 netCDF tile with SW corner (x, y)
+    lon = x + np.arange(size) / (size - 1)
+    lat = y + np.arange(size) / (size - 1)
+    z = np.round(100 * np.add.outer(lat - 27, lon - 86)).astype('int16')
+    z[size // 2, size // 2] = NODATA
+    ds = Dataset(
+        {'z': Variable(('lat', 'lon'), z)},
+        coords=dict(lon=lon, lat=lat)
+    )
+    corner = (f'{"S" if y < 0 else "N"}{abs(y):02d}'
+              f'{"W" if x < 0 else "E"}{abs(x):03d}')
+    ds.to_netcdf(directory / f'ASTGTMV003_{corner}_dem.nc',
+                 encoding={'z': {'_FillValue': NODATA}})
+
+
+@pytest.fixture
+def tiles(tmp_path):
+    for y in (27, 28):
+        for x in (86, 87):
+            _write_tile(tmp_path, x, y)
+    return str(tmp_path)
+
+
+def test_read_keeps_native_dtype(tiles):
+    ds = rasterx.read(tiles, extent=(86, 88, 27, 29))
+    assert ds.z.dtype == np.int16
+    assert ds.z.attrs['_FillValue'] == NODATA
+    assert (ds.z.values == NODATA).sum() == 4
+
+    ds = rasterx.read(tiles, extent=(86, 88, 27, 29), mask_and_scale=True)
+    assert ds.z.dtype == np.float32
+    assert np.isnan(ds.z.values).sum() == 4
+
+
+@pytest.mark.parametrize('overlap', ['first', 'last', 'mean'])
+def test_lazy_chunks_follow_tiles(tiles, overlap):
+    extent = (86, 88, 27, 29)
+    ds = rasterx.read(tiles, extent=extent, chunks=-1, overlap=overlap)
+    expected = {
+        'first': ((11, 10), (11, 10)),
+        'last': ((10, 11), (10, 11)),
+        'mean': ((10, 1, 10), (10, 1, 10)),
+    }[overlap]
+    assert ds.z.chunks == expected
+    assert ds.z.dtype == np.int16
+    assert ds.equals(rasterx.read(tiles, extent=extent, overlap=overlap))
+    ds.close()
+
+    # chunks within tiles end at tile boundaries too
+    with rasterx.read(tiles, extent=extent, chunks=4) as ds:
+        assert ds.z.chunks == ((4, 4, 3, 3, 4, 3),) * 2
+
+
+def test_lazy_gaps_are_filled(tmp_path):
+    # there is no N28E087 tile, the NE corner is a gap
+    for x, y in ((86, 27), (87, 27), (86, 28)):
+        _write_tile(tmp_path, x, y)
+    extent = (86, 88, 27, 29)
+    ds = rasterx.read(str(tmp_path), extent=extent, chunks=-1)
+    assert ds.z.chunks == ((11, 10), (11, 10))
+    assert (ds.z.values[11:, 11:] == NODATA).all()
+    assert ds.equals(rasterx.read(str(tmp_path), extent=extent))
+    ds.close()
+
+
+@pytest.mark.parametrize('workers, pool', [(1, 'thread'), (2, 'thread'),
+                                           (2, 'process')])
+def test_read_many_matches_read(tiles, workers, pool):
+    extents = [(86.1, 86.2, 27.1, 27.2), (86.95, 87.05, 27.5, 28.5)]
+    results = rasterx.read_many(tiles, extents, workers=workers, pool=pool)
+    for ds, extent in zip(results, extents):
+        assert ds.equals(rasterx.read(tiles, extent=extent))
+
+    # every extent of a single file is read on its own
+    filename = f'{tiles}/ASTGTMV003_N27E086_dem.nc'
+    extents = [(86.1, 86.2, 27.1, 27.2), (86.8, 86.9, 27.8, 27.9)]
+    results = rasterx.read_many(filename, extents, workers=workers, pool=pool)
+    for ds, extent in zip(results, extents):
+        assert ds.sizes == {'lat': 2, 'lon': 2}
+        assert ds.equals(rasterx.read(filename, extent=extent))
+
+
+@pytest.mark.parametrize('pool', ['thread', 'process'])
+def test_read_tiles_in_order(tmp_path, pool):
+    for y in (27, 28, 29):
+        for x in (86, 87, 88):
+            _write_tile(tmp_path, x, y)
+    files = sorted(str(f) for f in tmp_path.iterdir())
+    tiles = _read_tiles(files, workers=4, pool=pool)
+    assert [(t.lon.values[0], t.lat.values[0]) for t in tiles] == [
+        (x, y) for y in (27, 28, 29) for x in (86, 87, 88)
+    ]
+
+    extent = (86, 89, 27, 30)
+    ds = rasterx.read(str(tmp_path), extent=extent)
+    for _ in range(5):
+        assert ds.identical(rasterx.read(str(tmp_path), extent=extent,
+                                         workers=4, pool=pool))
+
+
+@pytest.mark.parametrize('pool', ['thread', 'process'])
+def test_read_tile_error_is_raised(tiles, pool):
+    with open(f'{tiles}/ASTGTMV003_N28E086_dem.nc', 'wb') as f:
+        f.write(b'not a tile')
+    extent = (86, 88, 27, 29)
+    with pytest.raises(OSError) as expected:
+        rasterx.read(tiles, extent=extent)
+    with pytest.raises(OSError) as error:
+        rasterx.read(tiles, extent=extent, workers=4, pool=pool)
+    assert str(error.value) == str(expected.value)
+    assert 'N28E086' in str(error.value)
+
+
+def test_read_many_across_antimeridian(tmp_path):
+    for x in (178, 179, -180):
+        _write_tile(tmp_path, x, -17)
+    extents = [(179.2, -179.5, -16.8, -16.2), (178.8, 179.4, -16.7, -16.3)]
+    results = rasterx.read_many(str(tmp_path), extents)
+    for ds, extent in zip(results, extents):
+        assert ds.equals(rasterx.read(str(tmp_path), extent=extent))
+
+
+def test_read_unpacks_packed_tile(tmp_path):
+    lon = 86 + np.arange(11) / 10
+    lat = 27 + np.arange(11) / 10
+    z = np.add.outer(lat, lon).astype('float32')
+    z[5, 5] = np.nan
+    filename = str(tmp_path / 'packed.nc')
+    ds = Dataset({'z': (('lat', 'lon'), z)}, coords=dict(lon=lon, lat=lat))
+    ds.to_netcdf(filename, encoding={'z': dict(
+        dtype='int16', scale_factor=0.01, add_offset=100, _FillValue=NODATA
+    )})
+
+    ds = rasterx.read(filename)
+    assert ds.z.dtype.kind == 'f'
+    np.testing.assert_allclose(ds.z.values, z, atol=0.01)
+    assert np.isnan(ds.z.values[5, 5])
+
+    with rasterx.read(filename, chunks=-1) as lazy:
+        np.testing.assert_array_equal(lazy.z.values, ds.z.values)
+
+
+@pytest.fixture
+def readers(monkeypatch):
+    # register_reader and learned extensions modify module globals
+    for name in ('READERS', 'EXTENSIONS', '_LEARNED'):
+        monkeypatch.setattr(core, name, dict(getattr(core, name)))
+    monkeypatch.setattr(core, 'MAGIC', list(core.MAGIC))
+
+
+def _read_text(filename, substring=None, chunks=None, mask_and_scale=False):
+    # a toy format: a header line and rows of integers
+    with open(filename) as f:
+        if f.readline() != 'TOY\n':
+            raise ValueError(f'{filename} is not a toy file')
+        z = np.loadtxt(f, dtype='int16', ndmin=2)
+    return Dataset({'z': (('y', 'x'), z)},
+                   coords=dict(x=np.arange(z.shape[1]),
+                               y=np.arange(z.shape[0])))
+
+
+def test_register_reader(tmp_path, readers):
+    filename = tmp_path / 'tile.toy'
+    filename.write_text('TOY\n1 2 3\n4 5 6\n')
+    register_reader('toy', _read_text, extensions=['.TOY'])
+    assert _sniff(str(filename)) == 'toy'
+    ds = rasterx.read(str(filename))
+    assert ds.z.values.tolist() == [[1, 2, 3], [4, 5, 6]]
+
+    # by magic bytes, whatever the extension
+    register_reader('toy', _read_text, magic=[b'TOY\n'])
+    filename = filename.rename(tmp_path / 'tile.dat')
+    assert _sniff(str(filename)) == 'toy'
+
+
+def test_readers_are_learned(tmp_path, readers):
+    filename = tmp_path / 'tile.txt'
+    filename.write_text('TOY\n1 2\n')
+    register_reader('toy', _read_text)
+    assert _sniff(str(filename)) is None
+
+    # every reader is probed, the one that worked is remembered
+    ds = rasterx.read(str(filename))
+    assert ds.z.values.tolist() == [[1, 2]]
+    assert core._LEARNED == {'.txt': 'toy'}
+    assert _sniff(str(tmp_path / 'other.txt')) == 'toy'
+
+    filename.write_text('not a raster')
+    with pytest.raises(OSError, match='Could not read raster file'):
+        rasterx.read(str(filename))
+
+
+def test_sniff_magic(tiles, tmp_path):
+    netcdf = tmp_path / 'N27E086'
+    netcdf.write_bytes(
+        (tmp_path / 'ASTGTMV003_N27E086_dem.nc').read_bytes()
+    )
+    assert _sniff(str(netcdf)) == 'netcdf'
+    assert rasterx.read(str(netcdf)).z.dtype == np.int16
+
+    tiff = tmp_path / 'tile.raw'
+    tiff.write_bytes(b'II*\x00' + bytes(16))
+    assert _sniff(str(tiff)) == 'gdal'
+    (tmp_path / 'tile.bin').write_bytes(bytes(16))
+    assert _sniff(str(tmp_path / 'tile.bin')) is None
+    assert _sniff(str(tmp_path)) is None
+
+
+def test_sniff_urls(readers):
+    # open_dataset does not read netCDF over HTTP, GDAL does
+    assert _sniff('https://example.com/tiles/N27E086.nc') == 'gdal'
+    assert _sniff('https://example.com/tiles/N27E086.tif') == 'gdal'
+    assert _sniff('https://example.com/tiles/N27E086') == 'gdal'
+    assert _sniff('https://example.com/tiles.zip?token=1') == 'archive'
+    register_reader('toy', _read_text, extensions=['.toy'])
+    assert _sniff('https://example.com/tiles/N27E086.toy') == 'toy'
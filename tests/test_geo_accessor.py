@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from xarray import Dataset, Variable
+
+import rasterx  # noqa: F401, registers the geo accessor
+
+
+NODATA = -9999
+
+
+def _grid(lon, lat):
+    z = np.arange(lat.size * lon.size, dtype='int16').reshape(lat.size, -1)
+    return Dataset(
+        {'z': Variable(('lat', 'lon'), z, {'_FillValue': NODATA})},
+        coords=dict(lon=lon, lat=lat)
+    )
+
+
+@pytest.fixture
+def regular():
+    # 0.1 degree pixels, north-up
+    return _grid(86 + np.arange(11) / 10, 28 - np.arange(11) / 10)
+
+
+# the bounding boxes extend beyond the data, their edges are on pixel
+# centers (2 * 0.1 or 0.3 beyond the data) or between pixels
+@pytest.mark.parametrize('bbox, shape', [
+    ((85.8, 87.3, 26.7, 28.2), (16, 16)),
+    ((85.75, 87.25, 26.75, 28.25), (15, 15)),
+    ((86.35, 87.3, 27.5, 28.2), (8, 10)),
+])
+def test_trim_pad_lazy_matches_eager(regular, bbox, shape):
+    eager = regular.geo.trim(*bbox, pad=True)
+    lazy = regular.chunk(lon=4, lat=4).geo.trim(*bbox, pad=True)
+    assert eager.z.shape == shape
+    assert lazy.z.chunks is not None
+    assert lazy.z.shape == eager.z.shape
+    np.testing.assert_array_equal(lazy.lon.values, eager.lon.values)
+    np.testing.assert_array_equal(lazy.lat.values, eager.lat.values)
+    np.testing.assert_array_equal(lazy.z.values, eager.z.values)
+    assert eager.z.dtype == lazy.z.dtype == np.int16
+
+    # the data is where it was, NODATA around it
+    inner = eager.z.where(eager.z != NODATA, drop=True)
+    assert inner.equals(regular.z.sel(lon=inner.lon, lat=inner.lat))
+
+
+def test_trim_pad_irregular():
+    # pixels on the edges of the bounding box are kept on irregular
+    # grids too
+    lon = np.r_[86, 86.1, 86.3, 86.4]
+    ds = _grid(lon, 28 - np.arange(3) / 10)
+    padded = ds.geo.trim(85.8, 86.6, 27.6, 28.1, pad=True)
+    np.testing.assert_allclose(padded.lon.values,
+                               [85.8, 85.9, 86, 86.1, 86.3, 86.4, 86.5, 86.6])
+    np.testing.assert_allclose(padded.lat.values, [28.1, 28, 27.9, 27.8,
+                                                   27.7, 27.6])
+    assert (padded.z.values[:, :2] == NODATA).all()
@@ -0,0 +1,41 @@
+import numpy as np
+
+from xarray import Dataset, Variable
+
+import rasterx  # noqa: F401, registers the .geo accessor
+from rasterx.mosaicking import snap_to_grid, mosaic, _grid_layout
+
+
+def _tile(x, y, size=11):
+    # 1x1 degree int16 tile with SW corner (x, y) and float drift
+    lon = x + np.arange(size) / (size - 1) + 1e-12
+    lat = y + np.arange(size) / (size - 1)
+    z = np.arange(size * size, dtype='int16').reshape(size, size)
+    return Dataset(
+        {'z': Variable(('lat', 'lon'), z, dict(_FillValue=-9999))},
+        coords=dict(lon=lon, lat=lat)
+    )
+
+
+def test_snap_one_pixel_edge_tile():
+    # the W002 tile shares a single column with the extent of W001
+    extent = (-1, 0, -0.8, -0.2)
+    tiles = [_tile(-2, -1).geo.trim(*extent),
+             _tile(-1, -1).geo.trim(*extent)]
+    assert tiles[0].sizes['lon'] == 1
+
+    snapped = snap_to_grid(tiles)
+    assert snapped[0].geo.dx == snapped[1].geo.dx == 0.1
+    assert _grid_layout(snapped) is not None
+
+    ds = mosaic(snapped)
+    assert ds.sizes == {'lat': 7, 'lon': 11}
+    np.testing.assert_allclose(ds.lon.values, np.linspace(-1, 0, 11),
+                               atol=1e-9)
+    assert ds.z.dtype == np.int16
+
+
+def test_module_not_shadowed():
+    # the mosaic function does not hide the module of the same name
+    assert rasterx.mosaicking.snap_to_grid is snap_to_grid
+    assert rasterx.mosaic is mosaic
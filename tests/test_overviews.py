@@ -0,0 +1,53 @@
+import os
+from zipfile import ZipFile
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+from rasterx.overviews import build_overviews
+
+
+def _write_tile(directory, x, y, size=16):
+    # an int16 GeoTIFF tile with SW corner (x, y)
+    z = np.arange(size * size, dtype='int16').reshape(size, size)
+    filename = str(directory / f'ASTGTMV003_N{y:02d}E{x:03d}_dem.tif')
+    with rasterio.open(filename, 'w', driver='GTiff', width=size,
+                       height=size, count=1, dtype='int16',
+                       crs='EPSG:4326', nodata=-9999,
+                       transform=from_origin(x, y + 1, 1 / size, 1 / size)
+                       ) as f:
+        f.write(z, 1)
+    return filename
+
+
+def test_build_overviews(tmp_path):
+    files = [_write_tile(tmp_path, x, 27) for x in (86, 87)]
+    assert build_overviews(str(tmp_path), levels=(2, 4), ext='.tif') == files
+
+    for f in files:
+        assert os.path.exists(f + '.ovr')
+        with rasterio.open(f) as src:
+            assert src.overviews(1) == [2, 4]
+            z = src.read(1)
+            # the average of every 4 x 4 pixels
+            overview = src.read(1, out_shape=(4, 4))
+        expected = z.reshape(4, 4, 4, 4).mean(axis=(1, 3))
+        np.testing.assert_allclose(overview, expected, atol=1)
+
+    # the original files are not modified, existing overviews are kept
+    with rasterio.open(files[0]) as src:
+        assert src.read(1).dtype == np.int16
+    assert build_overviews(files) == []
+
+
+def test_archived_files_are_skipped(tmp_path):
+    filename = _write_tile(tmp_path, 86, 27)
+    archive = str(tmp_path / 'tiles.zip')
+    with ZipFile(archive, 'w') as z:
+        z.write(filename, os.path.basename(filename))
+
+    with pytest.warns(UserWarning, match='Can not write overviews'):
+        assert build_overviews(archive) == []
+    assert not os.path.exists(archive + '.ovr')
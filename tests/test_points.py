@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from xarray import Dataset, Variable
+
+import rasterx
+
+
+NODATA = -9999
+
+
+def _write_tile(directory, x, y, size=11):
+    # an AsterGDEM style float32 netCDF tile with SW corner (x, y), with
+    # a smooth, non-linear surface and a nodata pixel at its center
+    lon = x + np.arange(size) / (size - 1)
+    lat = y + np.arange(size) / (size - 1)
+    z = (100 * np.sin(3 * lat)[:, None] * np.cos(2 * lon)).astype('float32')
+    z[size // 2, size // 2] = NODATA
+    ds = Dataset(
+        {'z': Variable(('lat', 'lon'), z)},
+        coords=dict(lon=lon, lat=lat)
+    )
+    corner = (f'{"S" if y < 0 else "N"}{abs(y):02d}'
+              f'{"W" if x < 0 else "E"}{abs(x):03d}')
+    ds.to_netcdf(directory / f'ASTGTMV003_{corner}_dem.nc',
+                 encoding={'z': {'_FillValue': NODATA}})
+
+
+@pytest.fixture
+def tiles(tmp_path):
+    for y in (27, 28):
+        for x in (86, 87):
+            _write_tile(tmp_path, x, y)
+    return str(tmp_path)
+
+
+# points within tiles and within a pixel of their edges
+X = np.array([86.23, 86.97, 87.02, 86.99, 87.61, 86.42, 87.005])
+Y = np.array([27.31, 27.48, 27.52, 27.99, 28.03, 28.88, 28.004])
+
+
+@pytest.mark.parametrize('method, interp', [('nearest', 'nearest'),
+                                            ('bilinear', 'linear')])
+def test_sample_matches_interp(tiles, method, interp):
+    mosaic = rasterx.read(tiles, extent=(86, 88, 27, 29))
+    expected = mosaic.z.interp(lon=Variable('points', X),
+                               lat=Variable('points', Y), method=interp)
+
+    ds = rasterx.sample(tiles, X, Y, method=method)
+    assert ds.z.dims == ('points',)
+    np.testing.assert_array_equal(ds.lon.values, X)
+    np.testing.assert_allclose(ds.z.values, expected.values, rtol=1e-6)
+
+    # the same through the accessor of the mosaic
+    ds = mosaic.geo.sample(X, Y, method=method)
+    np.testing.assert_allclose(ds.z.values, expected.values, rtol=1e-6)
+
+
+def test_sample_nodata(tiles):
+    # next to the nodata pixel at the center of N27E086
+    ds = rasterx.sample(tiles, [86.5, 86.53], [27.5, 27.5], 'bilinear')
+    assert np.isnan(ds.z.values).all()
+    ds = rasterx.sample(tiles, [86.5, 86.53], [27.5, 27.5])
+    assert ds.z.values.tolist() == [NODATA, NODATA]
+
+
+def test_sample_missing_tiles(tmp_path):
+    # there is no N28E087 tile, points in it may only touch N28E086
+    for x, y in ((86, 27), (87, 27), (86, 28)):
+        _write_tile(tmp_path, x, y)
+    ds = rasterx.sample(str(tmp_path), [86.2, 87.15, 87.5], [28.2, 28.5, 28.5])
+    assert ds.z.values[0] != NODATA
+    assert ds.z.values[1:].tolist() == [NODATA, NODATA]
+
+    with pytest.raises(ValueError, match='None of the points'):
+        rasterx.sample(str(tmp_path), 87.5, 28.5)
+
+
+def test_sample_raises_read_errors(tiles):
+    with open(f'{tiles}/ASTGTMV003_N28E087_dem.nc', 'wb') as f:
+        f.write(b'not a tile')
+    with pytest.raises(OSError, match='N28E087'):
+        rasterx.sample(tiles, [86.2, 87.5], [27.2, 28.5])
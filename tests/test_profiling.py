@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from xarray import Dataset, Variable
+
+import rasterx
+from rasterx import profiling
+
+
+NODATA = -9999
+
+
+def _write_tile(directory, x, y, size=11):
+    # an AsterGDEM style int16 netCDF tile with SW corner (x, y)
+    lon = x + np.arange(size) / (size - 1)
+    lat = y + np.arange(size) / (size - 1)
+    z = np.round(100 * np.add.outer(lat - 27, lon - 86)).astype('int16')
+    ds = Dataset(
+        {'z': Variable(('lat', 'lon'), z)},
+        coords=dict(lon=lon, lat=lat)
+    )
+    corner = (f'{"S" if y < 0 else "N"}{abs(y):02d}'
+              f'{"W" if x < 0 else "E"}{abs(x):03d}')
+    ds.to_netcdf(directory / f'ASTGTMV003_{corner}_dem.nc',
+                 encoding={'z': {'_FillValue': NODATA}})
+
+
+@pytest.fixture
+def tiles(tmp_path):
+    for y in (27, 28):
+        for x in (86, 87):
+            _write_tile(tmp_path, x, y)
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_profile_report(tiles, workers):
+    seen = []
+    with rasterx.profile(callback=seen.append) as report:
+        ds = rasterx.read(tiles, extent=(86, 88, 27, 29), workers=workers)
+    assert not profiling._hooks
+    assert seen == report.stages
+
+    summary = report.summary()
+    assert {'discover', 'open', 'decode', 'merge'} <= set(summary)
+    assert summary['discover']['count'] == 1
+    assert summary['open']['count'] == summary['decode']['count'] == 4
+    assert summary['merge']['count'] == 1
+    assert summary['merge']['nbytes'] == ds.nbytes
+    assert summary['decode']['nbytes'] >= ds.nbytes
+    for name, totals in summary.items():
+        assert totals['wall'] >= 0
+        assert totals['peak'] is not None and totals['peak'] >= 0
+
+    # every tile is reported, with its filename
+    decoded = sorted(s.info['filename'] for s in report.stages
+                     if s.name == 'decode')
+    assert len(set(decoded)) == 4
+    assert report.wall >= max(s.wall for s in report.stages)
+
+    lines = str(report).splitlines()
+    assert lines[0].split() == ['stage', 'count', 'wall', '[s]', 'MB',
+                                'peak', 'MB']
+    assert [line.split()[0] for line in lines[1:]] == [*summary, 'total']
+
+
+def test_profile_without_memory(tiles):
+    with rasterx.profile(memory=False) as report:
+        rasterx.read(tiles, extent=(86.2, 86.4, 27.2, 27.4))
+    assert report.stages
+    assert all(s.peak is None for s in report.stages)
+    assert all(line.split()[-1] == '-'
+               for line in str(report).splitlines()[1:-1])
+
+    # nothing is collected outside of the block
+    stages = list(report.stages)
+    rasterx.read(tiles, extent=(86.2, 86.4, 27.2, 27.4))
+    assert report.stages == stages
@@ -0,0 +1,96 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+import gdal
+
+import rasterx
+from rasterx import remote
+
+
+@pytest.fixture(autouse=True)
+def options(monkeypatch):
+    # configure() sets GDAL options for the rest of the process, restore
+    # them and let the next test apply the defaults again
+    monkeypatch.setattr(remote, '_configured', False)
+    keys = [*remote.OPTIONS, 'GDAL_HTTP_TIMEOUT']
+    if hasattr(gdal, 'SetPathSpecificOption'):
+        saved = {key: gdal.GetPathSpecificOption('/vsicurl/', key, None)
+                 for key in keys}
+    else:
+        saved = {key: gdal.GetConfigOption(key) for key in keys}
+    yield
+    for key, value in saved.items():
+        if hasattr(gdal, 'SetPathSpecificOption'):
+            gdal.SetPathSpecificOption('/vsicurl/', key, value)
+        else:
+            gdal.SetConfigOption(key, value)
+
+
+@pytest.fixture
+def server(tmp_path):
+    # a local http.server in its own process, GDAL holds the GIL
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'http.server', str(port),
+         '--bind', '127.0.0.1', '--directory', str(tmp_path)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), 0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    yield tmp_path, f'http://127.0.0.1:{port}/'
+    process.terminate()
+    process.wait()
+
+
+def _write_tile(filename, size=121):
+    z = np.arange(size * size, dtype='int16').reshape(size, size)
+    d = 1 / (size - 1)
+    with rasterio.open(filename, 'w', driver='GTiff', width=size,
+                       height=size, count=1, dtype='int16',
+                       crs='EPSG:4326', nodata=-9999,
+                       transform=from_origin(86 - d / 2, 28 + d / 2, d, d),
+                       tiled=True, blockxsize=32, blockysize=32) as f:
+        f.write(z, 1)
+
+
+def test_read_url(server):
+    directory, url = server
+    _write_tile(directory / 'N27E086.tif')
+
+    extent = (86.2, 86.4, 27.5, 27.7)
+    ds = rasterx.read(url + 'N27E086.tif', extent=extent)
+    local = rasterx.read(str(directory / 'N27E086.tif'), extent=extent)
+    np.testing.assert_array_equal(ds.band0_1.values, local.band0_1.values)
+
+
+def test_options_only_apply_to_urls(server):
+    _, url = server
+    remote.configure(GDAL_HTTP_TIMEOUT=10)
+
+    key = 'GDAL_DISABLE_READDIR_ON_OPEN'
+    assert key not in os.environ
+    assert gdal.GetConfigOption(key) is None
+    if hasattr(gdal, 'GetPathSpecificOption'):
+        value = gdal.GetPathSpecificOption(f'/vsicurl/{url}N27E086.tif',
+                                           key, None)
+        assert value == 'EMPTY_DIR'
+
+    value = gdal.GetConfigOption('GDAL_HTTP_TIMEOUT')
+    if hasattr(gdal, 'GetPathSpecificOption'):
+        value = gdal.GetPathSpecificOption('/vsicurl/', 'GDAL_HTTP_TIMEOUT',
+                                           None)
+    assert value == '10'
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from xarray import Dataset, Variable
+
+import rasterx
+from rasterx.statistics import stats, STATS
+
+
+NODATA = -9999
+BINS = np.linspace(0, 3500, 8)
+
+BBOX = (86.35, 87.65, 27.25, 28.45)
+# a triangle, its hypotenuse passes between pixel centers
+POLYGON = [(86.05, 27.05), (87.93, 27.05), (86.05, 28.93)]
+
+
+def _write_tile(directory, x, y, size=11):
+    # an AsterGDEM style int16 netCDF tile with SW corner (x, y), the
+    # edges it shares with its neighbours have different values in each
+    lon = x + np.arange(size) / (size - 1)
+    lat = y + np.arange(size) / (size - 1)
+    z = np.round(100 * np.add.outer(lat - 27, lon - 86)).astype('int16')
+    z += 1000 * (x - 86) + 2000 * (y - 27)
+    z[size // 2, size // 2] = NODATA
+    ds = Dataset(
+        {'z': Variable(('lat', 'lon'), z)},
+        coords=dict(lon=lon, lat=lat)
+    )
+    corner = (f'{"S" if y < 0 else "N"}{abs(y):02d}'
+              f'{"W" if x < 0 else "E"}{abs(x):03d}')
+    ds.to_netcdf(directory / f'ASTGTMV003_{corner}_dem.nc',
+                 encoding={'z': {'_FillValue': NODATA}})
+
+
+@pytest.fixture
+def tiles(tmp_path):
+    for y in (27, 28):
+        for x in (86, 87):
+            _write_tile(tmp_path, x, y)
+    return str(tmp_path)
+
+
+def _expected(path, region, overlap='first'):
+    # the statistics of the mosaic read() builds, with xarray reductions
+    if isinstance(region, tuple):
+        z = rasterx.read(path, extent=region, overlap=overlap).z
+    else:
+        (x1, y1), (x2, _), (_, y2) = region
+        z = rasterx.read(path, extent=(x1, x2, y1, y2), overlap=overlap).z
+        z = z.where(z.lon + z.lat < x2 + y1, NODATA)
+    z = z.where(z != NODATA)
+    valid = z.values[~np.isnan(z.values)]
+    return {
+        'count': z.count().item(),
+        'mean': z.reduce(np.nanmean).item(),
+        'std': z.reduce(np.nanstd).item(),
+        'min': z.reduce(np.nanmin).item(),
+        'max': z.reduce(np.nanmax).item(),
+        'histogram': np.histogram(valid, BINS)[0],
+    }
+
+
+def _check(ds, expected):
+    for stat, value in expected.items():
+        np.testing.assert_allclose(ds[f'z_{stat}'].values, value)
+
+
+def test_module_not_shadowed():
+    # the stats function does not hide the module it is defined in
+    assert rasterx.statistics.STATS is STATS
+    assert rasterx.stats is stats
+
+
+@pytest.mark.parametrize('overlap', ['first', 'last'])
+def test_stats_match_mosaic(tiles, overlap):
+    # BBOX and POLYGON span all tiles, shared edges are counted once
+    ds = stats(tiles, {'bbox': BBOX, 'polygon': POLYGON},
+               stats=['count', 'mean', 'std', 'min', 'max', 'histogram'],
+               bins=BINS, overlap=overlap)
+    assert list(ds.region.values) == ['bbox', 'polygon']
+    _check(ds.sel(region='bbox'), _expected(tiles, BBOX, overlap))
+    _check(ds.sel(region='polygon'), _expected(tiles, POLYGON, overlap))
+
+
+def test_stats_single_region(tiles):
+    ds = stats(tiles, BBOX, stats=['count', 'mean', 'std', 'min', 'max',
+                                   'histogram'], bins=BINS)
+    assert 'region' not in ds.dims
+    _check(ds, _expected(tiles, BBOX))
+
+
+def test_stats_workers(tiles):
+    regions = [BBOX, POLYGON, (86.05, 86.45, 27.05, 27.45)]
+    kwargs = dict(stats=['count', 'mean', 'std', 'min', 'max',
+                         'histogram'], bins=BINS)
+    ds = stats(tiles, regions, **kwargs)
+    assert ds.identical(stats(tiles, regions, workers=2, pool='process',
+                              **kwargs))
+    for k, region in enumerate(regions):
+        _check(ds.isel(region=k), _expected(tiles, region))
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from xarray import Dataset, Variable
+
+import rasterx  # noqa: F401, registers the geo accessor
+from rasterx.terrain import derive
+
+
+def _grid(z):
+    # a north-up projected grid with 10 m pixels
+    ny, nx = z.shape
+    return Dataset(
+        {'z': Variable(('y', 'x'), z)},
+        coords=dict(x=1000 + 10. * np.arange(nx), y=5000 - 10. * np.arange(ny))
+    )
+
+
+@pytest.fixture
+def surface():
+    rng = np.random.default_rng(0)
+    z = rng.normal(100, 10, (30, 40))
+    z[12, 17] = np.nan
+    return _grid(z)
+
+
+def test_planar_ramp():
+    # z rises 0.3 m/m eastwards and 0.4 m/m northwards
+    ny, nx = 30, 40
+    ds = _grid(np.zeros((ny, nx)))
+    ds['z'] = 0.3 * ds.x + 0.4 * ds.y
+
+    slope = ds.geo.slope(geographic=False).z.values
+    aspect = ds.geo.aspect(geographic=False).z.values
+    percent = ds.geo.slope('percent', geographic=False).z.values
+
+    # the outermost pixels lack neighbours
+    assert np.isnan(slope[[0, -1]]).all() and np.isnan(slope[:, [0, -1]]).all()
+    inner = (slice(1, -1), slice(1, -1))
+    np.testing.assert_allclose(slope[inner], np.degrees(np.arctan(0.5)))
+    np.testing.assert_allclose(percent[inner], 50)
+    # it faces downslope, to the south-west
+    np.testing.assert_allclose(aspect[inner],
+                               180 + np.degrees(np.arctan2(0.3, 0.4)))
+
+
+@pytest.mark.parametrize('derivative', ['slope', 'aspect', 'hillshade'])
+def test_lazy_matches_eager(surface, derivative):
+    eager = derive(surface, derivative, geographic=False)
+    lazy = derive(surface.chunk(x=9, y=7), derivative, geographic=False)
+    assert lazy.z.chunks is not None
+    assert lazy.z.dtype == eager.z.dtype
+    np.testing.assert_allclose(lazy.z.values, eager.z.values)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_blocks_match_single_block(surface, workers):
+    # the halo of one pixel makes block edges seamless
+    single = derive(surface, 'slope', geographic=False, block_shape=100)
+    blocks = derive(surface, 'slope', geographic=False, block_shape=(7, 9),
+                    workers=workers)
+    assert blocks.identical(single)
+    assert np.isnan(single.z.values[11:14, 16:19]).all()
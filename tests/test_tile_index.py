@@ -0,0 +1,114 @@
+import os
+import warnings
+
+import pytest
+
+from rasterx import cache, tile_index
+from rasterx.core import _get_tiles
+from rasterx.tile_index import get_tile_index
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    # indexes of this session only, saved in a temporary directory
+    cache_dir = tmp_path / 'cache'
+    monkeypatch.setattr(cache, 'CACHE_DIR', str(cache_dir))
+    monkeypatch.setattr(tile_index, '_INDEXES', {})
+    monkeypatch.setattr(tile_index, '_UNWRITABLE', set())
+    return cache_dir
+
+
+def _name(x, y, suffix='dem'):
+    return (f'ASTGTMV003_{"S" if y < 0 else "N"}{abs(y):02d}'
+            f'{"W" if x < 0 else "E"}{abs(x):03d}_{suffix}.nc')
+
+
+@pytest.fixture
+def tiles(tmp_path):
+    # empty AsterGDEM tiles around (0, 0), with their _num files
+    path = tmp_path / 'tiles'
+    path.mkdir()
+    for y in (-2, -1, 0, 1):
+        for x in (-2, -1, 0, 1, 179, -180):
+            for suffix in ('dem', 'num'):
+                (path / _name(x, y, suffix)).touch()
+    (path / 'README.txt').touch()
+    return str(path)
+
+
+def _tiles(path, *extent, **kwargs):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return [os.path.basename(f)
+                for f in _get_tiles(path, *extent, **kwargs)]
+
+
+@pytest.mark.parametrize('extent, cells', [
+    ((-0.5, 0.5, -0.5, 0.5), [(-1, -1), (0, -1), (-1, 0), (0, 0)]),
+    # tiles that only touch the extent are left out
+    ((-1, 1, -1, 1), [(-1, -1), (0, -1), (-1, 0), (0, 0)]),
+    ((0.2, 1.5, -1.8, -1.2), [(0, -2), (1, -2)]),
+    # across the antimeridian, from east to west
+    ((179.5, -179.5, 0.2, 1.8), [(179, 0), (-180, 0), (179, 1), (-180, 1)]),
+    ((179.5, 180.5, 0.2, 0.8), [(179, 0), (-180, 0)]),
+])
+def test_index_matches_glob(tiles, extent, cells):
+    expected = [_name(x, y) for x, y in cells]
+    assert _tiles(tiles, *extent) == expected
+    assert _tiles(tiles, *extent, index=False) == expected
+
+
+def test_missing_tiles_are_warned(tiles):
+    for index in (True, False):
+        with pytest.warns(UserWarning, match='Unable to find'):
+            files = _get_tiles(tiles, 1.5, 2.5, 0.5, 1.5, index=index)
+        assert [os.path.basename(f) for f in files] == [_name(1, 0),
+                                                        _name(1, 1)]
+
+
+def test_stale_index_is_rescanned(tiles, cache_dir):
+    index = get_tile_index(tiles, '*_{y_sep}{y:02d}{x_sep}{x:03d}*.nc')
+    assert get_tile_index(tiles, index.template) is index
+    assert _tiles(tiles, 2.2, 2.8, 0.2, 0.8) == []
+
+    # the index is saved and reused by other sessions...
+    tile_index._INDEXES.clear()
+    assert len(os.listdir(cache_dir / 'tile_index')) == 1
+    loaded = get_tile_index(tiles, index.template)
+    assert loaded is not index
+    assert loaded.cells == index.cells
+
+    # ... until a tile is added
+    open(os.path.join(tiles, _name(2, 0)), 'w').close()
+    assert _tiles(tiles, 2.2, 2.8, 0.2, 0.8) == [_name(2, 0)]
+    tile_index._INDEXES.clear()
+    assert _tiles(tiles, 2.2, 2.8, 0.2, 0.8) == [_name(2, 0)]
+
+
+def test_glob_fallback(tmp_path):
+    # templates with subdirectories can not be indexed, tiles are globbed
+    for y in ('N00', 'N01'):
+        os.makedirs(tmp_path / y)
+        for x in ('E000', 'E001'):
+            (tmp_path / y / f'{x}.tif').touch()
+    template = os.path.join('{y_sep}{y:02d}', '{x_sep}{x:03d}')
+    with pytest.raises(ValueError):
+        get_tile_index(str(tmp_path), template + '.tif')
+
+    files = _tiles(str(tmp_path), 0.5, 1.5, 0.5, 0.8, template=template,
+                   ext='.tif')
+    assert files == ['E000.tif', 'E001.tif']
+    assert not tile_index._INDEXES
+
+
+def test_unwritable_cache_is_warned_once(tiles, tmp_path, monkeypatch):
+    # e.g. a read-only home directory
+    (tmp_path / 'home').touch()
+    monkeypatch.setattr(cache, 'CACHE_DIR', str(tmp_path / 'home' / 'cache'))
+    with pytest.warns(UserWarning, match='kept in memory only') as record:
+        get_tile_index(tiles, '*_{y_sep}{y:02d}{x_sep}{x:03d}*.nc')
+        get_tile_index(tiles, '*_{y_sep}{y:02d}{x_sep}{x:03d}*.tif')
+        tile_index._INDEXES.clear()
+        files = _get_tiles(tiles, 0.2, 0.8, 0.2, 0.8)
+    assert [os.path.basename(f) for f in files] == [_name(0, 0)]
+    assert len(record) == 1
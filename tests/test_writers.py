@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from xarray import Dataset, Variable, open_dataset
+
+import rasterx
+from rasterx.writers import mosaic_to
+
+
+NODATA = -9999
+
+
+def _write_tile(directory, x, y, size=11):
+    # an AsterGDEM style int16 netCDF tile with SW corner (x, y)
+    lon = x + np.arange(size) / (size - 1)
+    lat = y + np.arange(size) / (size - 1)
+    z = np.round(100 * np.add.outer(lat - 27, lon - 86)).astype('int16')
+    z[size // 2, size // 2] = NODATA
+    # the pixels shared with the tiles to the S and W differ
+    z[0] += 1000 * (y - 27)
+    z[:, 0] += 1000 * (x - 86)
+    ds = Dataset(
+        {'z': Variable(('lat', 'lon'), z)},
+        coords=dict(lon=lon, lat=lat)
+    )
+    corner = (f'{"S" if y < 0 else "N"}{abs(y):02d}'
+              f'{"W" if x < 0 else "E"}{abs(x):03d}')
+    ds.to_netcdf(directory / f'ASTGTMV003_{corner}_dem.nc',
+                 encoding={'z': {'_FillValue': NODATA}})
+
+
+@pytest.fixture
+def tiles(tmp_path):
+    path = tmp_path / 'tiles'
+    path.mkdir()
+    # there is no N28E087 tile, the NE corner is a gap
+    for x, y in ((86, 27), (87, 27), (86, 28)):
+        _write_tile(path, x, y)
+    return str(path)
+
+
+@pytest.mark.parametrize('overlap', ['first', 'last'])
+@pytest.mark.parametrize('extent', [None, (86.3, 87.6, 27.2, 28.7)])
+def test_mosaic_to_netcdf_matches_read(tiles, tmp_path, overlap, extent):
+    out = str(tmp_path / 'mosaic.nc')
+    assert mosaic_to(tiles, out, extent=extent, overlap=overlap,
+                     chunksize=4) == out
+
+    expected = rasterx.read(tiles, extent=extent or (86, 88, 27, 29),
+                            overlap=overlap)
+    with open_dataset(out, mask_and_scale=False) as ds:
+        assert ds.z.dtype == np.int16
+        assert ds.z.attrs['_FillValue'] == NODATA
+        assert ds.z.encoding['chunksizes'] == (4, 4)
+        np.testing.assert_array_equal(ds.lon.values, expected.lon.values)
+        np.testing.assert_array_equal(ds.lat.values, expected.lat.values)
+        np.testing.assert_array_equal(ds.z.values, expected.z.values)
+    assert (expected.z.values[-5:, -5:] == NODATA).all()
+    other = 'last' if overlap == 'first' else 'first'
+    assert not expected.equals(rasterx.read(
+        tiles, extent=extent or (86, 88, 27, 29), overlap=other
+    ))
+
+
+def test_mosaic_to_checks_arguments(tiles, tmp_path):
+    out = str(tmp_path / 'mosaic.nc')
+    with pytest.raises(ValueError, match='format'):
+        mosaic_to(tiles, out, format='png')
+    with pytest.raises(ValueError, match='overlap'):
+        mosaic_to(tiles, out, overlap='mean')